@@ -0,0 +1,228 @@
+
+# 27. admission.py - Admission control for synchronous scrapes
+admission_py = '''"""
+VAMP Agent Admission Control
+Caps the synchronous scrapes this API process runs at once, so a burst (a
+whole department scanning before an audit deadline) queues briefly or is
+turned away quickly instead of opening connector traffic until everything
+times out:
+
+- At most SCRAPE_MAX_IN_FLIGHT scrapes in total, and at most
+  SCRAPE_PLATFORM_MAX_IN_FLIGHT per platform (SCRAPE_PLATFORM_LIMITS sets
+  individual platforms)
+- Requests beyond that wait in a FIFO queue of SCRAPE_MAX_QUEUED entries for
+  up to SCRAPE_MAX_QUEUE_WAIT seconds. A waiter whose platform has room is
+  not held up by ones ahead of it that are waiting on a busier platform.
+- A full queue is answered at once: 503 when the process is at its total
+  capacity, 429 when only the caller's platform is. A queue wait that times out
+  also gets 503.
+
+Every rejection carries a Retry-After: the requests queued ahead of the
+caller divided by the rate scrapes have recently been finishing (overall, or
+for the platform), so clients back off for about as long as the backlog needs
+to drain.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from config import settings
+from metrics import SCRAPE_ADMISSIONS, SCRAPE_QUEUE_DEPTH, SCRAPES_IN_FLIGHT
+
+# Completions older than this no longer count towards the drain rate
+DRAIN_WINDOW_SECONDS = 60.0
+MAX_RETRY_AFTER = 300
+
+
+def parse_platform_limits(value: str) -> Dict[str, int]:
+    """ "outlook=4,nextcloud=2" as {"outlook": 4, "nextcloud": 2} """
+    limits = {}
+    for entry in value.split(','):
+        if not entry.strip():
+            continue
+        platform, _, limit = entry.partition('=')
+        try:
+            limits[platform.strip()] = int(limit)
+        except ValueError:
+            raise ValueError(f"Invalid platform limit {entry.strip()!r}; expected platform=N")
+    return limits
+
+
+def overloaded(status_code: int, detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(min(MAX_RETRY_AFTER, max(1, math.ceil(retry_after))))}
+    )
+
+
+class _Waiter:
+    __slots__ = ('platform', 'future')
+
+    def __init__(self, platform: str, future: asyncio.Future):
+        self.platform = platform
+        self.future = future
+
+
+class AdmissionController:
+    """In-flight caps with a bounded wait queue, for one process's event loop"""
+
+    def __init__(self, max_in_flight: int, platform_max_in_flight: int,
+                 platform_limits: Dict[str, int] = None, max_queued: int = 0,
+                 max_wait: float = 0.0, default_retry_after: float = 5.0):
+        self.max_in_flight = max_in_flight  # 0 = unlimited
+        self.platform_max_in_flight = platform_max_in_flight
+        self.platform_limits = platform_limits or {}
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.default_retry_after = default_retry_after
+        self._in_flight = 0
+        self._platform_in_flight: Dict[str, int] = {}
+        self._waiters: Deque[_Waiter] = deque()
+        self._finished: Dict[Optional[str], Deque[float]] = {}  # None = every platform
+
+    def platform_limit(self, platform: str) -> int:
+        return self.platform_limits.get(platform, self.platform_max_in_flight)
+
+    def _total_full(self) -> bool:
+        return 0 < self.max_in_flight <= self._in_flight
+
+    def _platform_full(self, platform: str) -> bool:
+        return 0 < self.platform_limit(platform) <= self._platform_in_flight.get(platform, 0)
+
+    def _start(self, platform: str):
+        self._in_flight += 1
+        self._platform_in_flight[platform] = self._platform_in_flight.get(platform, 0) + 1
+        SCRAPES_IN_FLIGHT.labels(platform=platform).inc()
+
+    def _finish(self, platform: str):
+        self._in_flight -= 1
+        self._platform_in_flight[platform] -= 1
+        if not self._platform_in_flight[platform]:
+            del self._platform_in_flight[platform]
+        SCRAPES_IN_FLIGHT.labels(platform=platform).dec()
+        now = time.monotonic()
+        for key in (None, platform):
+            self._finished.setdefault(key, deque(maxlen=256)).append(now)
+        self._wake()
+
+    def _wake(self):
+        """Hand freed slots to waiters in arrival order, skipping ones whose platform is still full"""
+        for waiter in list(self._waiters):
+            if self._total_full():
+                break
+            if waiter.future.done() or self._platform_full(waiter.platform):
+                continue
+            self._dequeue(waiter)
+            self._start(waiter.platform)
+            waiter.future.set_result(True)
+
+    def _dequeue(self, waiter: _Waiter):
+        self._waiters.remove(waiter)
+        SCRAPE_QUEUE_DEPTH.dec()
+
+    def drain_rate(self, platform: str = None) -> Optional[float]:
+        """Scrapes finished per second over the recent window, or None without enough history"""
+        finished = self._finished.get(platform)
+        if not finished:
+            return None
+        now = time.monotonic()
+        while finished and now - finished[0] > DRAIN_WINDOW_SECONDS:
+            finished.popleft()
+        if not finished:
+            return None
+        return len(finished) / max(now - finished[0], 1.0)
+
+    def retry_after(self, platform: str = None) -> float:
+        """Seconds until the backlog ahead of a new request (overall, or for one platform) has drained"""
+        if platform is None:
+            ahead = len(self._waiters)
+        else:
+            ahead = sum(1 for waiter in self._waiters if waiter.platform == platform)
+        rate = self.drain_rate(platform)
+        if not rate:
+            return self.default_retry_after
+        return (ahead + 1) / rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": len(self._waiters),
+            "max_queued": self.max_queued,
+            "platforms": dict(self._platform_in_flight),
+            "drain_rate": self.drain_rate()
+        }
+
+    @asynccontextmanager
+    async def admit(self, platform: str) -> AsyncIterator[None]:
+        """
+        Hold a scrape slot for `platform`, waiting in the queue if needed.
+        Raises HTTPException 503 / 429 with Retry-After when the request is shed.
+        """
+        if not self._total_full() and not self._platform_full(platform):
+            self._start(platform)
+            SCRAPE_ADMISSIONS.labels(platform=platform, outcome="admitted").inc()
+        else:
+            await self._wait(platform)
+        try:
+            yield
+        finally:
+            self._finish(platform)
+
+    async def _wait(self, platform: str):
+        if len(self._waiters) >= self.max_queued:
+            SCRAPE_ADMISSIONS.labels(platform=platform, outcome="rejected").inc()
+            if self._total_full():
+                raise overloaded(
+                    503, f"Server at capacity: {self._in_flight} scrapes running and "
+                         f"{len(self._waiters)} waiting", self.retry_after()
+                )
+            raise overloaded(
+                429, f"Too many {platform} scrapes running ({self.platform_limit(platform)}); "
+                     f"try again later", self.retry_after(platform)
+            )
+
+        waiter = _Waiter(platform, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        SCRAPE_QUEUE_DEPTH.inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._dequeue(waiter)
+                waiter.future.cancel()
+                SCRAPE_ADMISSIONS.labels(platform=platform, outcome="timeout").inc()
+                raise overloaded(
+                    503, f"No {platform} scrape slot freed up within {self.max_wait:g}s",
+                    self.retry_after(platform)
+                )
+        except asyncio.CancelledError:
+            # Client went away while queued; a slot handed over meanwhile goes back
+            if waiter.future.done():
+                self._finish(platform)
+            else:
+                self._dequeue(waiter)
+                waiter.future.cancel()
+            raise
+        SCRAPE_ADMISSIONS.labels(platform=platform, outcome="queued").inc()
+
+
+scrape_admission = AdmissionController(
+    max_in_flight=settings.SCRAPE_MAX_IN_FLIGHT,
+    platform_max_in_flight=settings.SCRAPE_PLATFORM_MAX_IN_FLIGHT,
+    platform_limits=parse_platform_limits(settings.SCRAPE_PLATFORM_LIMITS),
+    max_queued=settings.SCRAPE_MAX_QUEUED,
+    max_wait=settings.SCRAPE_MAX_QUEUE_WAIT,
+    default_retry_after=settings.USER_QUOTA_RETRY_AFTER
+)
+'''
+
+print("=== ADMISSION.PY ===")
+print(admission_py[:2000])
+print(f"\n... [Full file is {len(admission_py.splitlines())} lines] ...\n")
@@ -24,13 +24,27 @@ print("\n")
 config_py = '''"""
 VAMP Agent Configuration with Encrypted Credential Storage
 """
+import asyncio
+import hashlib
 import json
 import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from cryptography.fernet import Fernet
+from typing import Optional, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
+from metrics import CREDENTIAL_CRYPTO_SECONDS
+
+# Used when no key is configured. Each process generates its own, so nothing it
+# encrypts can be read by other processes or after a restart.
+EPHEMERAL_ENCRYPTION_KEY = Fernet.generate_key().decode()
+
 
 class VAMPSettings(BaseSettings):
     """Configuration with encrypted credentials"""
@@ -43,7 +57,7 @@ class VAMPSettings(BaseSettings):
     # Encryption key (generate with: Fernet.generate_key())
     ENCRYPTION_KEY: str = Field(default_factory=lambda: os.getenv(
         "VAMP_ENCRYPTION_KEY", 
-        Fernet.generate_key().decode()
+        EPHEMERAL_ENCRYPTION_KEY
     ))
     
     # Session config
@@ -54,11 +68,105 @@ class VAMPSettings(BaseSettings):
     CONNECTOR_TIMEOUT: int = 30
     MAX_RETRIES: int = 3
     
+    # Outlook: every mail folder (False: inbox only), paged this many folders at a time
+    OUTLOOK_CRAWL_ALL_FOLDERS: bool = True
+    OUTLOOK_FOLDER_CONCURRENCY: int = 4
+    OUTLOOK_EXCLUDED_FOLDERS: str = "deleteditems,junkemail"  # well-known names or folder ids
+    
+    # Session pre-flight checks before paging, cached per cookie/credential fingerprint
+    SESSION_CHECK_ENABLED: bool = True
+    SESSION_CHECK_TTL: int = 60  # seconds a valid session is trusted without re-checking
+    SESSION_CHECK_INVALID_TTL: int = 600  # seconds a rejected session is remembered
+    
     # WebSocket settings
     WS_HEARTBEAT_INTERVAL: int = 30
+    WS_REPLAY_BUFFER_SIZE: int = 1000  # recent messages kept per topic
+    WS_REPLAY_LINGER_SECONDS: int = 60  # keep a topic's buffer after its last client leaves
+    
+    # Retired keys (comma-separated) still accepted while records are re-encrypted
+    ENCRYPTION_KEYS_PREVIOUS: str = ""
     
-    # Credentials storage path
+    # Credentials storage: one encrypted record per (user, service)
+    CREDENTIAL_STORE_PATH: Path = Path("config/vamp_credentials.db")
+    CREDENTIAL_ROTATION_BATCH: int = 100  # records re-encrypted per background step
+    # Legacy single-blob file, imported into the store on first start
     CREDENTIALS_FILE: Path = Path("config/.vamp_credentials.enc")
+    CREDENTIAL_CRYPTO_THREADS: int = 4  # threads for Fernet/JSON work in async handlers
+    
+    # Job queue / worker pool
+    JOB_QUEUE_BACKEND: str = "sqlite"
+    JOB_QUEUE_PATH: Path = Path("config/vamp_jobs.db")
+    JOB_WORKERS: int = 2
+    JOB_WORKERS_EMBEDDED: bool = True  # False when running `python jobs.py` separately
+    JOB_LEASE_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_POLL_INTERVAL: float = 1.0
+    
+    # Scan evidence and resumable checkpoints
+    EVIDENCE_STORE_PATH: Path = Path("config/vamp_evidence.db")
+    
+    # WebSocket topic pub/sub ("inprocess" or "unix" for multi-worker deployments)
+    PUBSUB_BACKEND: str = "inprocess"
+    PUBSUB_SOCKET_PATH: Path = Path("config/vamp_pubsub.sock")
+    PUBSUB_HOST_BROKER: bool = True  # first process to take the lock hosts the broker
+    
+    # Per-scan tracing ("sqlite" shares spans between job workers and the API; "memory" is per process)
+    TRACE_EXPORTER: str = "sqlite"
+    TRACE_STORE_PATH: Path = Path("config/vamp_traces.db")
+    TRACE_MAX_SCANS: int = 200  # scans kept by the in-memory exporter
+    
+    # Compliance scoring process pool (0 = one worker per core)
+    SCORING_WORKERS: int = 0
+    SCORING_CHUNK_SIZE: int = 500  # evidence items per worker task
+    
+    # Evidence export: items read from the store and encoded per chunk (Parquet row group)
+    EXPORT_BATCH_SIZE: int = 5000
+    
+    # Recurring scans (cron schedules, evaluated in UTC)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULE_STORE_PATH: Path = Path("config/vamp_schedules.db")
+    SCHEDULER_POLL_SECONDS: float = 15.0
+    SCHEDULE_JITTER_SECONDS: int = 900  # default spread of each run after its cron time
+    SCHEDULE_OVERLAP_SECONDS: int = 3600  # incremental runs re-read this much before the last run
+    
+    # Scrape pipeline: pages buffered between stages, and workers per stage
+    PIPELINE_QUEUE_SIZE: int = 4
+    PIPELINE_CONVERT_WORKERS: int = 1  # threads converting pages to columnar batches
+    PIPELINE_CONTENT_WORKERS: int = 2  # pages resolving content at once (include_content)
+    
+    # Evidence content (include_content scrapes): resolved after filtering, cached per process
+    CONTENT_FETCH_CONCURRENCY: int = 8  # downloads at once per scrape
+    CONTENT_MAX_BYTES: int = 2_000_000  # larger items keep only their content handle
+    CONTENT_CACHE_BYTES: int = 64_000_000
+    
+    # Compliance reports: rendered (scan, section, format) entries kept per process
+    REPORT_SECTION_CACHE_SIZE: int = 512
+    
+    # Admission control for synchronous /api/scrape, per API process (0 = unlimited)
+    SCRAPE_MAX_IN_FLIGHT: int = 16
+    SCRAPE_PLATFORM_MAX_IN_FLIGHT: int = 8
+    SCRAPE_PLATFORM_LIMITS: str = ""  # per-platform overrides, e.g. "outlook=4,nextcloud=2"
+    SCRAPE_MAX_QUEUED: int = 32  # requests waiting for a slot; more are rejected at once
+    SCRAPE_MAX_QUEUE_WAIT: float = 10.0  # seconds a request may wait before a 503
+    
+    # Readiness probe (/health/readiness): dependency checks, cached between probes
+    READINESS_CACHE_TTL: float = 5.0  # seconds a result is served to further probes
+    READINESS_CHECK_TIMEOUT: float = 2.0  # seconds per check before it counts as failed
+    READINESS_MAX_QUEUE_DEPTH: int = 1000  # queued async jobs at which readiness is degraded (0 = no limit)
+    
+    # Caller identity and per-user quotas (0 = unlimited)
+    USER_TOKEN_SECRET: str = ""  # HMAC key for signed user tokens (python tenancy.py issue <user>)
+    USER_TOKEN_TTL: int = 30 * 86400  # seconds an issued token is valid
+    USER_HEADER: str = "X-VAMP-User"  # user id set by an authenticating proxy
+    TRUSTED_PROXIES: str = ""  # client addresses whose USER_HEADER is believed (comma-separated)
+    REQUIRE_USER_HEADER: bool = False  # False: requests that identify no user act as DEFAULT_USER
+    USER_API_RATE: float = 20.0  # sustained API requests per second per user
+    USER_API_BURST: int = 100
+    USER_MAX_SYNC_SCRAPES: int = 2  # concurrent /api/scrape calls per user, per API process
+    USER_MAX_PENDING_SCANS: int = 10  # queued + running async scans per user
+    USER_MAX_RUNNING_SCANS: int = 2  # scans per user the job workers run at once
+    USER_MAX_SCHEDULES: int = 20  # recurring scan schedules per user
+    USER_QUOTA_RETRY_AFTER: int = 5  # Retry-After seconds for concurrency quota rejections
     
     class Config:
         env_file = ".env"
@@ -67,59 +175,236 @@ class VAMPSettings(BaseSettings):
 
 settings = VAMPSettings()
 
+def encryption_key_is_ephemeral() -> bool:
+    """True when no key was configured and this process generated its own"""
+    return settings.ENCRYPTION_KEY == EPHEMERAL_ENCRYPTION_KEY
+
+# Owner of credentials saved without a user (single-user deployments)
+DEFAULT_USER = "default"
+
+
+def build_cipher(key: str = None, previous_keys: str = None) -> MultiFernet:
+    """
+    Current key first (used for encryption), then retired keys still accepted
+    for decryption until every record has been rotated.
+    """
+    keys = [key or settings.ENCRYPTION_KEY]
+    previous = settings.ENCRYPTION_KEYS_PREVIOUS if previous_keys is None else previous_keys
+    keys += [k.strip() for k in previous.split(',') if k.strip()]
+    return MultiFernet([Fernet(k.encode() if isinstance(k, str) else k) for k in keys])
+
+
+def key_id(key: str) -> str:
+    """Short non-secret fingerprint identifying which key encrypted a record"""
+    return hashlib.sha256(key.encode() if isinstance(key, str) else key).hexdigest()[:12]
+
 
 class CredentialManager:
-    """Manages encrypted credential storage"""
+    """
+    Encrypted credential store with one record per (user, service) in SQLite,
+    so reading or updating one service never touches the others.
+    The *_async methods are for request handlers: SQLite and Fernet/JSON work
+    run in a small bounded thread pool, off the event loop.
+    """
     
-    def __init__(self, encryption_key: str = None):
+    def __init__(self, encryption_key: str = None, path: Path = None):
         self.key = encryption_key or settings.ENCRYPTION_KEY
-        self.cipher = Fernet(self.key.encode() if isinstance(self.key, str) else self.key)
+        self.key_id = key_id(self.key)
+        self.cipher = build_cipher(self.key)
+        self.path = Path(path or settings.CREDENTIAL_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Pre-sharding single-blob file, imported once on first start
         self.credentials_file = settings.CREDENTIALS_FILE
-        self.credentials_file.parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.CREDENTIAL_CRYPTO_THREADS, thread_name_prefix="vamp-crypto"
+        )
+        self._init_schema()
+        self._migrate_legacy_file()
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+    
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS credentials (
+                    user_id TEXT NOT NULL,
+                    service TEXT NOT NULL,
+                    token TEXT NOT NULL,
+                    key_id TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, service)
+                );
+                CREATE INDEX IF NOT EXISTS idx_credentials_key ON credentials (key_id);
+            """)
+    
+    def _migrate_legacy_file(self):
+        if not self.credentials_file.exists():
+            return
+        try:
+            legacy = json.loads(self.cipher.decrypt(self.credentials_file.read_bytes()).decode())
+        except Exception as e:
+            print(f"Error decrypting legacy credentials file: {e}")
+            return
+        for service, credentials in legacy.items():
+            self.save_credentials(service, credentials)
+        try:
+            self.credentials_file.rename(self.credentials_file.with_name(self.credentials_file.name + '.migrated'))
+        except FileNotFoundError:
+            # Another worker process migrated it first; the upserts above were idempotent
+            return
+        print(f"Migrated {len(legacy)} services from {self.credentials_file}")
     
     def encrypt_credentials(self, credentials: dict) -> str:
         """Encrypt credentials dictionary"""
-        json_str = json.dumps(credentials)
-        encrypted = self.cipher.encrypt(json_str.encode())
-        return encrypted.decode()
+        with CREDENTIAL_CRYPTO_SECONDS.labels(operation='encrypt').time():
+            json_str = json.dumps(credentials)
+            return self.cipher.encrypt(json_str.encode()).decode()
     
-    def decrypt_credentials(self) -> dict:
-        """Decrypt stored credentials"""
-        if not self.credentials_file.exists():
+    def _decrypt_token(self, token: str) -> dict:
+        with CREDENTIAL_CRYPTO_SECONDS.labels(operation='decrypt').time():
+            return json.loads(self.cipher.decrypt(token.encode()).decode())
+    
+    def decrypt_credentials(self, user_id: str = DEFAULT_USER) -> dict:
+        """Decrypt every stored service for a user"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT service, token FROM credentials WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        all_creds = {}
+        for service, token in rows:
+            try:
+                all_creds[service] = self._decrypt_token(token)
+            except Exception as e:
+                print(f"Error decrypting credentials for {service}: {e}")
+        return all_creds
+    
+    def save_credentials(self, service: str, credentials: dict, user_id: str = DEFAULT_USER):
+        """Save encrypted credentials for a service"""
+        token = self.encrypt_credentials(credentials)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO credentials (user_id, service, token, key_id, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, service) DO UPDATE SET token = excluded.token, "
+                "key_id = excluded.key_id, updated_at = excluded.updated_at",
+                (user_id, service, token, self.key_id, time.time())
+            )
+    
+    def get_credentials(self, service: str, user_id: str = DEFAULT_USER) -> dict:
+        """Get credentials for a specific service"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT token FROM credentials WHERE user_id = ? AND service = ?", (user_id, service)
+            ).fetchone()
+        if not row:
             return {}
-        
         try:
-            with open(self.credentials_file, 'r') as f:
-                encrypted_data = f.read()
-            decrypted = self.cipher.decrypt(encrypted_data.encode())
-            return json.loads(decrypted.decode())
+            return self._decrypt_token(row[0])
         except Exception as e:
-            print(f"Error decrypting credentials: {e}")
+            print(f"Error decrypting credentials for {service}: {e}")
             return {}
     
-    def save_credentials(self, service: str, credentials: dict):
+    def delete_credentials(self, service: str, user_id: str = DEFAULT_USER):
+        """Delete credentials for a service"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM credentials WHERE user_id = ? AND service = ?", (user_id, service))
+    
+    def check_decryptable(self) -> str:
+        """
+        Decrypt the most recently written record, or round-trip a probe through the
+        cipher when the store is empty. Raises if the configured keys can't read it.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT token, service FROM credentials ORDER BY updated_at DESC LIMIT 1"
+            ).fetchone()
+        if not row:
+            if self._decrypt_token(self.encrypt_credentials({"probe": True})) != {"probe": True}:
+                raise ValueError("Encryption key round-trip returned different data")
+            return "no stored credentials; key round-trip ok"
+        try:
+            self._decrypt_token(row[0])
+        except InvalidToken:
+            raise ValueError(f"Stored {row[1]} credentials cannot be decrypted with the configured keys")
+        return "stored credentials decrypt"
+    
+    def rotate_batch(self, after_rowid: int = 0, batch_size: int = None) -> Tuple[int, int, Optional[int]]:
+        """
+        Re-encrypt the next batch of records still under a retired key with the
+        current key, scanning in rowid order after after_rowid.
+        Returns (rotated, undecryptable, last_rowid); last_rowid is None when done.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rowid, user_id, service, token, key_id FROM credentials "
+                "WHERE key_id != ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                (self.key_id, after_rowid, batch_size or settings.CREDENTIAL_ROTATION_BATCH)
+            ).fetchall()
+            rotated = undecryptable = 0
+            for rowid, user_id, service, token, old_key_id in rows:
+                try:
+                    new_token = self.cipher.rotate(token.encode()).decode()
+                except InvalidToken:
+                    # Encrypted with a key that is no longer configured
+                    undecryptable += 1
+                    continue
+                # Skip records rewritten since they were read
+                rotated += conn.execute(
+                    "UPDATE credentials SET token = ?, key_id = ? "
+                    "WHERE user_id = ? AND service = ? AND key_id = ?",
+                    (new_token, self.key_id, user_id, service, old_key_id)
+                ).rowcount
+        return rotated, undecryptable, (rows[-1][0] if rows else None)
+    
+    def pending_rotation(self) -> int:
+        """Records not yet encrypted with the current key"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM credentials WHERE key_id != ?", (self.key_id,)
+            ).fetchone()[0]
+    
+    async def _run_crypto(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    async def rotate_keys(self, pause: float = 0.5):
+        """Background key rotation, one batch at a time so request handlers keep priority"""
+        total = failed = 0
+        last_rowid = 0
+        while True:
+            rotated, undecryptable, last_rowid = await self._run_crypto(self.rotate_batch, last_rowid)
+            total += rotated
+            failed += undecryptable
+            if last_rowid is None:
+                break
+            await asyncio.sleep(pause)
+        if total:
+            print(f"Re-encrypted {total} credential records with the current key")
+        if failed:
+            print(f"{failed} credential records are encrypted with a key that is no longer configured")
+    
+    async def decrypt_credentials_async(self, user_id: str = DEFAULT_USER) -> dict:
+        """Decrypt every stored service for a user without blocking the event loop"""
+        return await self._run_crypto(self.decrypt_credentials, user_id)
+    
+    async def save_credentials_async(self, service: str, credentials: dict, user_id: str = DEFAULT_USER):
         """Save encrypted credentials for a service"""
-        all_creds = self.decrypt_credentials()
-        all_creds[service] = credentials
-        encrypted = self.encrypt_credentials(all_creds)
-        
-        with open(self.credentials_file, 'w') as f:
-            f.write(encrypted)
-    
-    def get_credentials(self, service: str) -> dict:
+        await self._run_crypto(self.save_credentials, service, credentials, user_id)
+    
+    async def get_credentials_async(self, service: str, user_id: str = DEFAULT_USER) -> dict:
         """Get credentials for a specific service"""
-        creds = self.decrypt_credentials()
-        return creds.get(service, {})
+        return await self._run_crypto(self.get_credentials, service, user_id)
     
-    def delete_credentials(self, service: str):
+    async def delete_credentials_async(self, service: str, user_id: str = DEFAULT_USER):
         """Delete credentials for a service"""
-        all_creds = self.decrypt_credentials()
-        if service in all_creds:
-            del all_creds[service]
-        encrypted = self.encrypt_credentials(all_creds)
-        
-        with open(self.credentials_file, 'w') as f:
-            f.write(encrypted)
+        await self._run_crypto(self.delete_credentials, service, user_id)
 
 
 credential_manager = CredentialManager()
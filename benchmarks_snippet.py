@@ -0,0 +1,941 @@
+
+# 13. benchmarks/mock_platforms.py - Local stand-ins for the platform APIs
+mock_platforms_py = '''"""
+VAMP Benchmark Mock Platforms
+aiohttp stand-ins for the endpoints used by connectors/session_based.py:
+
+  Outlook      GET      /outlook/me/mailFolders[/{id}/childFolders]  (folder tree)
+               GET      /outlook/me/mailFolders/{id}/messages    (@odata.nextLink)
+               GET      /outlook/me/messages/{id}                (full body, for include_content)
+  OneDrive     GET      /graph/me/drive/recent                   (@odata.nextLink)
+  Google Drive GET      /drive/files                             (nextPageToken)
+               GET      /drive/files/{id}/export                 (Docs as text, for include_content)
+  Nextcloud    PROPFIND /remote.php/dav/files/{user}/...         (one directory per page)
+
+plus the session pre-flight endpoints (/outlook/me, /graph/me, /drive/about).
+
+eFundi has no HTTP client yet (the connector returns a placeholder), so it has no mock.
+Datasets are generated from a seed, so runs with the same options are comparable.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+from pydantic import BaseModel, Field
+
+TITLE_WORDS = [
+    "policy", "research", "teaching", "assessment", "module", "report", "minutes",
+    "community", "engagement", "publication", "supervision", "curriculum", "review",
+    "ethics", "innovation", "faculty", "postgraduate", "workshop", "funding", "draft"
+]
+
+
+class MockPlatformOptions(BaseModel):
+    """Dataset and fault-injection settings shared by every mock platform"""
+    items_per_platform: int = Field(default=500, ge=0)
+    page_size: int = Field(default=100, ge=1)
+    latency_ms: float = Field(default=20.0, ge=0)
+    jitter_ms: float = Field(default=5.0, ge=0)
+    rate_limit_every: int = Field(default=0, ge=0)  # every Nth request gets 429 (0 = never)
+    retry_after_seconds: int = 1
+    reject_sessions: bool = False  # answer every request with 401, as for expired cookies
+    year: int = 2025
+    seed: int = 1
+    nextcloud_user: str = "bench"
+    outlook_folders: int = Field(default=4, ge=1)  # inbox, then top-level folders; the last is a subfolder
+
+
+class MockPlatformServer:
+    """One aiohttp server hosting every mock platform"""
+
+    def __init__(self, options: MockPlatformOptions = None):
+        self.options = options or MockPlatformOptions()
+        self.base_url: Optional[str] = None
+        self.requests = 0
+        self.throttled = 0
+        self._rng = random.Random(self.options.seed)
+        self._items = self._generate_items()
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application(middlewares=[self._fault_middleware])
+        self.app.router.add_get('/outlook/me', self.profile)
+        self.app.router.add_get('/graph/me', self.profile)
+        self.app.router.add_get('/drive/about', self.profile)
+        self.app.router.add_get('/outlook/me/mailFolders', self.outlook_folders)
+        self.app.router.add_get('/outlook/me/mailFolders/{folder}', self.outlook_folder)
+        self.app.router.add_get('/outlook/me/mailFolders/{folder}/childFolders', self.outlook_folders)
+        self.app.router.add_get('/outlook/me/mailFolders/{folder}/messages', self.outlook_messages)
+        self.app.router.add_get('/outlook/me/messages/{message}', self.outlook_message_body)
+        self.app.router.add_get('/outlook/me/messages/{message}/attachments/{attachment}/$value',
+                                self.outlook_attachment)
+        self.app.router.add_get('/graph/me/drive/recent', self.graph_recent)
+        self.app.router.add_get('/drive/files', self.drive_files)
+        self.app.router.add_get('/drive/files/{file}/export', self.drive_export)
+        self.app.router.add_route('PROPFIND', '/remote.php/dav/files/{user}/{path:.*}', self.nextcloud_propfind)
+
+    def _generate_items(self) -> List[Dict[str, Any]]:
+        start = datetime(self.options.year, 1, 1)
+        # Modified times stay in the scanned year too: Nextcloud filters on them
+        end = datetime(self.options.year, 12, 31, 23, 59)
+        items = []
+        for i in range(self.options.items_per_platform):
+            created = start + timedelta(minutes=self._rng.randrange(0, 364 * 24 * 60))
+            words = self._rng.sample(TITLE_WORDS, 4)
+            items.append({
+                'n': i,
+                'title': " ".join(words).capitalize(),
+                'description': f"{words[0]} and {words[1]} evidence for the {words[2]} portfolio",
+                'created': created,
+                'modified': min(created + timedelta(days=self._rng.randrange(0, 30)), end),
+                'size': self._rng.randrange(1_000, 5_000_000)
+            })
+        return items
+
+    @web.middleware
+    async def _fault_middleware(self, request: web.Request, handler):
+        self.requests += 1
+        delay = self.options.latency_ms + self._rng.uniform(0, self.options.jitter_ms)
+        await asyncio.sleep(delay / 1000)
+        if self.options.reject_sessions:
+            return web.json_response({'error': {'code': 'InvalidAuthenticationToken'}}, status=401)
+        if self.options.rate_limit_every and self.requests % self.options.rate_limit_every == 0:
+            self.throttled += 1
+            return web.json_response(
+                {'error': {'code': 'TooManyRequests'}}, status=429,
+                headers={'Retry-After': str(self.options.retry_after_seconds)}
+            )
+        return await handler(request)
+
+    def _page(self, offset: int, size: int) -> List[Dict[str, Any]]:
+        return self._items[offset:offset + min(size, self.options.page_size)]
+
+    @staticmethod
+    def _iso(dt: datetime) -> str:
+        return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    async def profile(self, request: web.Request) -> web.Response:
+        return web.json_response({'id': 'bench', 'displayName': 'Benchmark User'})
+
+    def _outlook_folder_ids(self) -> List[str]:
+        return ['inbox'] + [f"folder-{k}" for k in range(1, self.options.outlook_folders)]
+
+    def _outlook_parent(self, folder_id: str) -> Optional[str]:
+        # With three or more folders the last one is a subfolder of folder-1
+        count = self.options.outlook_folders
+        return 'folder-1' if count >= 3 and folder_id == f"folder-{count - 1}" else None
+
+    def _outlook_folder_items(self, folder_id: str) -> List[Dict[str, Any]]:
+        index = self._outlook_folder_ids().index(folder_id)
+        return [item for item in self._items if item['n'] % self.options.outlook_folders == index]
+
+    async def outlook_folders(self, request: web.Request) -> web.Response:
+        parent = request.match_info.get('folder')
+        body = {'value': [{
+            'id': folder_id,
+            'displayName': 'Inbox' if folder_id == 'inbox' else f"Folder {folder_id[7:]}",
+            'totalItemCount': len(self._outlook_folder_items(folder_id)),
+            'childFolderCount': sum(1 for f in self._outlook_folder_ids() if self._outlook_parent(f) == folder_id)
+        } for folder_id in self._outlook_folder_ids() if self._outlook_parent(folder_id) == parent]}
+        return web.json_response(body)
+
+    async def outlook_folder(self, request: web.Request) -> web.Response:
+        folder_id = request.match_info['folder']
+        if folder_id not in self._outlook_folder_ids():
+            return web.json_response({'error': {'code': 'ErrorItemNotFound'}}, status=404)
+        return web.json_response({'id': folder_id})
+
+    async def outlook_messages(self, request: web.Request) -> web.Response:
+        folder_id = request.match_info['folder']
+        if folder_id not in self._outlook_folder_ids():
+            return web.json_response({'error': {'code': 'ErrorItemNotFound'}}, status=404)
+        items = self._outlook_folder_items(folder_id)
+        skip = int(request.query.get('$skip', 0))
+        top = min(int(request.query.get('$top', self.options.page_size)), self.options.page_size)
+        page = items[skip:skip + top]
+        expand = 'attachments' in request.query.get('$expand', '')
+        messages = []
+        for item in page:
+            message = {
+                'id': f"msg-{item['n']}",
+                'subject': item['title'],
+                'bodyPreview': item['description'],
+                'receivedDateTime': self._iso(item['created']),
+                'from': {'emailAddress': {'address': f"colleague{item['n'] % 50}@nwu.ac.za"}},
+                'hasAttachments': item['n'] % 3 == 0
+            }
+            if expand:
+                message['attachments'] = [{
+                    'id': f"att-{item['n']}",
+                    'name': f"{item['title']}.pdf",
+                    'contentType': 'application/pdf',
+                    'size': item['size'],
+                    'isInline': False
+                }] if item['n'] % 3 == 0 else []
+            messages.append(message)
+        body = {'value': messages}
+        if skip + len(page) < len(items):
+            body['@odata.nextLink'] = (
+                f"{self.base_url}/outlook/me/mailFolders/{folder_id}/messages?$skip={skip + len(page)}&$top={top}"
+                + ("&$expand=attachments" if expand else "")
+            )
+        return web.json_response(body)
+
+    async def outlook_message_body(self, request: web.Request) -> web.Response:
+        n = int(request.match_info['message'].rsplit('-', 1)[-1])
+        item = self._items[n]
+        paragraphs = "".join(f"<p>{item['description']} ({k + 1})</p>" for k in range(20))
+        return web.json_response({'body': {
+            'contentType': 'html',
+            'content': f"<html><body><h1>{item['title']}</h1>{paragraphs}</body></html>"
+        }})
+
+    async def outlook_attachment(self, request: web.Request) -> web.Response:
+        message_id = request.match_info['message']
+        return web.Response(body=f"%PDF attachment of {message_id}".encode(), content_type='application/pdf')
+
+    async def graph_recent(self, request: web.Request) -> web.Response:
+        skip = int(request.query.get('$skip', 0))
+        page = self._page(skip, self.options.page_size)
+        body = {'value': [{
+            'id': f"drive-item-{item['n']}",
+            'name': f"{item['title']}.docx",
+            'createdDateTime': self._iso(item['created']),
+            'lastModifiedDateTime': self._iso(item['modified']),
+            'webUrl': f"{self.base_url}/graph/items/{item['n']}",
+            'size': item['size'],
+            'parentReference': {'path': '/drive/root:/Documents'},
+            'file': {'mimeType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'}
+        } for item in page]}
+        if skip + len(page) < len(self._items):
+            body['@odata.nextLink'] = f"{self.base_url}/graph/me/drive/recent?$skip={skip + len(page)}"
+        return web.json_response(body)
+
+    async def drive_files(self, request: web.Request) -> web.Response:
+        offset = int(request.query.get('pageToken', 0))
+        size = int(request.query.get('pageSize', self.options.page_size))
+        page = self._page(offset, size)
+        body = {'files': [{
+            'id': f"gdrive-{item['n']}",
+            'name': item['title'],
+            'createdTime': self._iso(item['created']),
+            'modifiedTime': self._iso(item['modified']),
+            'webViewLink': f"{self.base_url}/drive/view/{item['n']}",
+            'mimeType': 'application/vnd.google-apps.document',
+            'size': str(item['size'])
+        } for item in page]}
+        if offset + len(page) < len(self._items):
+            body['nextPageToken'] = str(offset + len(page))
+        return web.json_response(body)
+
+    async def drive_export(self, request: web.Request) -> web.Response:
+        item = self._items[int(request.match_info['file'].rsplit('-', 1)[-1])]
+        return web.Response(text=f"{item['title']}\\n\\n{item['description']}", content_type='text/plain')
+
+    async def nextcloud_propfind(self, request: web.Request) -> web.Response:
+        user = request.match_info['user']
+        path = request.match_info['path'].strip('/')
+        root = f"/remote.php/dav/files/{user}/"
+        responses = [self._dav_collection(request.path)]
+
+        directories = -(-len(self._items) // self.options.page_size)
+        if not path:
+            # Root holds one directory per page of files
+            responses += [self._dav_collection(f"{root}dir-{d}/") for d in range(directories)]
+        elif path.startswith('dir-') and path[4:].isdigit():
+            offset = int(path[4:]) * self.options.page_size
+            responses += [self._dav_file(f"{root}{path}/", item)
+                          for item in self._page(offset, self.options.page_size)]
+        else:
+            return web.Response(status=404)
+
+        body = (
+            '<?xml version="1.0"?>'
+            '<d:multistatus xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+            + "".join(responses) +
+            '</d:multistatus>'
+        )
+        return web.Response(status=207, text=body, content_type='application/xml')
+
+    @staticmethod
+    def _dav_collection(href: str) -> str:
+        return (
+            f'<d:response><d:href>{escape(href)}</d:href><d:propstat><d:prop>'
+            '<d:resourcetype><d:collection/></d:resourcetype>'
+            '</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+        )
+
+    def _dav_file(self, directory: str, item: Dict[str, Any]) -> str:
+        href = f"{directory}{item['title'].replace(' ', '%20')}-{item['n']}.pdf"
+        return (
+            f'<d:response><d:href>{escape(href)}</d:href><d:propstat><d:prop>'
+            f'<d:getlastmodified>{format_datetime(item["modified"].replace(tzinfo=timezone.utc), usegmt=True)}</d:getlastmodified>'
+            f'<d:getcontentlength>{item["size"]}</d:getcontentlength>'
+            '<d:getcontenttype>application/pdf</d:getcontenttype><d:resourcetype/>'
+            f'<oc:fileid>{item["n"] + 1000}</oc:fileid>'
+            f'<oc:owner-display-name>{self.options.nextcloud_user}</oc:owner-display-name>'
+            '</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+        )
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    def patch_connectors(self):
+        """Point the cookie-based connectors at this server (current process only)"""
+        from connectors.session_based import GoogleDriveConnector, OneDriveConnector, OutlookConnector
+        OutlookConnector.BASE_URL = f"{self.base_url}/outlook"
+        OneDriveConnector.BASE_URL = f"{self.base_url}/graph"
+        GoogleDriveConnector.BASE_URL = f"{self.base_url}/drive"
+
+    def nextcloud_credentials(self) -> Dict[str, str]:
+        return {'base_url': self.base_url, 'username': self.options.nextcloud_user, 'password': 'bench'}
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+'''
+
+print("=== BENCHMARKS/MOCK_PLATFORMS.PY ===")
+print(mock_platforms_py[:2000])
+print(f"\n... [Full file is {len(mock_platforms_py.splitlines())} lines] ...\n")
+
+
+# 14. benchmarks/run_benchmarks.py - End-to-end throughput and latency benchmarks
+run_benchmarks_py = '''"""
+VAMP Benchmark Runner
+Drives the real API (uvicorn in this process) against the mock platforms and
+prints a JSON report for regression tracking:
+
+    python -m benchmarks.run_benchmarks --items 2000 --latency-ms 30 --output bench.json
+
+Scenarios:
+  sync       POST /api/scrape, latency per request
+  async      POST /api/scrape/async, then poll /api/scans/{id} until it finishes
+  websocket  POST /api/scrape/async and stream /ws/{scan_id} until "completed"
+
+Job workers run as coroutines in this process so they reach the mock platforms;
+all state (queue, evidence, credentials, traces) lives in a temporary directory.
+Runs are spread round-robin over --users simulated users.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from benchmarks.mock_platforms import MockPlatformOptions, MockPlatformServer
+
+try:
+    import resource
+except ImportError:
+    # Windows: peak RSS is not reported
+    resource = None
+
+logger = logging.getLogger("benchmarks")
+
+SCENARIOS = ["sync", "async", "websocket"]
+PLATFORMS = ["outlook", "onedrive", "google_drive", "nextcloud"]
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 2)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _bench_user(index: int) -> str:
+    return f"bench-user-{index}"
+
+
+def _isolate_state(workdir: Path, workers: int):
+    """Settings are read at import, so this must run before the app is imported"""
+    os.environ.update({
+        'JOB_QUEUE_PATH': str(workdir / 'jobs.db'),
+        'EVIDENCE_STORE_PATH': str(workdir / 'evidence.db'),
+        'CREDENTIALS_FILE': str(workdir / 'credentials.enc'),
+        'CREDENTIAL_STORE_PATH': str(workdir / 'credentials.db'),
+        'TRACE_STORE_PATH': str(workdir / 'traces.db'),
+        'SCHEDULE_STORE_PATH': str(workdir / 'schedules.db'),
+        'SCHEDULER_ENABLED': 'False',
+        'PUBSUB_BACKEND': 'inprocess',
+        'JOB_WORKERS_EMBEDDED': 'False',
+        'JOB_WORKERS': str(workers),
+        'JOB_POLL_INTERVAL': '0.05',
+        # Status polling would otherwise be throttled by the per-user API rate limit
+        'USER_API_RATE': '0',
+        # The runner asserts its simulated users' ids like an authenticating proxy
+        'TRUSTED_PROXIES': '127.0.0.1',
+    })
+
+
+class BenchmarkResult:
+    """Latencies and counts for one scenario on one platform"""
+
+    def __init__(self, scenario: str, platform: str):
+        self.scenario = scenario
+        self.platform = platform
+        self.latencies_ms: List[float] = []
+        self.first_item_ms: List[float] = []
+        self.items = 0
+        self.errors = 0
+        self.wall_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = {
+            "scenario": self.scenario,
+            "platform": self.platform,
+            "runs": len(self.latencies_ms) + self.errors,
+            "errors": self.errors,
+            "items": self.items,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "items_per_sec": round(self.items / self.wall_seconds, 1) if self.wall_seconds else None,
+            "latency_ms": {
+                "p50": _percentile(self.latencies_ms, 50),
+                "p99": _percentile(self.latencies_ms, 99),
+                "max": round(max(self.latencies_ms), 2) if self.latencies_ms else None
+            }
+        }
+        if self.first_item_ms:
+            report["first_item_ms"] = {
+                "p50": _percentile(self.first_item_ms, 50),
+                "p99": _percentile(self.first_item_ms, 99)
+            }
+        return report
+
+
+class BenchmarkRunner:
+    def __init__(self, args: argparse.Namespace, api_url: str, user_header: str):
+        self.args = args
+        self.api_url = api_url
+        self.ws_url = api_url.replace('http://', 'ws://')
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+        self.user_header = user_header
+        self._users = itertools.cycle([_bench_user(i) for i in range(args.users)])
+
+    def _next_user(self) -> str:
+        return next(self._users)
+
+    def _scrape_body(self, platform: str) -> Dict[str, Any]:
+        return {
+            "platform": platform,
+            "start_month": 1,
+            "end_month": 12,
+            "start_year": self.args.year,
+            "end_year": self.args.year
+        }
+
+    async def run(self, session: aiohttp.ClientSession, scenario: str, platform: str) -> BenchmarkResult:
+        result = BenchmarkResult(scenario, platform)
+        method = getattr(self, f"_run_{scenario}")
+        started = time.perf_counter()
+        await asyncio.gather(*(method(session, platform, result) for _ in range(self.args.runs)))
+        result.wall_seconds = time.perf_counter() - started
+        return result
+
+    async def _run_sync(self, session: aiohttp.ClientSession, platform: str, result: BenchmarkResult):
+        async with self.semaphore:
+            started = time.perf_counter()
+            async with session.post(f"{self.api_url}/api/scrape", json=self._scrape_body(platform),
+                                    headers={self.user_header: self._next_user()}) as resp:
+                body = await resp.json()
+            if resp.status != 200:
+                result.errors += 1
+                return
+            result.latencies_ms.append((time.perf_counter() - started) * 1000)
+            result.items += body['total_items']
+
+    async def _submit(self, session: aiohttp.ClientSession, platform: str, user: str) -> Optional[str]:
+        async with session.post(f"{self.api_url}/api/scrape/async", json=self._scrape_body(platform),
+                                headers={self.user_header: user}) as resp:
+            if resp.status != 200:
+                return None
+            return (await resp.json())['scan_id']
+
+    async def _run_async(self, session: aiohttp.ClientSession, platform: str, result: BenchmarkResult):
+        async with self.semaphore:
+            started = time.perf_counter()
+            user = self._next_user()
+            scan_id = await self._submit(session, platform, user)
+            deadline = started + self.args.timeout
+            while scan_id and time.perf_counter() < deadline:
+                async with session.get(f"{self.api_url}/api/scans/{scan_id}",
+                                       headers={self.user_header: user}) as resp:
+                    scan = await resp.json()
+                if scan['status'] in TERMINAL_STATUSES:
+                    break
+                await asyncio.sleep(0.05)
+            else:
+                result.errors += 1
+                return
+            if scan['status'] != 'completed':
+                result.errors += 1
+                return
+            result.latencies_ms.append((time.perf_counter() - started) * 1000)
+            result.items += scan['evidence_count']
+
+    async def _run_websocket(self, session: aiohttp.ClientSession, platform: str, result: BenchmarkResult):
+        async with self.semaphore:
+            started = time.perf_counter()
+            user = self._next_user()
+            scan_id = await self._submit(session, platform, user)
+            if not scan_id:
+                result.errors += 1
+                return
+            # since=0 replays anything published before the socket opened
+            async with session.ws_connect(f"{self.ws_url}/ws/{scan_id}?since=0&user={user}") as ws:
+                try:
+                    items = await asyncio.wait_for(self._consume(ws, started, result), self.args.timeout)
+                except asyncio.TimeoutError:
+                    items = None
+            if items is None:
+                result.errors += 1
+                return
+            result.latencies_ms.append((time.perf_counter() - started) * 1000)
+            result.items += items
+
+    async def _consume(self, ws: aiohttp.ClientWebSocketResponse, started: float,
+                       result: BenchmarkResult) -> Optional[int]:
+        """Count evidence messages until the scan completes; None if the socket closes first"""
+        items = 0
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            message = json.loads(msg.data)
+            if message['type'] == 'evidence':
+                if not items:
+                    result.first_item_ms.append((time.perf_counter() - started) * 1000)
+                items += 1
+            elif message['type'] == 'status' and message['data'].get('status') == 'completed':
+                return items
+        return None
+
+
+async def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix='vamp-bench-'))
+    _isolate_state(workdir, args.workers)
+
+    import uvicorn
+    from config import credential_manager
+    from jobs import run_worker
+    import main
+
+    platforms = MockPlatformServer(MockPlatformOptions(
+        items_per_platform=args.items,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit_every=args.rate_limit_every,
+        reject_sessions=args.reject_sessions,
+        year=args.year,
+        seed=args.seed
+    ))
+    await platforms.start()
+    platforms.patch_connectors()
+    for i in range(args.users):
+        await credential_manager.save_credentials_async(
+            'nextcloud', platforms.nextcloud_credentials(), user_id=_bench_user(i)
+        )
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=port,
+                                           log_level='warning', ws='auto'))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    stop_workers = threading.Event()
+    workers = [asyncio.create_task(run_worker(f"bench-{i}", stop_workers, main.job_queue))
+               for i in range(args.workers)]
+
+    runner = BenchmarkRunner(args, f"http://127.0.0.1:{port}", main.settings.USER_HEADER)
+    results = []
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+            for scenario in args.scenarios:
+                for platform in args.platforms:
+                    logger.info(f"Running {scenario} on {platform}")
+                    result = await runner.run(session, scenario, platform)
+                    results.append(result.to_dict())
+    finally:
+        stop_workers.set()
+        await asyncio.gather(*workers, return_exceptions=True)
+        server.should_exit = True
+        await server_task
+        await platforms.stop()
+
+    return {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": sys.version.split()[0],
+        "options": {k: v for k, v in vars(args).items() if k != 'output'},
+        "mock_platforms": {"requests": platforms.requests, "throttled": platforms.throttled},
+        "results": results,
+        "peak_rss_mb": _peak_rss_mb(),
+        "workdir": str(workdir)
+    }
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="VAMP end-to-end benchmarks")
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS),
+                        type=lambda v: v.split(','), help="comma-separated: " + ", ".join(SCENARIOS))
+    parser.add_argument('--platforms', default=",".join(PLATFORMS),
+                        type=lambda v: v.split(','), help="comma-separated platform ids")
+    parser.add_argument('--items', type=int, default=500, help="dataset size per platform")
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="mock platform latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=5.0)
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="return 429 on every Nth request")
+    parser.add_argument('--reject-sessions', action='store_true',
+                        help="platforms reject every session (measures fail-fast on expired cookies)")
+    parser.add_argument('--runs', type=int, default=5, help="scans per scenario and platform")
+    parser.add_argument('--concurrency', type=int, default=5)
+    parser.add_argument('--users', type=int, default=5, help="simulated users the runs are spread over")
+    parser.add_argument('--workers', type=int, default=2, help="in-process job workers")
+    parser.add_argument('--timeout', type=float, default=120.0, help="seconds per scan")
+    parser.add_argument('--year', type=int, default=2025)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    report = asyncio.run(run_benchmarks(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+'''
+
+print("=== BENCHMARKS/RUN_BENCHMARKS.PY ===")
+print(run_benchmarks_py[:2000])
+print(f"\n... [Full file is {len(run_benchmarks_py.splitlines())} lines] ...\n")
+
+
+# 16. benchmarks/scoring_corpus.py - Synthetic evidence corpora for the scoring engines
+scoring_corpus_py = '''"""
+VAMP Synthetic Evidence Corpus
+Evidence-shaped items whose text hits each clause pack policy at a controlled rate:
+
+    python -m benchmarks.scoring_corpus --items 100000 --density 0.3 \\\\
+        --policy-density POL-ETH-1=0.8 --output corpus.jsonl
+
+density is the chance an item mentions a given policy; the mentioned terms are
+drawn from that policy's clause patterns, the rest of the text is neutral filler.
+"""
+import argparse
+import json
+import random
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from scoring import CLAUSE_PACKS, TIER_KEYWORDS, VALUES_INDEX
+
+PLATFORMS = ["outlook", "onedrive", "google_drive", "nextcloud", "efundi"]
+
+_CANDIDATE_FILLER = (
+    "annual meeting notes weekly summary module lecture slides first second third year "
+    "faculty campus school office minutes attached agenda item notice memo letter final "
+    "draft version update schedule venue timetable lab group session students lecturers "
+    "project plan outline chapter thesis notes tutorial marks results semester term week "
+    "north west potchefstroom vanderbijlpark mahikeng meeting follow up shared folder file"
+).split()
+
+
+def policy_terms(policy_id: str) -> List[str]:
+    """Literal alternatives in a policy's clause patterns ("conflict.of.interest" -> "conflict of interest")"""
+    terms = []
+    for pattern, _, _ in CLAUSE_PACKS[policy_id]["clauses"]:
+        terms.extend(term.replace('.', ' ') for term in pattern.split('|'))
+    return terms
+
+
+def _neutral_filler() -> List[str]:
+    """Filler words that no clause, value or tier keyword matches, even as a substring"""
+    patterns = [re.compile(p, re.IGNORECASE)
+                for pack in CLAUSE_PACKS.values() for p, _, _ in pack["clauses"]]
+    patterns += [re.compile(w, re.IGNORECASE) for w in VALUES_INDEX]
+    patterns += [re.compile(w, re.IGNORECASE) for words in TIER_KEYWORDS.values() for w in words]
+    return [w for w in dict.fromkeys(_CANDIDATE_FILLER) if not any(p.search(w) for p in patterns)]
+
+
+NEUTRAL_FILLER = _neutral_filler()
+
+
+def generate_corpus(items: int, density: float = 0.3, policy_density: Dict[str, float] = None,
+                    words: int = 24, seed: int = 1, year: int = 2025) -> Iterator[Dict[str, Any]]:
+    """Yield evidence dicts (id, platform, title, description, created_date, metadata)"""
+    rng = random.Random(seed)
+    rates = {policy_id: density for policy_id in CLAUSE_PACKS}
+    rates.update(policy_density or {})
+    terms = {policy_id: policy_terms(policy_id) for policy_id in CLAUSE_PACKS}
+    start = datetime(year, 1, 1)
+
+    for n in range(items):
+        text = rng.choices(NEUTRAL_FILLER, k=max(1, words + rng.randint(-words // 2, words // 2)))
+        mentioned = []
+        for policy_id, rate in rates.items():
+            if rng.random() < rate:
+                mentioned.append(policy_id)
+                for term in rng.sample(terms[policy_id], rng.randint(1, 3)):
+                    text.insert(rng.randrange(len(text) + 1), term)
+        title_words = min(len(text), 6)
+        yield {
+            "id": f"synthetic-{n}",
+            "platform": rng.choice(PLATFORMS),
+            "title": " ".join(text[:title_words]).capitalize(),
+            "description": " ".join(text[title_words:]),
+            "created_date": (start + timedelta(minutes=rng.randrange(0, 364 * 24 * 60))).isoformat(),
+            "metadata": {"policies": mentioned}
+        }
+
+
+def write_corpus(path: Path, **options) -> int:
+    """Write a corpus as JSON lines; returns the item count"""
+    count = 0
+    with open(path, 'w') as f:
+        for item in generate_corpus(**options):
+            f.write(json.dumps(item) + "\\n")
+            count += 1
+    return count
+
+
+def load_corpus(path: Path) -> Iterator[Dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_policy_density(values: List[str]) -> Dict[str, float]:
+    densities = {}
+    for value in values or []:
+        policy_id, _, rate = value.partition('=')
+        if policy_id not in CLAUSE_PACKS:
+            raise ValueError(f"Unknown policy: {policy_id}")
+        densities[policy_id] = float(rate)
+    return densities
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic VAMP evidence corpus")
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--density', type=float, default=0.3, help="per-policy mention rate")
+    parser.add_argument('--policy-density', action='append', metavar='POLICY=RATE',
+                        help="override the rate for one policy (repeatable)")
+    parser.add_argument('--words', type=int, default=24, help="average filler words per item")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+    count = write_corpus(Path(args.output), items=args.items, density=args.density,
+                         policy_density=parse_policy_density(args.policy_density),
+                         words=args.words, seed=args.seed)
+    print(f"Wrote {count} items to {args.output}")
+'''
+
+print("=== BENCHMARKS/SCORING_CORPUS.PY ===")
+print(scoring_corpus_py[:2000])
+print(f"\n... [Full file is {len(scoring_corpus_py.splitlines())} lines] ...\n")
+
+
+# 17. benchmarks/bench_scoring.py - Scoring engine micro-benchmark
+bench_scoring_py = '''"""
+VAMP Scoring Micro-benchmark
+Throughput of each scoring engine over synthetic corpora, as JSON:
+
+    python -m benchmarks.bench_scoring --sizes 1000,10000,100000 --density 0.3
+    python -m benchmarks.bench_scoring --corpus corpus.jsonl
+
+Every engine sees the same texts; MB/s counts UTF-8 bytes of evidence text.
+PolicyMatcher and ClauseScorer run once per policy per item, as in a scan.
+"executor" is the composite scan on the ScoringExecutor process pool
+(--workers, default one per core), to compare against single-core "composite".
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.scoring_corpus import generate_corpus, load_corpus, parse_policy_density
+from scoring import (
+    CLAUSE_PACKS, ClauseScorer, ComplianceScanner, PolicyMatcher, ScoringExecutor, ValuesScorer,
+    evidence_text
+)
+
+ENGINES = ["policy_matcher", "values_scorer", "clause_scorer", "composite", "executor"]
+
+
+def _engine_runners(executor: ScoringExecutor) -> Dict[str, Callable[[List[str]], Any]]:
+    policy_matcher = PolicyMatcher()
+    values_scorer = ValuesScorer()
+    clause_scorer = ClauseScorer()
+    scanner = ComplianceScanner()
+    policies = list(CLAUSE_PACKS)
+
+    def run_policy_matcher(texts):
+        for text in texts:
+            for policy_id in policies:
+                policy_matcher.score(text, policy_id)
+
+    def run_values_scorer(texts):
+        for text in texts:
+            values_scorer.score(text)
+
+    def run_clause_scorer(texts):
+        for text in texts:
+            for policy_id in policies:
+                clause_scorer.score_policy(text, policy_id)
+
+    async def _batches(texts):
+        yield texts
+
+    def run_executor(texts):
+        return asyncio.run(executor.scan(_batches(texts)))
+
+    return {
+        "policy_matcher": run_policy_matcher,
+        "values_scorer": run_values_scorer,
+        "clause_scorer": run_clause_scorer,
+        "composite": scanner.scan,
+        "executor": run_executor
+    }
+
+
+def bench_corpus(texts: List[str], engines: List[str], repeat: int,
+                 executor: ScoringExecutor) -> List[Dict[str, Any]]:
+    runners = _engine_runners(executor)
+    megabytes = sum(len(t.encode()) for t in texts) / (1024 * 1024)
+    results = []
+    for engine in engines:
+        # Best of `repeat` runs
+        seconds = min(_timed(runners[engine], texts) for _ in range(repeat))
+        results.append({
+            "engine": engine,
+            "workers": executor.workers if engine == "executor" else 1,
+            "items": len(texts),
+            "megabytes": round(megabytes, 3),
+            "seconds": round(seconds, 4),
+            "items_per_sec": round(len(texts) / seconds, 1) if seconds else None,
+            "mb_per_sec": round(megabytes / seconds, 3) if seconds else None
+        })
+    return results
+
+
+def _timed(runner: Callable[[List[str]], Any], texts: List[str]) -> float:
+    started = time.perf_counter()
+    runner(texts)
+    return time.perf_counter() - started
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="VAMP scoring engine micro-benchmark")
+    parser.add_argument('--sizes', default="1000,10000", help="comma-separated corpus sizes")
+    parser.add_argument('--corpus', help="JSONL corpus to score instead of generating one")
+    parser.add_argument('--density', type=float, default=0.3)
+    parser.add_argument('--policy-density', action='append', metavar='POLICY=RATE')
+    parser.add_argument('--words', type=int, default=24)
+    parser.add_argument('--engines', default=",".join(ENGINES), type=lambda v: v.split(','))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, help="executor processes (default: one per core)")
+    parser.add_argument('--chunk-size', type=int, help="items per executor task")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output')
+    args = parser.parse_args(argv)
+
+    unknown = set(args.engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+
+    if args.corpus:
+        corpora = {args.corpus: [evidence_text(item) for item in load_corpus(Path(args.corpus))]}
+    else:
+        policy_density = parse_policy_density(args.policy_density)
+        corpora = {
+            size: [evidence_text(item) for item in generate_corpus(
+                int(size), density=args.density, policy_density=policy_density,
+                words=args.words, seed=args.seed
+            )]
+            for size in args.sizes.split(',')
+        }
+
+    executor = ScoringExecutor(workers=args.workers, chunk_size=args.chunk_size)
+    if "executor" in args.engines:
+        # Start the pool outside the timed runs
+        list(executor.pool.map(len, [[]] * executor.workers))
+    results = []
+    try:
+        for name, texts in corpora.items():
+            for result in bench_corpus(texts, args.engines, args.repeat, executor):
+                results.append({"corpus": name, **result})
+    finally:
+        executor.shutdown()
+
+    report = {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": sys.version.split()[0],
+        "options": {k: v for k, v in vars(args).items() if k != 'output'},
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+print("=== BENCHMARKS/BENCH_SCORING.PY ===")
+print(bench_scoring_py[:2000])
+print(f"\n... [Full file is {len(bench_scoring_py.splitlines())} lines] ...\n")
@@ -0,0 +1,331 @@
+
+# 19. connectors/base.py - Connector base class, errors and session checks
+base_py = '''"""
+Base class and errors shared by every platform connector.
+Connector modules (the built-in ones are in connectors/session_based.py) are
+imported through connectors/registry.py only when their platform is first used.
+"""
+import asyncio
+import hashlib
+import html
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from evidence_batch import NO_TIMESTAMP, date_range_mask, epoch_us_column
+from metrics import connector_trace_config
+from tracing import tracing_trace_config
+
+logger = logging.getLogger(__name__)
+
+# One page of raw items plus the cursor to resume after it (None after the last page)
+EvidencePage = Tuple[List[Dict], Optional[Dict[str, Any]]]
+
+# Pre-flight session check outcomes
+SESSION_VALID = "valid"
+SESSION_INVALID = "invalid"
+SESSION_UNKNOWN = "unknown"  # no check for the platform, or the check itself failed
+
+PREFLIGHT_TIMEOUT = 5  # seconds
+
+# Content types fetched as text; anything else (PDF, Office, images) needs an extractor
+TEXT_CONTENT_TYPES = ('text/', 'application/json', 'application/xml', 'application/xhtml+xml')
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def is_text_content(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(TEXT_CONTENT_TYPES)
+
+
+def content_text(data: bytes, content_type: Optional[str]) -> str:
+    """Decoded text of fetched content; HTML is reduced to its text"""
+    text = data.decode('utf-8', errors='replace')
+    if content_type and 'html' in content_type.lower():
+        text = html_text(text)
+    return text
+
+
+def html_text(markup: str) -> str:
+    return " ".join(html.unescape(_HTML_TAG.sub(" ", markup)).split())
+
+
+class ConnectorError(RuntimeError):
+    """Platform request failed; the scan can resume from its last checkpoint"""
+    pass
+
+
+class SessionExpiredError(ConnectorError):
+    """The platform rejected the session cookies or saved credentials; retrying won't help"""
+    pass
+
+
+class SessionConnector(ABC):
+    """Base class for session-based connectors"""
+    
+    def __init__(self, cookies: Dict[str, str] = None, timeout: int = 30):
+        self.cookies = cookies or {}
+        self.timeout = timeout
+        self.session = None
+    
+    @classmethod
+    def from_session(cls, cookies: List[Dict] = None, credentials: Dict = None) -> "SessionConnector":
+        """Build from browser cookies / saved credentials; cookie-based by default"""
+        return cls(cookies={c['name']: c['value'] for c in (cookies or [])})
+    
+    async def __aenter__(self):
+        # Imported here so loading the base class (and the registry) doesn't pull in aiohttp
+        import aiohttp
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[connector_trace_config(self.__class__.__name__), tracing_trace_config()]
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.session:
+            await self.session.close()
+    
+    def _preflight_request(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """(method, url, request kwargs) of a cheap authenticated call, or None"""
+        return None
+    
+    def session_fingerprint(self) -> str:
+        """Hash identifying the session material, for caching check results"""
+        material = json.dumps(sorted(self.cookies.items()))
+        return hashlib.sha256(f"{self.__class__.__name__}:{material}".encode()).hexdigest()
+    
+    async def check_session(self) -> Tuple[str, str]:
+        """
+        Pre-flight check that the platform accepts the session, before any paging.
+        Returns (status, detail); only a 401/403 answer counts as invalid.
+        """
+        request = self._preflight_request()
+        if request is None:
+            return SESSION_UNKNOWN, f"No pre-flight check for {self.__class__.__name__}"
+        if not self.session:
+            raise RuntimeError("Session not initialized")
+        
+        import aiohttp
+        method, url, kwargs = request
+        try:
+            async with self.session.request(method, url, timeout=aiohttp.ClientTimeout(total=PREFLIGHT_TIMEOUT),
+                                            **kwargs) as resp:
+                status = resp.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return SESSION_UNKNOWN, f"Pre-flight request failed: {e}"
+        
+        if status in (401, 403):
+            return SESSION_INVALID, f"{self.__class__.__name__} rejected the session (HTTP {status}); sign in again"
+        if 200 <= status < 300:
+            return SESSION_VALID, "Session accepted"
+        return SESSION_UNKNOWN, f"Pre-flight returned HTTP {status}"
+    
+    def _status_error(self, message: str, status: int) -> ConnectorError:
+        """Error for a failed platform response; auth failures mean the session expired"""
+        if status in (401, 403):
+            return SessionExpiredError(f"{message}: {status} (session expired or revoked)")
+        return ConnectorError(f"{message}: {status}")
+    
+    def _build_cookie_dict(self, cookies_list: List[Dict]) -> Dict:
+        """Build cookie dictionary from list of cookie objects"""
+        cookie_dict = {}
+        for cookie in cookies_list:
+            cookie_dict[cookie.get('name')] = cookie.get('value')
+        return cookie_dict
+    
+    def _filter_by_date_range(self, items: List[Dict], start_date: datetime, 
+                              end_date: datetime, date_field: str = 'created_date') -> List[Dict]:
+        """
+        Keep items whose date_field falls within the range, as one batch stage.
+        Naive dates and bounds are UTC; items with missing or unparseable dates are dropped.
+        """
+        if not items:
+            return items
+        column = epoch_us_column([item.get(date_field) for item in items])
+        mask = date_range_mask(column, start_date, end_date)
+        unparseable = sum(1 for value in column if value == NO_TIMESTAMP)
+        if unparseable:
+            logger.warning(f"{self.__class__.__name__}: {unparseable} item(s) without a valid {date_field}")
+        return [item for item, keep in zip(items, mask) if keep]
+    
+    def _content_headers(self) -> Dict[str, str]:
+        """Headers authenticating content downloads (cookies are always sent)"""
+        return {}
+    
+    async def fetch_content(self, handle: Dict[str, Any], max_bytes: int) -> Optional[str]:
+        """
+        Full content behind an item's content_handle, as text. None when it is
+        not text or larger than max_bytes; those are not downloaded.
+        """
+        if not self.session:
+            raise RuntimeError("Session not initialized")
+        if not is_text_content(handle.get('content_type')) or (handle.get('size') or 0) > max_bytes:
+            return None
+        async with self.session.get(handle['url'], headers=self._content_headers(), cookies=self.cookies) as resp:
+            if resp.status != 200:
+                raise self._status_error(f"{self.__class__.__name__} content error", resp.status)
+            if (resp.content_length or 0) > max_bytes:
+                return None
+            return content_text(await resp.read(), resp.headers.get('Content-Type') or handle.get('content_type'))
+    
+    async def fetch_evidence_pages(self, start_date: datetime, end_date: datetime,
+                                   cursor: Optional[Dict[str, Any]] = None) -> AsyncIterator[EvidencePage]:
+        """
+        Yield (items, next_cursor) per page; next_cursor is None after the last page.
+        Passing a saved cursor continues after that page. Connectors without
+        paging yield a single page.
+        """
+        yield await self.fetch_evidence(start_date, end_date), None
+    
+    async def _collect_pages(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """Fetch every page into one list, keeping what arrived before an error"""
+        evidence_items = []
+        try:
+            async for items, _ in self.fetch_evidence_pages(start_date, end_date):
+                evidence_items.extend(items)
+        except Exception as e:
+            logger.error(f"Error fetching {self.__class__.__name__} evidence: {e}")
+        return evidence_items
+    
+    @abstractmethod
+    async def connect(self):
+        """Establish connection"""
+        pass
+    
+    @abstractmethod
+    async def fetch_evidence(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """Fetch evidence items"""
+        pass
+    
+    @abstractmethod
+    async def disconnect(self):
+        """Close connection"""
+        pass
+
+'''
+
+print("=== CONNECTORS/BASE.PY ===")
+print(base_py[:2000])
+print(f"\n... [Full file is {len(base_py.splitlines())} lines] ...\n")
+
+# 20. connectors/registry.py - Lazily imported connector plugins
+registry_py = '''"""
+VAMP Connector Registry
+Maps platform ids to connector classes. A connector's module is imported the
+first time its platform is used, and the class is cached after that.
+
+Built-in connectors are listed in BUILTIN_CONNECTORS. Installed packages add
+platforms (or replace a built-in one) with an entry point in the
+"vamp.connectors" group, named after the platform id:
+
+    [project.entry-points."vamp.connectors"]
+    moodle = "vamp_moodle.connector:MoodleConnector"
+
+Connector classes subclass connectors.base.SessionConnector and override
+from_session() when they are not built from cookies alone.
+"""
+import importlib
+import logging
+import threading
+from importlib.metadata import entry_points
+from typing import Dict, List, Optional, Type, Union
+
+from connectors.base import SessionConnector
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "vamp.connectors"
+
+# platform id -> "module:Class"
+BUILTIN_CONNECTORS: Dict[str, str] = {
+    'outlook': 'connectors.session_based:OutlookConnector',
+    'onedrive': 'connectors.session_based:OneDriveConnector',
+    'google_drive': 'connectors.session_based:GoogleDriveConnector',
+    'nextcloud': 'connectors.session_based:NextcloudConnector',
+    'efundi': 'connectors.session_based:EFundiConnector',
+}
+
+_targets: Optional[Dict[str, Union[str, Type[SessionConnector]]]] = None
+_classes: Dict[str, Type[SessionConnector]] = {}
+_lock = threading.Lock()
+
+
+def _discover() -> Dict[str, Union[str, Type[SessionConnector]]]:
+    targets: Dict[str, Union[str, Type[SessionConnector]]] = dict(BUILTIN_CONNECTORS)
+    try:
+        plugins = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python < 3.10
+        plugins = entry_points().get(ENTRY_POINT_GROUP, [])
+    for plugin in plugins:
+        if plugin.name in targets:
+            logger.info(f"Connector plugin {plugin.value} replaces {plugin.name}")
+        targets[plugin.name] = plugin.value
+    return targets
+
+
+def _connector_targets() -> Dict[str, Union[str, Type[SessionConnector]]]:
+    global _targets
+    if _targets is None:
+        with _lock:
+            if _targets is None:
+                _targets = _discover()
+    return _targets
+
+
+def register_connector(platform: str, target: Union[str, Type[SessionConnector]]):
+    """Add or replace a platform at runtime, as a class or a "module:Class" path"""
+    targets = _connector_targets()
+    with _lock:
+        targets[platform] = target
+        _classes.pop(platform, None)
+
+
+def available_platforms() -> List[str]:
+    """Every registered platform id, without importing any connector"""
+    return sorted(_connector_targets())
+
+
+def get_connector_class(platform: str) -> Type[SessionConnector]:
+    """The connector class for a platform, importing its module on first use"""
+    connector_cls = _classes.get(platform)
+    if connector_cls is not None:
+        return connector_cls
+
+    target = _connector_targets().get(platform)
+    if target is None:
+        raise ValueError(f"Unknown platform: {platform}")
+    if isinstance(target, str):
+        module_name, _, attribute = target.partition(':')
+        connector_cls = getattr(importlib.import_module(module_name), attribute)
+    else:
+        connector_cls = target
+    if not (isinstance(connector_cls, type) and issubclass(connector_cls, SessionConnector)):
+        raise TypeError(f"Connector for {platform} ({target}) is not a SessionConnector")
+
+    with _lock:
+        _classes[platform] = connector_cls
+    return connector_cls
+
+
+class ConnectorFactory:
+    """Factory for creating appropriate connectors"""
+
+    @staticmethod
+    async def create_connector(platform: str, cookies: List[Dict] = None,
+                               credentials: Dict = None, config_manager=None,
+                               connect: bool = True) -> SessionConnector:
+        """Create connector based on platform; connect=False skips connect() (pre-flight only)"""
+        connector = get_connector_class(platform).from_session(cookies, credentials)
+        if connect:
+            await connector.connect()
+        return connector
+'''
+
+print("=== CONNECTORS/REGISTRY.PY ===")
+print(registry_py[:2000])
+print(f"\n... [Full file is {len(registry_py.splitlines())} lines] ...\n")
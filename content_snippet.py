@@ -0,0 +1,118 @@
+
+# 25. content.py - Lazily resolved evidence content with a size-bounded cache
+content_py = '''"""
+VAMP Agent Evidence Content
+Connectors return each item with a content handle (platform, evidence id,
+fetch URL) instead of its full content. Scrapes that ask for content
+(include_content) resolve the handles in a stage after the date-range and
+keyword filters, so only evidence that is kept is downloaded; everything else
+keeps its handle and costs nothing.
+
+Resolved text is cached per process in an LRU bounded by total size, so
+resumed scans and the overlap of incremental scheduled scans don't download
+the same content twice.
+"""
+import asyncio
+import json
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config import settings
+from connectors.base import ConnectorError, SessionConnector, SessionExpiredError
+from evidence_batch import EvidenceBatch
+from metrics import CONTENT_FETCHES
+
+logger = logging.getLogger(__name__)
+
+# (platform, evidence id, fetch url)
+ContentKey = Tuple[str, str, str]
+
+
+class ContentCache:
+    """Resolved content, least recently used evicted once it holds more than max_bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[ContentKey, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: ContentKey) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, key: ContentKey, text: str):
+        cost = sys.getsizeof(text)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= sys.getsizeof(previous)
+            self._entries[key] = text
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= sys.getsizeof(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+content_cache = ContentCache(settings.CONTENT_CACHE_BYTES)
+
+
+async def resolve_content(connector: SessionConnector, batch: EvidenceBatch,
+                          cache: ContentCache = content_cache, concurrency: int = None,
+                          max_bytes: int = None) -> List[str]:
+    """
+    Fill in content for the batch's unresolved rows through an open connector,
+    at most `concurrency` downloads at a time. Rows whose content is not text,
+    too large or failed to download keep only their handle; the failures are
+    returned as errors. An expired session raises SessionExpiredError.
+    """
+    rows = batch.unresolved_content()
+    if not rows:
+        return []
+    # Imported here so loading content.py (and so main and scraping) doesn't pull in aiohttp
+    import aiohttp
+    semaphore = asyncio.Semaphore(concurrency or settings.CONTENT_FETCH_CONCURRENCY)
+    max_bytes = max_bytes or settings.CONTENT_MAX_BYTES
+    errors = []
+
+    async def resolve(row: int):
+        handle = json.loads(batch.content_handles[row])
+        key = (handle['platform'], handle['evidence_id'], handle['url'])
+        text = cache.get(key)
+        if text is not None:
+            CONTENT_FETCHES.labels(result='cached').inc()
+        else:
+            async with semaphore:
+                try:
+                    text = await connector.fetch_content(handle, max_bytes)
+                except SessionExpiredError:
+                    raise
+                except (ConnectorError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    CONTENT_FETCHES.labels(result='error').inc()
+                    errors.append(f"Error fetching content for {handle['evidence_id']}: {e!r}")
+                    return
+            if text is None:
+                CONTENT_FETCHES.labels(result='skipped').inc()
+                return
+            CONTENT_FETCHES.labels(result='fetched').inc()
+            cache.put(key, text)
+        batch.contents[row] = text
+
+    await asyncio.gather(*(resolve(row) for row in rows))
+    return errors
+'''
+
+print("=== CONTENT.PY ===")
+print(content_py[:2000])
+print(f"\n... [Full file is {len(content_py.splitlines())} lines] ...\n")
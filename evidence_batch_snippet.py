@@ -0,0 +1,272 @@
+
+# 22. evidence_batch.py - Columnar in-memory evidence
+evidence_batch_py = '''"""
+VAMP Agent Columnar Evidence Batches
+Evidence held column by column instead of one Pydantic model per item:
+platform and status are one-byte codes into interned enum tables, timestamps
+are epoch microseconds in int64 arrays, and metadata is kept as its JSON text.
+A 200k-item scan costs a fraction of the memory of 200k Evidence objects, and
+filters run over whole columns.
+
+Pipeline stages (conversion, keyword filtering, content resolution,
+persistence, publishing) work on batches; Evidence models are only built at
+the API edge (to_models).
+
+Date-range filtering is a batch stage too: a page's timestamps are parsed in
+one pass (one NumPy call when numpy is installed), normalized to UTC epoch
+microseconds and compared against the range as integers.
+"""
+import json
+import re
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from models import Evidence, EvidenceStatus, PlatformType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PLATFORMS: List[PlatformType] = list(PlatformType)
+PLATFORM_CODES: Dict[str, int] = {p.value: code for code, p in enumerate(PLATFORMS)}
+STATUSES: List[EvidenceStatus] = list(EvidenceStatus)
+STATUS_CODES: Dict[str, int] = {s.value: code for code, s in enumerate(STATUSES)}
+
+# Stored in the modified column for items without a modified date
+NO_TIMESTAMP = -(2 ** 63)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Trailing UTC offset such as +02:00 or -0500
+_UTC_OFFSET = re.compile(r"[+-]\\d{2}:?\\d{2}$")
+
+
+def to_epoch_us(value: Any) -> int:
+    """ISO string or datetime as UTC epoch microseconds; naive values are taken as UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Not a timestamp: {value!r}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_epoch_us(value: int) -> datetime:
+    return datetime.fromtimestamp(value // 1_000_000, tz=timezone.utc).replace(microsecond=value % 1_000_000)
+
+
+def _iso(value: int) -> str:
+    """Same text as Pydantic's JSON form of an aware UTC datetime"""
+    return from_epoch_us(value).isoformat().replace('+00:00', 'Z')
+
+
+def _epoch_us_or_none(value: Any) -> int:
+    try:
+        return to_epoch_us(value)
+    except (TypeError, ValueError):
+        return NO_TIMESTAMP
+
+
+def _utc_text(value: Any) -> Optional[str]:
+    """ISO text NumPy can parse as UTC: 'Z' stripped, None if it carries another offset"""
+    if not isinstance(value, str) or not value:
+        return None
+    if value.endswith('Z'):
+        return value[:-1]
+    if 'T' in value and _UTC_OFFSET.search(value):
+        return None
+    return value
+
+
+def epoch_us_column(values: Sequence[Any]) -> Sequence[int]:
+    """
+    Timestamps (ISO strings or datetimes) as UTC epoch microseconds, in one
+    pass. Unparseable or missing values become NO_TIMESTAMP. With numpy, UTC
+    and naive strings are parsed by a single datetime64 conversion and only
+    values with other offsets, or datetime objects, go through to_epoch_us.
+    """
+    if numpy is None:
+        return array('q', (_epoch_us_or_none(value) for value in values))
+    column = numpy.full(len(values), NO_TIMESTAMP, dtype=numpy.int64)
+    texts = [_utc_text(value) for value in values]
+    fast = [i for i, text in enumerate(texts) if text is not None]
+    if fast:
+        try:
+            column[fast] = numpy.array([texts[i] for i in fast], dtype='datetime64[us]').astype(numpy.int64)
+        except ValueError:
+            # A malformed string fails the whole conversion; sort it out item by item
+            fast = []
+    parsed = set(fast)
+    for i, value in enumerate(values):
+        if i not in parsed:
+            column[i] = _epoch_us_or_none(value)
+    return column
+
+
+def date_range_mask(column: Sequence[int], start: datetime, end: datetime) -> List[bool]:
+    """
+    Which rows of an epoch_us_column fall within [start, end]. Naive bounds are
+    UTC like naive values, so mixed naive and aware inputs compare correctly;
+    NO_TIMESTAMP rows are outside every range.
+    """
+    low, high = to_epoch_us(start), to_epoch_us(end)
+    if numpy is not None:
+        return ((column >= low) & (column <= high)).tolist()
+    return [low <= value <= high for value in column]
+
+
+class EvidenceBatch:
+    """Columnar evidence: row i of every column is one item"""
+
+    __slots__ = ('ids', 'platforms', 'titles', 'descriptions', 'contents', 'content_handles',
+                 'created', 'modified', 'urls', 'statuses', 'metadata')
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.platforms = array('B')
+        self.titles: List[str] = []
+        self.descriptions: List[Optional[str]] = []
+        self.contents: List[Optional[str]] = []
+        self.content_handles: List[Optional[str]] = []  # ContentHandle JSON text
+        self.created = array('q')
+        self.modified = array('q')
+        self.urls: List[Optional[str]] = []
+        self.statuses = array('B')
+        self.metadata: List[Optional[str]] = []  # JSON text, None for {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, item: Dict[str, Any], platform: PlatformType = None):
+        """
+        Add one raw connector item or stored evidence record.
+        Raises KeyError/ValueError for items that cannot become Evidence; the
+        batch is left unchanged.
+        """
+        title = item['title']
+        if not isinstance(title, str):
+            raise ValueError(f"Evidence title must be a string, got {type(title).__name__}")
+        # Convert everything before touching a column so a bad item adds nothing
+        evidence_id = str(item['id'])
+        platform_value = platform.value if platform else item['platform']
+        platform_code = PLATFORM_CODES[platform_value]
+        created = to_epoch_us(item['created_date'])
+        modified = to_epoch_us(item['modified_date']) if item.get('modified_date') else NO_TIMESTAMP
+        status_code = STATUS_CODES[item.get('status') or EvidenceStatus.COLLECTED.value]
+        metadata = json.dumps(item['metadata']) if item.get('metadata') else None
+        content_handle = None
+        if item.get('content_handle'):
+            handle = item['content_handle']
+            if not isinstance(handle.get('url'), str):
+                raise ValueError("Content handle without a url")
+            content_handle = json.dumps({
+                'platform': platform_value,
+                'evidence_id': evidence_id,
+                'url': handle['url'],
+                'content_type': handle.get('content_type'),
+                'size': handle.get('size')
+            })
+
+        self.ids.append(evidence_id)
+        self.platforms.append(platform_code)
+        self.titles.append(title)
+        self.descriptions.append(item.get('description'))
+        self.contents.append(item.get('content'))
+        self.content_handles.append(content_handle)
+        self.created.append(created)
+        self.modified.append(modified)
+        self.urls.append(item.get('url'))
+        self.statuses.append(status_code)
+        self.metadata.append(metadata)
+
+    def extend_items(self, items: Iterable[Dict[str, Any]], platform: PlatformType = None) -> List[str]:
+        """Add raw items, skipping ones that cannot be converted; returns their errors"""
+        errors = []
+        for item in items:
+            try:
+                self.append(item, platform)
+            except (KeyError, ValueError, TypeError) as e:
+                errors.append(f"Error converting evidence item: {e!r}")
+        return errors
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "EvidenceBatch":
+        """Batch from stored evidence records (Evidence.model_dump(mode='json') dicts)"""
+        batch = cls()
+        for record in records:
+            batch.append(record)
+        return batch
+
+    def extend(self, other: "EvidenceBatch"):
+        for column in self.__slots__:
+            getattr(self, column).extend(getattr(other, column))
+
+    def select(self, indices: Sequence[int]) -> "EvidenceBatch":
+        """New batch with the given rows, in the given order"""
+        batch = EvidenceBatch()
+        for column in self.__slots__:
+            source = getattr(self, column)
+            target = getattr(batch, column)
+            target.extend(source[i] for i in indices)
+        return batch
+
+    def keyword_indices(self, include: Optional[List[str]], exclude: Optional[List[str]]) -> List[int]:
+        """Rows whose title or description contains any include keyword and no exclude keyword"""
+        include = [k.lower() for k in include or []]
+        exclude = [k.lower() for k in exclude or []]
+        if not include and not exclude:
+            return list(range(len(self)))
+        kept = []
+        for index, (title, description) in enumerate(zip(self.titles, self.descriptions)):
+            title, description = title.lower(), (description or '').lower()
+            if include and not any(k in title or k in description for k in include):
+                continue
+            if exclude and any(k in title or k in description for k in exclude):
+                continue
+            kept.append(index)
+        return kept
+
+    def filter_keywords(self, include: Optional[List[str]], exclude: Optional[List[str]]) -> "EvidenceBatch":
+        if not include and not exclude:
+            return self
+        return self.select(self.keyword_indices(include, exclude))
+
+    def unresolved_content(self) -> List[int]:
+        """Rows with a content handle whose content has not been fetched"""
+        return [i for i, (handle, content) in enumerate(zip(self.content_handles, self.contents))
+                if handle is not None and content is None]
+
+    def texts(self) -> List[str]:
+        """Text the scoring engines read for each row (see scoring.evidence_text)"""
+        return [" ".join(filter(None, (title, description, content)))
+                for title, description, content in zip(self.titles, self.descriptions, self.contents)]
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """JSON-ready dicts, identical to Evidence.model_dump(mode='json')"""
+        for i in range(len(self)):
+            yield {
+                'id': self.ids[i],
+                'platform': PLATFORMS[self.platforms[i]].value,
+                'title': self.titles[i],
+                'description': self.descriptions[i],
+                'content': self.contents[i],
+                'content_handle': json.loads(self.content_handles[i]) if self.content_handles[i] else None,
+                'created_date': _iso(self.created[i]),
+                'modified_date': None if self.modified[i] == NO_TIMESTAMP else _iso(self.modified[i]),
+                'url': self.urls[i],
+                'status': STATUSES[self.statuses[i]].value,
+                'metadata': json.loads(self.metadata[i]) if self.metadata[i] else {}
+            }
+
+    def to_models(self) -> List[Evidence]:
+        """Materialize Pydantic models; for the API edge only"""
+        return [Evidence(**record) for record in self.records()]
+'''
+
+print("=== EVIDENCE_BATCH.PY ===")
+print(evidence_batch_py[:2000])
+print(f"\n... [Full file is {len(evidence_batch_py.splitlines())} lines] ...\n")
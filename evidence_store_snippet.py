@@ -0,0 +1,216 @@
+
+# 9. evidence_store.py - Persisted scan evidence and per-platform checkpoints
+evidence_store_py = '''"""
+VAMP Agent Evidence Store
+Persists scan evidence together with each platform's paging checkpoint, and
+the latest scoring aggregates per scan (reused until the evidence changes)
+"""
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EvidenceStore:
+    """SQLite store for scan evidence and resumable checkpoints"""
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or settings.EVIDENCE_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS scan_evidence (
+                    scan_id TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    evidence_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (scan_id, platform, evidence_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_scan_evidence_seq ON scan_evidence (scan_id, seq);
+                CREATE TABLE IF NOT EXISTS scan_checkpoints (
+                    scan_id TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    cursor TEXT,
+                    pages INTEGER NOT NULL DEFAULT 0,
+                    items INTEGER NOT NULL DEFAULT 0,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (scan_id, platform)
+                );
+                CREATE TABLE IF NOT EXISTS scan_scores (
+                    scan_id TEXT PRIMARY KEY,
+                    evidence_version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+
+    def save_page(self, scan_id: str, platform: str, evidence: List[Dict[str, Any]],
+                  cursor: Optional[Dict[str, Any]]):
+        """
+        Persist one page of evidence and the cursor after it in a single transaction,
+        so a checkpoint never points past evidence that was not written.
+        A None cursor marks the platform as done.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) AS seq FROM scan_evidence WHERE scan_id = ?",
+                    (scan_id,)
+                ).fetchone()
+                seq = row['seq']
+                for item in evidence:
+                    seq += 1
+                    # Re-delivered pages overwrite rather than duplicate
+                    conn.execute(
+                        "INSERT INTO scan_evidence (scan_id, platform, evidence_id, seq, data) "
+                        "VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT (scan_id, platform, evidence_id) DO UPDATE SET data = excluded.data",
+                        (scan_id, platform, str(item['id']), seq, json.dumps(item, default=str))
+                    )
+                conn.execute(
+                    "INSERT INTO scan_checkpoints (scan_id, platform, cursor, pages, items, done, updated_at) "
+                    "VALUES (?, ?, ?, 1, ?, ?, ?) "
+                    "ON CONFLICT (scan_id, platform) DO UPDATE SET cursor = excluded.cursor, "
+                    "pages = pages + 1, items = items + excluded.items, done = excluded.done, "
+                    "updated_at = excluded.updated_at",
+                    (scan_id, platform, json.dumps(cursor) if cursor else None, len(evidence),
+                     int(cursor is None), time.time())
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_checkpoint(self, scan_id: str, platform: str) -> Optional[Dict[str, Any]]:
+        """Last saved paging position for a platform, or None if never started"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM scan_checkpoints WHERE scan_id = ? AND platform = ?",
+                (scan_id, platform)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'cursor': json.loads(row['cursor']) if row['cursor'] else None,
+            'pages': row['pages'],
+            'items': row['items'],
+            'done': bool(row['done']),
+            'updated_at': row['updated_at']
+        }
+
+    def checkpoints(self, scan_id: str) -> Dict[str, Dict[str, Any]]:
+        """Checkpoint summary for every platform in a scan"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT platform FROM scan_checkpoints WHERE scan_id = ?", (scan_id,)
+            ).fetchall()
+        return {row['platform']: self.get_checkpoint(scan_id, row['platform']) for row in rows}
+
+    def count_evidence(self, scan_id: str, platform: str = None) -> int:
+        with self._connect() as conn:
+            if platform:
+                row = conn.execute(
+                    "SELECT COUNT(*) AS n FROM scan_evidence WHERE scan_id = ? AND platform = ?",
+                    (scan_id, platform)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT COUNT(*) AS n FROM scan_evidence WHERE scan_id = ?", (scan_id,)
+                ).fetchone()
+        return row['n']
+
+    def iter_evidence(self, scan_id: str, platform: str = None,
+                      batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Yield stored evidence in collection order, batch_size items at a time"""
+        last_seq = 0
+        while True:
+            with self._connect() as conn:
+                query = "SELECT seq, data FROM scan_evidence WHERE scan_id = ? AND seq > ?"
+                params: List[Any] = [scan_id, last_seq]
+                if platform:
+                    query += " AND platform = ?"
+                    params.append(platform)
+                rows = conn.execute(query + " ORDER BY seq LIMIT ?", (*params, batch_size)).fetchall()
+            if not rows:
+                return
+            last_seq = rows[-1]['seq']
+            yield [json.loads(row['data']) for row in rows]
+
+    def evidence_version(self, scan_id: str) -> str:
+        """Changes whenever a page is saved for the scan, including re-delivered pages"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM scan_evidence WHERE scan_id = ?) AS n, "
+                "(SELECT MAX(seq) FROM scan_evidence WHERE scan_id = ?) AS seq, "
+                "(SELECT MAX(updated_at) FROM scan_checkpoints WHERE scan_id = ?) AS updated",
+                (scan_id, scan_id, scan_id)
+            ).fetchone()
+        return f"{row['n']}:{row['seq']}:{row['updated']}"
+
+    def get_scores(self, scan_id: str, evidence_version: str) -> Optional[Dict[str, Any]]:
+        """Scoring aggregates saved for this version of the scan's evidence, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM scan_scores WHERE scan_id = ? AND evidence_version = ?",
+                (scan_id, evidence_version)
+            ).fetchone()
+        return json.loads(row['result']) if row else None
+
+    def save_scores(self, scan_id: str, evidence_version: str, result: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO scan_scores (scan_id, evidence_version, result, updated_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (scan_id) DO UPDATE SET evidence_version = excluded.evidence_version, "
+                "result = excluded.result, updated_at = excluded.updated_at",
+                (scan_id, evidence_version, json.dumps(result), time.time())
+            )
+
+    def load_evidence(self, scan_id: str, platform: str = None) -> List[Dict[str, Any]]:
+        return [item for batch in self.iter_evidence(scan_id, platform) for item in batch]
+
+    def check_writable(self, busy_timeout: float = 1.0):
+        """
+        Take the write lock and write a row inside a transaction that is rolled
+        back. Raises sqlite3.Error if the store is read-only, its disk is full
+        or another writer holds the lock for longer than busy_timeout.
+        """
+        with self._connect() as conn:
+            conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO scan_scores (scan_id, evidence_version, result, updated_at) "
+                    "VALUES ('__readiness__', '', '{}', 0)"
+                )
+            finally:
+                conn.execute("ROLLBACK")
+'''
+
+print("=== EVIDENCE_STORE.PY ===")
+print(evidence_store_py[:2000])
+print(f"\n... [Full file is {len(evidence_store_py.splitlines())} lines] ...\n")
@@ -0,0 +1,192 @@
+
+# 21. export.py - Streaming evidence export (CSV, JSON Lines, Parquet)
+export_py = '''"""
+VAMP Agent Evidence Export
+Streams a scan's stored evidence as CSV, JSON Lines or Parquet. The evidence
+store is read one batch at a time and each batch is encoded and handed to the
+response before the next is read, so server memory stays flat however large
+the scan is.
+
+CSV and JSON Lines can be gzip- or zstd-compressed on the fly. Parquet is
+columnar with one row group per batch; its compression option picks the codec
+used inside the file instead of wrapping it.
+
+Parquet needs pyarrow and zstd needs zstandard; both are optional.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import settings
+from evidence_store import EvidenceStore
+from models import ExportCompression, ExportFormat
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Evidence model fields, in export column order
+EXPORT_COLUMNS = [
+    "id", "platform", "title", "description", "content", "created_date",
+    "modified_date", "url", "status", "metadata"
+]
+DATE_COLUMNS = ("created_date", "modified_date")
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",  # Starlette appends the utf-8 charset
+    ExportFormat.JSONL: "application/x-ndjson",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+COMPRESSED_MEDIA_TYPES = {
+    ExportCompression.GZIP: ("application/gzip", ".gz"),
+    ExportCompression.ZSTD: ("application/zstd", ".zst"),
+}
+
+
+def unavailable_reason(fmt: ExportFormat, compression: ExportCompression) -> Optional[str]:
+    """Why this combination cannot be served here (a missing optional package), or None"""
+    if fmt == ExportFormat.PARQUET and pyarrow is None:
+        return "Parquet export requires pyarrow (pip install pyarrow)"
+    if compression == ExportCompression.ZSTD and fmt != ExportFormat.PARQUET and zstandard is None:
+        return "zstd compression requires zstandard (pip install zstandard)"
+    return None
+
+
+def export_filename(scan_id: str, fmt: ExportFormat, compression: ExportCompression) -> str:
+    name = f"vamp-scan-{scan_id}.{fmt.value}"
+    if fmt != ExportFormat.PARQUET and compression in COMPRESSED_MEDIA_TYPES:
+        name += COMPRESSED_MEDIA_TYPES[compression][1]
+    return name
+
+
+def export_media_type(fmt: ExportFormat, compression: ExportCompression) -> str:
+    if fmt != ExportFormat.PARQUET and compression in COMPRESSED_MEDIA_TYPES:
+        return COMPRESSED_MEDIA_TYPES[compression][0]
+    return MEDIA_TYPES[fmt]
+
+
+def _csv_chunks(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for item in batch:
+            writer.writerow([
+                json.dumps(item.get("metadata") or {}) if column == "metadata" else item.get(column)
+                for column in EXPORT_COLUMNS
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _jsonl_chunks(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(json.dumps(item, default=str) + "\\n" for item in batch).encode()
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # Naive timestamps from the connectors are UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands everything written since the last drain() to the caller"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _parquet_chunks(batches: Iterable[List[Dict[str, Any]]],
+                    compression: ExportCompression) -> Iterator[bytes]:
+    schema = pyarrow.schema([
+        (column, pyarrow.timestamp("us", tz="UTC") if column in DATE_COLUMNS else pyarrow.string())
+        for column in EXPORT_COLUMNS
+    ])
+    codec = "snappy" if compression == ExportCompression.NONE else compression.value
+    sink = _ChunkSink()
+    writer = parquet.ParquetWriter(sink, schema, compression=codec)
+    try:
+        for batch in batches:
+            columns = {column: [] for column in EXPORT_COLUMNS}
+            for item in batch:
+                for column in EXPORT_COLUMNS:
+                    value = item.get(column)
+                    if column in DATE_COLUMNS:
+                        value = _parse_timestamp(value)
+                    elif column == "metadata":
+                        value = json.dumps(value or {})
+                    columns[column].append(value)
+            # One row group per store batch
+            writer.write_table(pyarrow.table(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    # Footer
+    yield sink.drain()
+
+
+def _compress(chunks: Iterator[bytes], compression: ExportCompression) -> Iterator[bytes]:
+    if compression == ExportCompression.GZIP:
+        # wbits=31: gzip container rather than a bare zlib stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    else:
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_evidence(store: EvidenceStore, scan_id: str, fmt: ExportFormat,
+                    compression: ExportCompression = ExportCompression.NONE,
+                    platform: str = None, batch_size: int = None) -> Iterator[bytes]:
+    """
+    Encoded export of a scan's evidence, as a lazy stream of byte chunks.
+    Synchronous: iterate it from a worker thread (StreamingResponse does).
+    """
+    batches = store.iter_evidence(scan_id, platform, batch_size=batch_size or settings.EXPORT_BATCH_SIZE)
+    if fmt == ExportFormat.PARQUET:
+        return _parquet_chunks(batches, compression)
+    chunks = _csv_chunks(batches) if fmt == ExportFormat.CSV else _jsonl_chunks(batches)
+    if compression == ExportCompression.NONE:
+        return chunks
+    return _compress(chunks, compression)
+'''
+
+print("=== EXPORT.PY ===")
+print(export_py[:2000])
+print(f"\n... [Full file is {len(export_py.splitlines())} lines] ...\n")
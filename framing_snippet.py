@@ -0,0 +1,177 @@
+
+# 10. framing.py - Negotiated WebSocket encodings for evidence streams
+framing_py = '''"""
+VAMP Agent WebSocket Framing
+Clients opt into compact encodings through the WebSocket subprotocol:
+
+  vamp.json          text JSON frames (default, same as no subprotocol)
+  vamp.json+deflate  binary frames, JSON compressed with one raw-deflate
+                     stream per connection (shared window, Z_SYNC_FLUSH)
+  vamp.msgpack       binary MessagePack arrays using the field dictionary
+                     sent in the first "schema" frame
+
+Transport-level permessage-deflate is negotiated separately by uvicorn.
+"""
+import json
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi import WebSocket
+
+from models import Evidence, EvidenceStatus, PlatformType
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Positional dictionaries shared with clients through the schema frame
+MESSAGE_TYPES: List[str] = ["status", "evidence", "progress", "error"]
+EVIDENCE_FIELDS: List[str] = list(Evidence.model_fields.keys())
+PLATFORMS: List[str] = [p.value for p in PlatformType]
+STATUSES: List[str] = [s.value for s in EvidenceStatus]
+DATE_FIELDS = {"created_date", "modified_date"}
+
+
+def _epoch_ms(value: Optional[str]) -> Optional[int]:
+    """ISO timestamp (naive values are UTC) to epoch milliseconds"""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+class MessageCodec(ABC):
+    """Encodes WebSocketMessage payloads for one connection"""
+
+    subprotocol: Optional[str] = None
+
+    @abstractmethod
+    def encode(self, payload: Dict[str, Any]) -> Union[str, bytes]:
+        """Encode one message payload (model_dump(mode='json') form)"""
+        pass
+
+    def handshake(self) -> Optional[Union[str, bytes]]:
+        """Frame sent right after accept, if the encoding needs one"""
+        return None
+
+    async def send(self, websocket: WebSocket, payload: Dict[str, Any]):
+        await self.send_encoded(websocket, self.encode(payload))
+
+    async def send_encoded(self, websocket: WebSocket, frame: Union[str, bytes]):
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+
+    @property
+    def shareable(self) -> bool:
+        """Whether one encoded frame can be sent to every client using this codec"""
+        return True
+
+
+class JsonCodec(MessageCodec):
+    """Plain JSON text frames"""
+
+    subprotocol = "vamp.json"
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        return json.dumps(payload, separators=(',', ':'))
+
+
+class DeflateJsonCodec(MessageCodec):
+    """JSON compressed by a per-connection deflate stream, so repeated keys cost almost nothing"""
+
+    subprotocol = "vamp.json+deflate"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(level=6, wbits=-15)
+
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return self._compressor.compress(raw) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    @property
+    def shareable(self) -> bool:
+        # Output depends on this connection's compression history
+        return False
+
+
+class MsgpackCodec(MessageCodec):
+    """
+    MessagePack frames: [type, seq, timestamp_ms, data]. Evidence data is a
+    positional array in EVIDENCE_FIELDS order with platform/status as indexes
+    and dates as epoch milliseconds.
+    """
+
+    subprotocol = "vamp.msgpack"
+
+    def handshake(self) -> bytes:
+        return msgpack.packb({
+            "type": "schema",
+            "message_types": MESSAGE_TYPES,
+            "evidence_fields": EVIDENCE_FIELDS,
+            "platforms": PLATFORMS,
+            "statuses": STATUSES,
+            "layout": ["type", "seq", "timestamp_ms", "data"]
+        })
+
+    def _pack_evidence(self, evidence: Dict[str, Any]) -> List[Any]:
+        values = []
+        for field in EVIDENCE_FIELDS:
+            value = evidence.get(field)
+            if field in DATE_FIELDS:
+                value = _epoch_ms(value)
+            elif field == "platform" and value in PLATFORMS:
+                value = PLATFORMS.index(value)
+            elif field == "status" and value in STATUSES:
+                value = STATUSES.index(value)
+            values.append(value)
+        return values
+
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        message_type = payload.get("type")
+        data = payload.get("data", {})
+        if message_type == "evidence" and isinstance(data.get("evidence"), dict):
+            data = self._pack_evidence(data["evidence"])
+        return msgpack.packb([
+            MESSAGE_TYPES.index(message_type) if message_type in MESSAGE_TYPES else message_type,
+            payload.get("seq"),
+            _epoch_ms(payload.get("timestamp")),
+            data
+        ], default=str)
+
+
+def supported_codecs() -> Dict[str, type]:
+    codecs = {
+        JsonCodec.subprotocol: JsonCodec,
+        DeflateJsonCodec.subprotocol: DeflateJsonCodec,
+    }
+    if msgpack is not None:
+        codecs[MsgpackCodec.subprotocol] = MsgpackCodec
+    return codecs
+
+
+def negotiate_codec(websocket: WebSocket) -> Tuple[MessageCodec, Optional[str]]:
+    """
+    Pick the first subprotocol offered by the client that the server supports.
+    Returns the codec and the subprotocol to accept (None: plain JSON, no subprotocol).
+    """
+    codecs = supported_codecs()
+    for requested in websocket.scope.get("subprotocols", []):
+        if requested in codecs:
+            return codecs[requested](), requested
+    return JsonCodec(), None
+'''
+
+print("=== FRAMING.PY ===")
+print(framing_py[:2000])
+print(f"\n... [Full file is {len(framing_py.splitlines())} lines] ...\n")
@@ -0,0 +1,638 @@
+
+# 6. jobs.py - Durable scan job queue and worker pool
+jobs_py = '''"""
+VAMP Agent Durable Job Queue and Worker Pool
+Scans survive restarts and run in separate worker processes
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from cryptography.fernet import InvalidToken, MultiFernet
+
+from config import settings, build_cipher, encryption_key_is_ephemeral, DEFAULT_USER
+from models import JobStatus, ScanJob
+from pubsub import create_pubsub, is_cross_process
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue(ABC):
+    """Base class for durable job queues (at-least-once delivery)"""
+
+    lease_seconds: int = 300
+
+    @abstractmethod
+    def enqueue(self, kind: str, scan_id: str, payload: Dict[str, Any],
+                priority: int = 0, user_id: str = DEFAULT_USER) -> ScanJob:
+        """Persist a new job owned by user_id"""
+        pass
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[ScanJob]:
+        """
+        Lease a runnable job, or None. Users with the fewest running jobs go
+        first (fair share), then priority; users at their running limit wait.
+        """
+        pass
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease held by worker_id"""
+        pass
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Mark a job completed; False if worker_id no longer holds its lease"""
+        pass
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Record a failed attempt; requeues until max_attempts is reached unless
+        retry is False. False if worker_id no longer holds the job's lease.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        """Fetch a job by id"""
+        pass
+
+    @abstractmethod
+    def latest_for_scan(self, scan_id: str) -> Optional[ScanJob]:
+        """Fetch the most recent job for a scan"""
+        pass
+
+    @abstractmethod
+    def add_event(self, topic: str, event_type: str, data: Dict[str, Any]) -> int:
+        """Append a scan event, returns its sequence id"""
+        pass
+
+    @abstractmethod
+    def events_since(self, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Events with id > last_id, oldest first"""
+        pass
+
+    @abstractmethod
+    def topic_events_since(self, topic: str, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Events for one topic with id > last_id, oldest first"""
+        pass
+
+    @abstractmethod
+    def depth(self) -> int:
+        """Number of queued jobs"""
+        pass
+
+    @abstractmethod
+    def pending_for_user(self, user_id: str) -> int:
+        """Number of the user's queued or running jobs"""
+        pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """SQLite-backed job queue shared by every process on the host"""
+
+    def __init__(self, path: Path, lease_seconds: int = 300, max_attempts: int = 5,
+                 cipher: MultiFernet = None, max_running_per_user: int = 0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_running_per_user = max_running_per_user
+        # Payloads carry session cookies, so they are encrypted at rest
+        self.cipher = cipher
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    scan_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_runnable
+                    ON jobs (status, priority DESC, available_at);
+                CREATE INDEX IF NOT EXISTS idx_jobs_scan ON jobs (scan_id, created_at);
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    topic TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_events_topic ON job_events (topic, id);
+            """)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'user_id' not in columns:
+                try:
+                    # Jobs queued before multi-tenancy belong to the default user
+                    conn.execute(
+                        f"ALTER TABLE jobs ADD COLUMN user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER}'"
+                    )
+                except sqlite3.OperationalError:
+                    # Another process added it first
+                    pass
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, status)")
+
+    def _encode_payload(self, payload: Dict[str, Any]) -> str:
+        raw = json.dumps(payload)
+        if self.cipher:
+            return self.cipher.encrypt(raw.encode()).decode()
+        return raw
+
+    def _decode_payload(self, stored: str) -> Dict[str, Any]:
+        if self.cipher:
+            stored = self.cipher.decrypt(stored.encode()).decode()
+        return json.loads(stored)
+
+    def _row_to_job(self, row: sqlite3.Row) -> ScanJob:
+        return ScanJob(
+            job_id=row['job_id'],
+            kind=row['kind'],
+            scan_id=row['scan_id'],
+            user_id=row['user_id'],
+            payload=self._decode_payload(row['payload']),
+            priority=row['priority'],
+            status=JobStatus(row['status']),
+            attempts=row['attempts'],
+            max_attempts=row['max_attempts'],
+            result=json.loads(row['result']) if row['result'] else None,
+            error=row['error'],
+            created_at=datetime.utcfromtimestamp(row['created_at']),
+            updated_at=datetime.utcfromtimestamp(row['updated_at'])
+        )
+
+    def enqueue(self, kind: str, scan_id: str, payload: Dict[str, Any],
+                priority: int = 0, user_id: str = DEFAULT_USER) -> ScanJob:
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, scan_id, user_id, payload, priority, status, "
+                "attempts, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                (job_id, kind, scan_id, user_id, self._encode_payload(payload), priority,
+                 JobStatus.QUEUED.value, self.max_attempts, now, now, now)
+            )
+        logger.info(f"Enqueued {kind} job {job_id} for scan {scan_id} "
+                    f"(user {user_id}, priority {priority})")
+        return self.get(job_id)
+
+    def claim(self, worker_id: str) -> Optional[ScanJob]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A job whose worker died never reaches fail(), so its attempts are capped here;
+                # otherwise a job that crashes its worker would be redelivered forever
+                exhausted = conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'Lease expired after ' || attempts || "
+                    "' attempts; the worker running it stopped', lease_owner = NULL, "
+                    "lease_expires = NULL, updated_at = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                    (JobStatus.FAILED.value, now, JobStatus.RUNNING.value, now)
+                ).rowcount
+                if exhausted:
+                    logger.error(f"Failed {exhausted} jobs whose leases expired on their last attempt")
+                # Other expired leases are claimable again: a crashed worker's job is redelivered.
+                # Running counts only include live leases, so those jobs don't block their user.
+                row = conn.execute(
+                    "SELECT j.job_id, COALESCE(r.running, 0) AS running FROM jobs j "
+                    "LEFT JOIN (SELECT user_id, COUNT(*) AS running FROM jobs "
+                    "           WHERE status = ? AND lease_expires >= ? GROUP BY user_id) r "
+                    "  ON r.user_id = j.user_id "
+                    "WHERE ((j.status = ? AND j.available_at <= ?) "
+                    "    OR (j.status = ? AND j.lease_expires < ?)) "
+                    "  AND (? <= 0 OR COALESCE(r.running, 0) < ?) "
+                    "ORDER BY running ASC, j.priority DESC, j.available_at ASC LIMIT 1",
+                    (JobStatus.RUNNING.value, now, JobStatus.QUEUED.value, now,
+                     JobStatus.RUNNING.value, now, self.max_running_per_user,
+                     self.max_running_per_user)
+                ).fetchone()
+                if not row:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, "
+                    "lease_expires = ?, updated_at = ? WHERE job_id = ?",
+                    (JobStatus.RUNNING.value, worker_id, now + self.lease_seconds, now,
+                     row['job_id'])
+                )
+                claimed = conn.execute(
+                    "SELECT * FROM jobs WHERE job_id = ?", (row['job_id'],)
+                ).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        try:
+            return self._row_to_job(claimed)
+        except (InvalidToken, ValueError) as e:
+            # Enqueued under a key this process doesn't have; another attempt won't help
+            detail = "Job payload cannot be decrypted with the configured keys"
+            self.fail(claimed['job_id'], worker_id, detail, retry=False)
+            raise PermanentJobError(f"{detail} (job {claimed['job_id']})") from e
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (now + self.lease_seconds, now, job_id, worker_id, JobStatus.RUNNING.value)
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        with self._connect() as conn:
+            # Like heartbeat(): a worker whose lease expired must not overwrite the new owner's run
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? "
+                "WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (JobStatus.COMPLETED.value, json.dumps(result), time.time(), job_id, worker_id,
+                 JobStatus.RUNNING.value)
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs "
+                "WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (job_id, worker_id, JobStatus.RUNNING.value)
+            ).fetchone()
+            if not row:
+                return False
+            if not retry or row['attempts'] >= row['max_attempts']:
+                status, available_at = JobStatus.FAILED.value, now
+            else:
+                # Exponential backoff before the next delivery
+                status, available_at = JobStatus.QUEUED.value, now + min(300, 2 ** row['attempts'])
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? "
+                "WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (status, error, available_at, now, job_id, worker_id, JobStatus.RUNNING.value)
+            )
+            return cur.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def latest_for_scan(self, scan_id: str) -> Optional[ScanJob]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE scan_id = ? ORDER BY created_at DESC LIMIT 1",
+                (scan_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def add_event(self, topic: str, event_type: str, data: Dict[str, Any]) -> int:
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO job_events (topic, type, data, created_at) VALUES (?, ?, ?, ?)",
+                (topic, event_type, json.dumps(data, default=str), time.time())
+            )
+            return cur.lastrowid
+
+    def events_since(self, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM job_events WHERE id > ? ORDER BY id ASC LIMIT ?",
+                (last_id, limit)
+            ).fetchall()
+        return self._rows_to_events(rows)
+
+    def topic_events_since(self, topic: str, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM job_events WHERE topic = ? AND id > ? ORDER BY id ASC LIMIT ?",
+                (topic, last_id, limit)
+            ).fetchall()
+        return self._rows_to_events(rows)
+
+    def _rows_to_events(self, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'id': row['id'],
+                'topic': row['topic'],
+                'type': row['type'],
+                'data': json.loads(row['data']),
+                'created_at': row['created_at']
+            }
+            for row in rows
+        ]
+
+    def last_event_id(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(id) AS last_id FROM job_events").fetchone()
+        return row['last_id'] or 0
+
+    def depth(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE status = ?", (JobStatus.QUEUED.value,)
+            ).fetchone()
+        return row['n']
+
+    def pending_for_user(self, user_id: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE user_id = ? AND status IN (?, ?)",
+                (user_id, JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+            ).fetchone()
+        return row['n']
+
+
+JOB_QUEUE_BACKENDS: Dict[str, Callable[[], JobQueue]] = {
+    'sqlite': lambda: SQLiteJobQueue(
+        path=settings.JOB_QUEUE_PATH,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        cipher=build_cipher(),
+        max_running_per_user=settings.USER_MAX_RUNNING_SCANS
+    ),
+}
+
+
+def create_job_queue(backend: str = None) -> JobQueue:
+    """Create the configured job queue backend"""
+    backend = backend or settings.JOB_QUEUE_BACKEND
+    if backend not in JOB_QUEUE_BACKENDS:
+        raise ValueError(f"Unknown job queue backend: {backend}")
+    return JOB_QUEUE_BACKENDS[backend]()
+
+
+# ============================================================================
+# JOB HANDLERS
+# ============================================================================
+
+class JobContext:
+    """Handed to job handlers for publishing scan events"""
+
+    def __init__(self, queue: JobQueue, job: ScanJob, bus=None):
+        self.queue = queue
+        self.job = job
+        self.bus = bus
+
+    async def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        event_id = await asyncio.to_thread(self.queue.add_event, self.job.scan_id, event_type, data)
+        if self.bus:
+            # Cross-process bus: reach WebSocket clients in every API worker directly
+            await self.bus.publish(self.job.scan_id, {
+                'type': event_type,
+                'data': data,
+                'timestamp': datetime.utcnow().isoformat(),
+                'seq': event_id
+            })
+        return event_id
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when another attempt cannot succeed; the job fails without retrying"""
+    pass
+
+
+JobHandler = Callable[[ScanJob, JobContext], Awaitable[Dict[str, Any]]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+# Modules that register handlers; imported by each worker process
+HANDLER_MODULES = ['scraping']
+
+# Seconds between checks for worker processes that have died
+WORKER_CHECK_SECONDS = 5.0
+
+
+def job_handler(kind: str):
+    """Register a coroutine as the handler for a job kind"""
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+# ============================================================================
+# WORKER POOL
+# ============================================================================
+
+async def _heartbeat_loop(queue: JobQueue, job_id: str, worker_id: str):
+    """Returns once the lease is lost"""
+    interval = max(1, queue.lease_seconds // 3)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            held = await asyncio.to_thread(queue.heartbeat, job_id, worker_id)
+        except Exception as e:
+            # The lease may still be live; try again next interval
+            logger.warning(f"Heartbeat for job {job_id} failed: {e!r}")
+            continue
+        if not held:
+            logger.warning(f"Lost lease on job {job_id}")
+            return
+
+
+async def _run_job(worker_id: str, queue: JobQueue, job: ScanJob, bus):
+    handler = JOB_HANDLERS.get(job.kind)
+    if not handler:
+        await asyncio.to_thread(queue.fail, job.job_id, worker_id, f"No handler for job kind {job.kind}")
+        return
+
+    logger.info(f"Worker {worker_id} running job {job.job_id} (attempt {job.attempts})")
+    run = asyncio.create_task(handler(job, JobContext(queue, job, bus)))
+    heartbeat = asyncio.create_task(_heartbeat_loop(queue, job.job_id, worker_id))
+    await asyncio.wait({run, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+    heartbeat.cancel()
+    if not run.done():
+        # The job has been (or will be) redelivered to another worker; stop this run of it
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        logger.warning(f"Worker {worker_id} cancelled job {job.job_id} after losing its lease")
+        return
+
+    try:
+        result = run.result()
+    except PermanentJobError as e:
+        logger.error(f"Job {job.job_id} failed permanently: {e}")
+        recorded = await asyncio.to_thread(queue.fail, job.job_id, worker_id, str(e), False)
+    except Exception as e:
+        logger.error(f"Job {job.job_id} failed: {e}")
+        recorded = await asyncio.to_thread(queue.fail, job.job_id, worker_id, str(e))
+    else:
+        recorded = await asyncio.to_thread(queue.complete, job.job_id, worker_id, result or {})
+    if not recorded:
+        logger.warning(f"Worker {worker_id} lost the lease on job {job.job_id}; dropped its outcome")
+
+
+async def run_worker(worker_id: str, stop_event, queue: JobQueue = None):
+    """Claim and run jobs until stop_event is set"""
+    import importlib
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+    queue = queue or create_job_queue()
+    # With the in-process bus, API processes relay events from the queue instead
+    bus = create_pubsub() if is_cross_process() else None
+    if bus:
+        await bus.start()
+    logger.info(f"Job worker {worker_id} started (pid {os.getpid()})")
+
+    while not stop_event.is_set():
+        try:
+            job = await asyncio.to_thread(queue.claim, worker_id)
+        except PermanentJobError as e:
+            logger.error(f"Worker {worker_id} failed a job it could not read: {e}")
+            continue
+        except Exception as e:
+            # e.g. the queue stayed locked past its busy timeout; poll again later
+            logger.error(f"Worker {worker_id} could not claim a job: {e!r}")
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        if not job:
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+
+        try:
+            await _run_job(worker_id, queue, job, bus)
+        except Exception as e:
+            # Recording the outcome failed; the lease runs out and the job is redelivered
+            logger.error(f"Worker {worker_id} could not record the outcome of job {job.job_id}: {e!r}")
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+
+    if bus:
+        await bus.close()
+    logger.info(f"Job worker {worker_id} stopped")
+
+
+def _worker_process_main(worker_id: str, stop_event):
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(run_worker(worker_id, stop_event))
+    except KeyboardInterrupt:
+        pass
+
+
+class JobWorkerPool:
+    """Pool of worker processes draining the job queue; workers that die are restarted"""
+
+    def __init__(self, workers: int = None):
+        self.workers = workers if workers is not None else settings.JOB_WORKERS
+        self._ctx = multiprocessing.get_context('spawn')
+        self._stop_event = self._ctx.Event()
+        self.processes: List[multiprocessing.Process] = []
+        self._supervisor: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.workers and encryption_key_is_ephemeral():
+            # Each spawned worker would generate a key of its own and fail every job
+            raise RuntimeError(
+                "Job workers need a persistent encryption key to decrypt queued jobs: "
+                "set VAMP_ENCRYPTION_KEY (see env.example) or run with JOB_WORKERS=0"
+            )
+        self.processes = [self._spawn(index) for index in range(self.workers)]
+        self._supervisor = threading.Thread(
+            target=self._supervise, name="vamp-job-supervisor", daemon=True
+        )
+        self._supervisor.start()
+        logger.info(f"Started {self.workers} job worker processes")
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+        process = self._ctx.Process(
+            target=_worker_process_main,
+            args=(worker_id, self._stop_event),
+            name=f"vamp-job-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _supervise(self):
+        while not self._stop_event.wait(WORKER_CHECK_SECONDS):
+            for index, process in enumerate(self.processes):
+                if not process.is_alive() and not self._stop_event.is_set():
+                    # Its claimed job is redelivered once the lease expires
+                    logger.error(f"Job worker {process.name} exited with code "
+                                 f"{process.exitcode}, restarting it")
+                    self.processes[index] = self._spawn(index)
+
+    def alive(self) -> int:
+        return sum(1 for p in self.processes if p.is_alive())
+
+    def wait(self):
+        """Block until the pool is stopped"""
+        self._stop_event.wait()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop_event.set()
+        if self._supervisor:
+            self._supervisor.join()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        logger.info("Job worker pool stopped")
+
+
+if __name__ == "__main__":
+    # Standalone pool, e.g. alongside `gunicorn main:app` with JOB_WORKERS_EMBEDDED=False
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    pool = JobWorkerPool()
+    pool.start()
+    try:
+        pool.wait()
+    except KeyboardInterrupt:
+        pool.stop()
+'''
+
+print("=== JOBS.PY ===")
+print(jobs_py[:2000])
+print(f"\n... [Full file is {len(jobs_py.splitlines())} lines] ...\n")
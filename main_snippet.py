@@ -5,23 +5,49 @@ VAMP Agent - FastAPI Backend with WebSocket Streaming
 Session-based authentication using Chrome extension cookies
 """
 import asyncio
+import itertools
 import json
 import uuid
 import logging
+from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Dict, Set
+from typing import Any, AsyncIterator, List, Dict, Set, Optional
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket, HTTPException, Depends, BackgroundTasks, Query
+from fastapi import FastAPI, WebSocket, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import websockets
 
-from config import settings, credential_manager, VAMPSettings
+from config import settings, credential_manager, VAMPSettings, encryption_key_is_ephemeral
 from models import (
     ScrapeRequest, ScrapeResponse, Evidence, EvidenceStatus,
     PlatformType, WebSocketMessage, ComplianceScan, CredentialPayload,
-    SessionCookie
+    SessionCookie, ScanResumeRequest, JobStatus, ScanJob, SessionCheckRequest,
+    ExportFormat, ExportCompression, ReportFormat, ScanSchedule, ScanScheduleRequest
+)
+from jobs import create_job_queue, JobWorkerPool, JobQueue
+from pubsub import create_pubsub, is_cross_process, PubSubBackend
+from framing import negotiate_codec, MessageCodec, JsonCodec
+from scraping import run_scrape, resolve_date_range, check_request_session
+from connectors.base import SessionExpiredError, SESSION_INVALID
+from evidence_store import EvidenceStore
+from export import export_evidence, export_filename, export_media_type, unavailable_reason
+from reports import REPORT_MEDIA_TYPES, render_report, report_filename
+from scoring import ScoringExecutor, evidence_text
+from scheduler import ScanScheduler, ScheduleStore
+from admission import scrape_admission
+from readiness import (
+    ReadinessProbe, NOT_READY, credential_store_check, evidence_store_check, job_queue_check,
+    pubsub_check, admission_check, playwright_installed_check
+)
+from tenancy import (
+    current_user, websocket_user, sync_scrape_slots, check_pending_scans, check_schedule_count
+)
+from tracing import get_exporter, build_span_tree, critical_path, trace_id_for_scan, scan_trace, span
+from metrics import (
+    JOB_QUEUE_DEPTH, WEBSOCKET_CONNECTIONS, WEBSOCKET_QUEUE_DEPTH,
+    METRICS_CONTENT_TYPE, render_metrics
 )
 
 # Import connectors (in production, use proper imports)
@@ -32,43 +58,228 @@ logging.basicConfig(
 )
 
 
+class ReplayBuffer:
+    """Bounded ring buffer of recent sequenced messages for one topic"""
+    
+    def __init__(self, size: int):
+        self.messages: deque = deque(maxlen=size)
+        # Every message with seq > floor is in the buffer (None until the first message)
+        self.floor: Optional[int] = None
+    
+    def append(self, payload: Dict):
+        if self.floor is None:
+            self.floor = payload['seq'] - 1
+        elif len(self.messages) == self.messages.maxlen:
+            self.floor = self.messages[0]['seq']
+        self.messages.append(payload)
+    
+    def since(self, seq: int) -> Optional[List[Dict]]:
+        """Messages after seq, or None if the buffer no longer reaches back that far"""
+        if self.floor is None or seq < self.floor:
+            return None
+        return [p for p in self.messages if p['seq'] > seq]
+
+
 # Active WebSocket connections
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, bus: PubSubBackend, event_log: JobQueue = None):
         self.active_connections: List[WebSocket] = []
         self.connection_topics: Dict[str, Set[WebSocket]] = {}
+        # Broadcasts travel over the bus so clients in other workers receive them
+        self.bus = bus
+        # Durable event log assigns sequence numbers and backs replays older than the buffer
+        self.event_log = event_log
+        self._local_seq = itertools.count(1)
+        self.topic_buffers: Dict[str, ReplayBuffer] = {}
+        self._replaying: Dict[WebSocket, List[Dict]] = {}
+        self._linger: Dict[str, asyncio.TimerHandle] = {}
+        # Encoding negotiated per connection via the WebSocket subprotocol
+        self.codecs: Dict[WebSocket, MessageCodec] = {}
+    
+    async def start(self):
+        await self.bus.start(self._deliver_local)
+    
+    async def close(self):
+        await self.bus.close()
     
     async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+        codec, subprotocol = negotiate_codec(websocket)
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections.append(websocket)
+        WEBSOCKET_CONNECTIONS.inc()
+        self.codecs[websocket] = codec
+        handshake = codec.handshake()
+        if handshake is not None:
+            await codec.send_encoded(websocket, handshake)
+    
+    async def send(self, websocket: WebSocket, payload: Dict):
+        """Send one message payload in the connection's negotiated encoding"""
+        codec = self.codecs.get(websocket) or JsonCodec()
+        await codec.send(websocket, payload)
     
     async def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
+            WEBSOCKET_CONNECTIONS.dec()
+        self.codecs.pop(websocket, None)
+        for topic in [t for t, conns in self.connection_topics.items() if websocket in conns]:
+            await self.unsubscribe(websocket, topic)
     
-    async def subscribe(self, websocket: WebSocket, topic: str):
-        """Subscribe to specific scan topic"""
+    async def subscribe(self, websocket: WebSocket, topic: str, since: Optional[int] = None):
+        """Subscribe to specific scan topic, first replaying messages after `since`"""
+        # Live messages for this client are held back until its replay is sent
+        self._replaying[websocket] = []
+        if topic in self._linger:
+            self._linger.pop(topic).cancel()
         if topic not in self.connection_topics:
             self.connection_topics[topic] = set()
+            if topic not in self.topic_buffers:
+                # First local client for this topic: start receiving it from the bus
+                self.topic_buffers[topic] = ReplayBuffer(settings.WS_REPLAY_BUFFER_SIZE)
+                await self.bus.subscribe(topic)
         self.connection_topics[topic].add(websocket)
+        
+        try:
+            last_sent = await self._replay(websocket, topic, since or 0)
+            while self._replaying[websocket]:
+                pending, self._replaying[websocket] = self._replaying[websocket], []
+                WEBSOCKET_QUEUE_DEPTH.dec(len(pending))
+                for payload in pending:
+                    if payload.get('seq') is None or payload['seq'] > last_sent:
+                        await self.send(websocket, payload)
+                        last_sent = max(last_sent, payload.get('seq') or 0)
+        finally:
+            WEBSOCKET_QUEUE_DEPTH.dec(len(self._replaying.pop(websocket, None) or []))
+    
+    async def _replay(self, websocket: WebSocket, topic: str, since: int) -> int:
+        """Send missed messages from the ring buffer, or the event log if it is too old"""
+        last_sent = since
+        buffer = self.topic_buffers.get(topic)
+        messages = buffer.since(since) if buffer else None
+        
+        if messages is None and self.event_log:
+            messages = []
+            while True:
+                events = await asyncio.to_thread(self.event_log.topic_events_since, topic, last_sent)
+                if not events:
+                    break
+                for event in events:
+                    await self.send(websocket, WebSocketMessage(
+                        type=event['type'],
+                        data=event['data'],
+                        timestamp=datetime.utcfromtimestamp(event['created_at']),
+                        seq=event['id']
+                    ).model_dump(mode='json'))
+                    last_sent = event['id']
+        
+        for payload in messages or []:
+            await self.send(websocket, payload)
+            last_sent = payload['seq']
+        return last_sent
+    
+    async def unsubscribe(self, websocket: WebSocket, topic: str):
+        """Unsubscribe from a scan topic"""
+        connections = self.connection_topics.get(topic)
+        if connections is None:
+            return
+        connections.discard(websocket)
+        if not connections:
+            del self.connection_topics[topic]
+            # Keep the buffer warm briefly so a reconnecting client replays from memory
+            self._linger[topic] = asyncio.get_running_loop().call_later(
+                settings.WS_REPLAY_LINGER_SECONDS,
+                lambda: asyncio.create_task(self._release_topic(topic))
+            )
+    
+    async def _release_topic(self, topic: str):
+        self._linger.pop(topic, None)
+        if topic not in self.connection_topics:
+            self.topic_buffers.pop(topic, None)
+            await self.bus.unsubscribe(topic)
     
     async def broadcast_to_topic(self, topic: str, message: WebSocketMessage):
-        """Broadcast to all subscribers of a topic"""
-        if topic in self.connection_topics:
-            disconnected = []
-            for connection in self.connection_topics[topic]:
-                try:
-                    await connection.send_json(message.model_dump(mode='json'))
-                except Exception as e:
-                    logger.error(f"Error sending WebSocket message: {e}")
-                    disconnected.append(connection)
-            
-            # Clean up disconnected clients
-            for conn in disconnected:
-                await self.disconnect(conn)
-                self.connection_topics[topic].discard(conn)
+        """Broadcast to all subscribers of a topic, in every worker"""
+        if message.seq is None:
+            if self.event_log:
+                message.seq = await asyncio.to_thread(
+                    self.event_log.add_event, topic, message.type, message.data
+                )
+            else:
+                message.seq = next(self._local_seq)
+        await self.bus.publish(topic, message.model_dump(mode='json'))
+    
+    async def _deliver_local(self, topic: str, payload: Dict):
+        """Send a bus message to this worker's subscribers of a topic"""
+        buffer = self.topic_buffers.get(topic)
+        if buffer is not None and payload.get('seq') is not None:
+            buffer.append(payload)
+        
+        disconnected = []
+        # Shareable encodings are encoded once per broadcast, not once per client
+        encoded: Dict[type, object] = {}
+        for connection in list(self.connection_topics.get(topic, ())):
+            if connection in self._replaying:
+                self._replaying[connection].append(payload)
+                WEBSOCKET_QUEUE_DEPTH.inc()
+                continue
+            try:
+                codec = self.codecs.get(connection) or JsonCodec()
+                if codec.shareable:
+                    if type(codec) not in encoded:
+                        encoded[type(codec)] = codec.encode(payload)
+                    await codec.send_encoded(connection, encoded[type(codec)])
+                else:
+                    await codec.send(connection, payload)
+            except Exception as e:
+                logger.error(f"Error sending WebSocket message: {e}")
+                disconnected.append(connection)
+        
+        # Clean up disconnected clients
+        for conn in disconnected:
+            await self.disconnect(conn)
 
 
-manager = ConnectionManager()
+job_queue = create_job_queue()
+manager = ConnectionManager(create_pubsub(), event_log=job_queue)
+scoring_executor = ScoringExecutor()
+evidence_store = EvidenceStore()
+schedule_store = ScheduleStore()
+
+readiness = ReadinessProbe(settings.READINESS_CACHE_TTL, settings.READINESS_CHECK_TIMEOUT)
+readiness.add("credentials", credential_store_check(credential_manager))
+readiness.add("evidence_store", evidence_store_check(evidence_store))
+readiness.add("job_queue", job_queue_check(job_queue, settings.READINESS_MAX_QUEUE_DEPTH), critical=False)
+readiness.add("pubsub", pubsub_check(manager.bus))
+readiness.add("scrape_admission", admission_check(scrape_admission))
+readiness.add("playwright_installed", playwright_installed_check(), critical=False)
+
+
+async def relay_job_events():
+    """
+    Forward events written by job workers to this process's WebSocket subscribers.
+    Only needed with the in-process bus; cross-process buses deliver directly.
+    """
+    last_id = await asyncio.to_thread(job_queue.last_event_id)
+    while True:
+        try:
+            events = await asyncio.to_thread(job_queue.events_since, last_id)
+            for event in events:
+                last_id = event['id']
+                # Includes lingering topics so their replay buffers stay contiguous
+                if event['topic'] in manager.topic_buffers:
+                    await manager.broadcast_to_topic(event['topic'], WebSocketMessage(
+                        type=event['type'],
+                        data=event['data'],
+                        timestamp=datetime.utcfromtimestamp(event['created_at']),
+                        seq=event['id']
+                    ))
+            if not events:
+                await asyncio.sleep(0.5)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error relaying job events: {e}")
+            await asyncio.sleep(1)
 
 
 # Startup/Shutdown events
@@ -76,8 +287,30 @@ manager = ConnectionManager()
 async def lifespan(app: FastAPI):
     """Manage app lifecycle"""
     logger.info("VAMP Agent Backend Starting...")
+    await manager.start()
+    worker_pool = None
+    if settings.JOB_WORKERS_EMBEDDED and settings.JOB_WORKERS > 0:
+        worker_pool = JobWorkerPool()
+        worker_pool.start()
+    relay_task = None
+    if not is_cross_process():
+        relay_task = asyncio.create_task(relay_job_events())
+    # Re-encrypt credentials still under a retired key, a batch at a time
+    rotation_task = asyncio.create_task(credential_manager.rotate_keys())
+    scheduler_task = None
+    if settings.SCHEDULER_ENABLED:
+        scheduler_task = asyncio.create_task(ScanScheduler(schedule_store, job_queue).run())
     yield
     logger.info("VAMP Agent Backend Shutting Down...")
+    rotation_task.cancel()
+    if scheduler_task:
+        scheduler_task.cancel()
+    if relay_task:
+        relay_task.cancel()
+    if worker_pool:
+        await asyncio.to_thread(worker_pool.stop)
+    await asyncio.to_thread(scoring_executor.shutdown)
+    await manager.close()
 
 
 # Create FastAPI app
@@ -112,17 +345,18 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    JOB_QUEUE_DEPTH.set(await asyncio.to_thread(job_queue.depth))
+    return Response(render_metrics(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+
 @app.get("/health/readiness")
 async def readiness_check():
-    """Readiness check - verify connections"""
-    return {
-        "status": "ready",
-        "services": {
-            "api": "ready",
-            "websocket": "ready",
-            "credentials": "ready"
-        }
-    }
+    """Readiness check - 503 while a critical dependency is broken or saturated"""
+    result = await readiness.status()
+    return JSONResponse(result, status_code=503 if result["status"] == NOT_READY else 200)
 
 
 # ============================================================================
@@ -130,12 +364,13 @@ async def readiness_check():
 # ============================================================================
 
 @app.post("/api/credentials")
-async def save_credentials(payload: CredentialPayload):
+async def save_credentials(payload: CredentialPayload, user_id: str = Depends(current_user)):
     """Save encrypted credentials for a service"""
     try:
-        credential_manager.save_credentials(
+        await credential_manager.save_credentials_async(
             service=payload.service.value,
-            credentials=payload.credentials
+            credentials=payload.credentials,
+            user_id=user_id
         )
         
         return {
@@ -149,10 +384,10 @@ async def save_credentials(payload: CredentialPayload):
 
 
 @app.get("/api/credentials/{service}")
-async def get_credentials(service: PlatformType):
+async def get_credentials(service: PlatformType, user_id: str = Depends(current_user)):
     """Get saved credentials for a service (encrypted in storage)"""
     try:
-        creds = credential_manager.get_credentials(service.value)
+        creds = await credential_manager.get_credentials_async(service.value, user_id)
         if not creds:
             raise HTTPException(status_code=404, detail=f"No credentials found for {service.value}")
         
@@ -169,10 +404,10 @@ async def get_credentials(service: PlatformType):
 
 
 @app.delete("/api/credentials/{service}")
-async def delete_credentials(service: PlatformType):
+async def delete_credentials(service: PlatformType, user_id: str = Depends(current_user)):
     """Delete credentials for a service"""
     try:
-        credential_manager.delete_credentials(service.value)
+        await credential_manager.delete_credentials_async(service.value, user_id)
         return {
             "status": "success",
             "message": f"Credentials deleted for {service.value}"
@@ -187,7 +422,7 @@ async def delete_credentials(service: PlatformType):
 # ============================================================================
 
 @app.post("/api/scrape")
-async def scrape_evidence(request: ScrapeRequest, background_tasks: BackgroundTasks):
+async def scrape_evidence(request: ScrapeRequest, user_id: str = Depends(current_user)):
     """
     Scrape evidence from a platform
     
@@ -198,91 +433,15 @@ async def scrape_evidence(request: ScrapeRequest, background_tasks: BackgroundTa
     - start_year/end_year: Year range
     """
     try:
-        # Validate date range
-        if request.start_year == request.end_year:
-            if request.start_month > request.end_month:
-                raise HTTPException(
-                    status_code=400,
-                    detail="start_month must be <= end_month in same year"
-                )
-        
-        # Calculate date range
-        start_date = datetime(request.start_year, request.start_month, 1)
-        end_date = datetime(request.end_year, request.end_month, 1)
-        # Set to end of month
-        if end_date.month == 12:
-            end_date = end_date.replace(year=end_date.year + 1, month=1) - timedelta(days=1)
-        else:
-            end_date = end_date.replace(month=end_date.month + 1) - timedelta(days=1)
-        end_date = end_date.replace(hour=23, minute=59, second=59)
-        
-        logger.info(f"Scraping {request.platform.value} from {start_date} to {end_date}")
-        
-        # Get connector
-        from connectors.session_based import ConnectorFactory
-        
-        # Get saved credentials if needed
-        creds = None
-        if request.platform in [PlatformType.NEXTCLOUD, PlatformType.EFUNDI]:
-            creds = credential_manager.get_credentials(request.platform.value)
-        
-        # Create connector
-        connector = await ConnectorFactory.create_connector(
-            platform=request.platform.value,
-            cookies=[c.model_dump() for c in request.cookies] if request.cookies else None,
-            credentials=creds
-        )
-        
-        # Fetch evidence
-        async with connector.session if hasattr(connector, 'session') and connector.session else None:
-            evidence_list = await connector.fetch_evidence(start_date, end_date)
-        
-        await connector.disconnect()
-        
-        # Apply filters
-        if request.include_filters:
-            evidence_list = [
-                e for e in evidence_list
-                if any(f.lower() in e['title'].lower() or f.lower() in e.get('description', '').lower()
-                       for f in request.include_filters)
-            ]
-        
-        if request.exclude_filters:
-            evidence_list = [
-                e for e in evidence_list
-                if not any(f.lower() in e['title'].lower() or f.lower() in e.get('description', '').lower()
-                           for f in request.exclude_filters)
-            ]
-        
-        # Convert to Evidence objects
-        evidence_objects = []
-        for item in evidence_list:
-            try:
-                evidence_objects.append(Evidence(
-                    id=item['id'],
-                    platform=request.platform,
-                    title=item['title'],
-                    description=item.get('description'),
-                    created_date=datetime.fromisoformat(
-                        item['created_date'].replace('Z', '+00:00')
-                    ) if isinstance(item['created_date'], str) else item['created_date'],
-                    modified_date=datetime.fromisoformat(
-                        item['modified_date'].replace('Z', '+00:00')
-                    ) if item.get('modified_date') and isinstance(item['modified_date'], str) else None,
-                    url=item.get('url'),
-                    metadata=item.get('metadata', {})
-                ))
-            except Exception as e:
-                logger.warning(f"Error converting evidence item: {e}")
-        
-        response = ScrapeResponse(
-            platform=request.platform,
-            total_items=len(evidence_objects),
-            items=evidence_objects
-        )
-        
-        return response.model_dump(mode='json')
+        # Per-user quota first, then a process-wide slot (may queue briefly, or shed with 503/429)
+        async with sync_scrape_slots.slot(user_id), scrape_admission.admit(request.platform.value):
+            result = await run_scrape(request, user_id=user_id)
+        return result.to_payload()
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionExpiredError as e:
+        raise HTTPException(status_code=401, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -291,74 +450,101 @@ async def scrape_evidence(request: ScrapeRequest, background_tasks: BackgroundTa
 
 
 @app.post("/api/scrape/async")
-async def scrape_evidence_async(request: ScrapeRequest, background_tasks: BackgroundTasks):
+async def scrape_evidence_async(request: ScrapeRequest, user_id: str = Depends(current_user)):
     """
     Async scraping with WebSocket updates
-    Returns scan_id for tracking progress
+    Enqueues a durable job and returns scan_id for tracking progress
     """
-    scan_id = str(uuid.uuid4())
-    
-    async def background_scrape():
-        """Background scraping task"""
-        try:
-            # Send start message
-            await manager.broadcast_to_topic(scan_id, WebSocketMessage(
-                type="status",
-                data={"status": "started", "scan_id": scan_id}
-            ))
-            
-            # Perform scraping (same as /api/scrape)
-            # ... scraping logic ...
-            
-            await manager.broadcast_to_topic(scan_id, WebSocketMessage(
-                type="status",
-                data={"status": "completed", "scan_id": scan_id}
-            ))
-        except Exception as e:
-            logger.error(f"Error in background scrape: {e}")
-            await manager.broadcast_to_topic(scan_id, WebSocketMessage(
-                type="error",
-                data={"error": str(e), "scan_id": scan_id}
-            ))
+    try:
+        resolve_date_range(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    check_pending_scans(await asyncio.to_thread(job_queue.pending_for_user, user_id))
+    await _require_live_session(request, user_id)
     
-    background_tasks.add_task(background_scrape)
+    scan_id = str(uuid.uuid4())
+    job = await asyncio.to_thread(
+        job_queue.enqueue,
+        "scrape",
+        scan_id,
+        {"request": request.model_dump(mode='json')},
+        request.priority,
+        user_id
+    )
     
     return {
         "scan_id": scan_id,
-        "status": "pending",
-        "message": "Connect to WebSocket at /ws/{scan_id} for updates"
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "message": f"Connect to WebSocket at /ws/{scan_id} for updates"
     }
 
 
+async def _require_live_session(request, user_id: str):
+    """Refuse to queue a scan whose session the platform already rejects"""
+    check = await check_request_session(request, user_id)
+    if check['status'] == SESSION_INVALID:
+        raise HTTPException(status_code=401, detail=check['detail'])
+
+
+@app.post("/api/sessions/check")
+async def check_session(request: SessionCheckRequest, user_id: str = Depends(current_user)):
+    """
+    Pre-flight check of browser cookies (or saved credentials) against the platform.
+    status is "valid", "invalid" (sign in again) or "unknown" (no check for the
+    platform, or the platform could not be reached); results are cached briefly.
+    """
+    return await check_request_session(request, user_id)
+
+
 # ============================================================================
 # WEBSOCKET ENDPOINT
 # ============================================================================
 
 @app.websocket("/ws/{scan_id}")
-async def websocket_endpoint(websocket: WebSocket, scan_id: str):
+async def websocket_endpoint(websocket: WebSocket, scan_id: str,
+                             since: Optional[int] = Query(default=None, ge=0)):
     """
     WebSocket endpoint for real-time scraping updates
     
+    Messages already sent for the scan are replayed first. Reconnect with
+    ?since=<seq of the last message received> to get only the missed ones.
+    Offer subprotocol "vamp.msgpack" or "vamp.json+deflate" for compact
+    binary frames (see framing.py); plain JSON otherwise.
+    Only the scan's owner may subscribe. Browsers can't set headers on
+    WebSockets, so they pass ?token=<user token> (see tenancy.py); ?user=<user id>
+    is honoured only from a TRUSTED_PROXIES address.
+    
     Usage:
-    ws = new WebSocket('ws://localhost:8000/ws/scan-id-here');
+    ws = new WebSocket('ws://localhost:8000/ws/scan-id-here?token=' + userToken + '&since=' + lastSeq);
     ws.onmessage = (event) => {
         const msg = JSON.parse(event.data);
+        lastSeq = msg.seq ?? lastSeq;
         console.log(msg.type, msg.data);
     };
     """
+    try:
+        user_id = websocket_user(websocket)
+        # Scan events come only from jobs, which record the owner: no job means no subscription
+        await _owned_scan_job(scan_id, user_id)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    
     await manager.connect(websocket)
-    await manager.subscribe(websocket, scan_id)
     
     try:
-        # Send connected message
-        await manager.broadcast_to_topic(scan_id, WebSocketMessage(
+        # Send connected message (to this client only, not sequenced)
+        await manager.send(websocket, WebSocketMessage(
             type="status",
             data={
                 "status": "connected",
                 "scan_id": scan_id,
+                "since": since,
                 "timestamp": datetime.utcnow().isoformat()
             }
-        ))
+        ).model_dump(mode='json'))
+        await manager.subscribe(websocket, scan_id, since)
         
         # Keep connection alive and listen for messages
         while True:
@@ -385,7 +571,7 @@ async def websocket_endpoint(websocket: WebSocket, scan_id: str):
 # SCAN MANAGEMENT ENDPOINTS
 # ============================================================================
 
-@app.post("/api/scans")
+@app.post("/api/scans", dependencies=[Depends(current_user)])
 async def create_scan(scan: ComplianceScan):
     """Create a new compliance scan"""
     try:
@@ -400,23 +586,214 @@ async def create_scan(scan: ComplianceScan):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _owned_scan_job(scan_id: str, user_id: str) -> ScanJob:
+    """Latest job for a scan; other users' scans are reported as not found"""
+    job = await asyncio.to_thread(job_queue.latest_for_scan, scan_id)
+    if not job or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail=f"Scan {scan_id} not found")
+    return job
+
+
 @app.get("/api/scans/{scan_id}")
-async def get_scan(scan_id: str):
+async def get_scan(scan_id: str, user_id: str = Depends(current_user)):
     """Get scan status and results"""
-    # In production, this would query a database
+    job = await _owned_scan_job(scan_id, user_id)
+    
     return {
         "scan_id": scan_id,
-        "status": "completed",
-        "evidence_count": 0,
-        "timestamp": datetime.utcnow().isoformat()
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "attempts": job.attempts,
+        "evidence_count": await asyncio.to_thread(evidence_store.count_evidence, scan_id),
+        "checkpoints": await asyncio.to_thread(evidence_store.checkpoints, scan_id),
+        "error": job.error,
+        "timestamp": job.updated_at.isoformat()
     }
 
 
+@app.post("/api/scans/{scan_id}/resume")
+async def resume_scan(scan_id: str, resume: Optional[ScanResumeRequest] = None,
+                      user_id: str = Depends(current_user)):
+    """Continue a failed or interrupted scan from its last checkpoint"""
+    job = await _owned_scan_job(scan_id, user_id)
+    if job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+        raise HTTPException(status_code=409, detail=f"Scan {scan_id} is already {job.status.value}")
+    if job.status == JobStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Scan {scan_id} already completed")
+    
+    payload = dict(job.payload)
+    if resume and resume.cookies:
+        # Sessions often expire before a long scan is resumed
+        payload['request'] = {
+            **payload['request'],
+            'cookies': [c.model_dump() for c in resume.cookies]
+        }
+    payload['resume'] = True
+    check_pending_scans(await asyncio.to_thread(job_queue.pending_for_user, user_id))
+    await _require_live_session(ScrapeRequest(**payload['request']), user_id)
+    
+    new_job = await asyncio.to_thread(
+        job_queue.enqueue, job.kind, scan_id, payload, job.priority, user_id
+    )
+    return {
+        "scan_id": scan_id,
+        "job_id": new_job.job_id,
+        "status": new_job.status.value,
+        "checkpoints": await asyncio.to_thread(evidence_store.checkpoints, scan_id),
+        "message": f"Connect to WebSocket at /ws/{scan_id} for updates"
+    }
+
+
+async def _evidence_texts(scan_id: str) -> AsyncIterator[List[str]]:
+    """Stored evidence text for a scan, one store batch at a time"""
+    batches = evidence_store.iter_evidence(scan_id, batch_size=settings.SCORING_CHUNK_SIZE * 4)
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            return
+        yield [evidence_text(item) for item in batch]
+
+
+async def _scan_scores(scan_id: str) -> Dict[str, Any]:
+    """Scoring aggregates for a scan, recomputed only when its evidence changed since the last run"""
+    if not await asyncio.to_thread(evidence_store.count_evidence, scan_id):
+        raise HTTPException(status_code=404, detail=f"No evidence stored for scan {scan_id}")
+    # Read before scoring: evidence saved meanwhile leaves the saved result stale, not wrong
+    version = await asyncio.to_thread(evidence_store.evidence_version, scan_id)
+    result = await asyncio.to_thread(evidence_store.get_scores, scan_id, version)
+    if result is None:
+        # A root span in the scan's trace, next to the attempts that collected the evidence
+        with scan_trace(scan_id, "scan.score", evidence_version=version):
+            result = await scoring_executor.scan(_evidence_texts(scan_id))
+            with span("scores.save"):
+                await asyncio.to_thread(evidence_store.save_scores, scan_id, version, result)
+    return result
+
+
+@app.post("/api/scans/{scan_id}/score")
+async def score_scan(scan_id: str, user_id: str = Depends(current_user)):
+    """Policy compliance scores for all evidence collected by a scan"""
+    await _owned_scan_job(scan_id, user_id)
+    result = await _scan_scores(scan_id)
+    return {"scan_id": scan_id, **result}
+
+
+@app.get("/api/scans/{scan_id}/report")
+async def scan_report(scan_id: str, format: ReportFormat = Query(default=ReportFormat.PDF),
+                      user_id: str = Depends(current_user)):
+    """
+    Per-policy and per-KPA compliance report, rendered from the scan's scoring
+    aggregates and streamed (PDF page by page, HTML section by section)
+    """
+    await _owned_scan_job(scan_id, user_id)
+    scores = await _scan_scores(scan_id)
+    disposition = "attachment" if format == ReportFormat.PDF else "inline"
+    return StreamingResponse(
+        render_report(scan_id, scores, format),
+        media_type=REPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'{disposition}; filename="{report_filename(scan_id, format)}"'}
+    )
+
+
+@app.get("/api/scans/{scan_id}/export")
+async def export_scan(scan_id: str,
+                      format: ExportFormat = Query(default=ExportFormat.CSV),
+                      compression: ExportCompression = Query(default=ExportCompression.NONE),
+                      platform: Optional[PlatformType] = None,
+                      user_id: str = Depends(current_user)):
+    """
+    Download a scan's evidence as CSV, JSON Lines or Parquet, streamed from the
+    evidence store in batches (optionally gzip/zstd compressed)
+    """
+    await _owned_scan_job(scan_id, user_id)
+    reason = unavailable_reason(format, compression)
+    if reason:
+        raise HTTPException(status_code=501, detail=reason)
+    platform_id = platform.value if platform else None
+    if not await asyncio.to_thread(evidence_store.count_evidence, scan_id, platform_id):
+        raise HTTPException(status_code=404, detail=f"No evidence stored for scan {scan_id}")
+    
+    # A sync iterator: StreamingResponse pulls each chunk in a worker thread
+    return StreamingResponse(
+        export_evidence(evidence_store, scan_id, format, compression, platform_id),
+        media_type=export_media_type(format, compression),
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_filename(scan_id, format, compression)}"'
+        }
+    )
+
+
+@app.get("/api/scans/{scan_id}/trace")
+async def get_scan_trace(scan_id: str, user_id: str = Depends(current_user)):
+    """Span tree for a scan (every attempt), with the critical path through it"""
+    await _owned_scan_job(scan_id, user_id)
+    spans = await asyncio.to_thread(get_exporter().get_spans, scan_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail=f"No trace recorded for scan {scan_id}")
+    
+    roots = build_span_tree(spans)
+    starts = [s["start_time_unix_nano"] for s in spans]
+    ends = [s["end_time_unix_nano"] for s in spans if s["end_time_unix_nano"]]
+    return {
+        "scan_id": scan_id,
+        "trace_id": trace_id_for_scan(scan_id),
+        "span_count": len(spans),
+        "duration_ms": (max(ends) - min(starts)) / 1e6 if ends else None,
+        "critical_path": critical_path(roots),
+        "spans": roots
+    }
+
+
+# ============================================================================
+# SCHEDULED SCAN ENDPOINTS
+# ============================================================================
+
+@app.post("/api/schedules")
+async def create_schedule(request: ScanScheduleRequest, user_id: str = Depends(current_user)):
+    """
+    Create a recurring scan. Each run queues one incremental scan per platform,
+    a jittered moment after its cron time (UTC); the cookies are stored encrypted
+    """
+    check_schedule_count(await asyncio.to_thread(schedule_store.count_for_user, user_id))
+    try:
+        schedule = await asyncio.to_thread(schedule_store.create, user_id, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schedule.model_dump(mode='json')
+
+
+@app.get("/api/schedules")
+async def list_schedules(user_id: str = Depends(current_user)):
+    schedules = await asyncio.to_thread(schedule_store.list_for_user, user_id)
+    return {"schedules": [s.model_dump(mode='json') for s in schedules]}
+
+
+async def _owned_schedule(schedule_id: str, user_id: str) -> ScanSchedule:
+    schedule = await asyncio.to_thread(schedule_store.get, schedule_id)
+    if not schedule or schedule.user_id != user_id:
+        raise HTTPException(status_code=404, detail=f"Schedule {schedule_id} not found")
+    return schedule
+
+
+@app.get("/api/schedules/{schedule_id}")
+async def get_schedule(schedule_id: str, user_id: str = Depends(current_user)):
+    schedule = await _owned_schedule(schedule_id, user_id)
+    return schedule.model_dump(mode='json')
+
+
+@app.delete("/api/schedules/{schedule_id}")
+async def delete_schedule(schedule_id: str, user_id: str = Depends(current_user)):
+    """Stop a recurring scan; scans it already queued still run"""
+    await _owned_schedule(schedule_id, user_id)
+    await asyncio.to_thread(schedule_store.delete, schedule_id)
+    return {"schedule_id": schedule_id, "status": "deleted"}
+
+
 # ============================================================================
 # UTILITY ENDPOINTS
 # ============================================================================
 
-@app.get("/api/supported-platforms")
+@app.get("/api/supported-platforms", dependencies=[Depends(current_user)])
 async def get_supported_platforms():
     """List supported platforms"""
     return {
@@ -455,13 +832,15 @@ async def get_supported_platforms():
     }
 
 
-@app.get("/api/config/encryption-key")
+@app.get("/api/config/encryption-key", dependencies=[Depends(current_user)])
 async def get_encryption_key_status():
     """Check if encryption key is configured"""
     return {
-        "configured": bool(settings.ENCRYPTION_KEY),
+        "configured": not encryption_key_is_ephemeral(),
         "key_length": len(settings.ENCRYPTION_KEY) if settings.ENCRYPTION_KEY else 0,
-        "message": "Encryption key is configured" if settings.ENCRYPTION_KEY else "Generate key: from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+        "key_id": credential_manager.key_id,
+        "pending_rotation": await asyncio.to_thread(credential_manager.pending_rotation),
+        "message": "Encryption key is configured" if not encryption_key_is_ephemeral() else "Generate key: from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
     }
 
 
@@ -0,0 +1,170 @@
+
+# 11. metrics.py - Prometheus metrics for the scrape pipeline
+metrics_py = '''"""
+VAMP Agent Prometheus Metrics
+Scrape pipeline, WebSocket and credential timings, labelled by connector class
+
+Multi-process deployments (gunicorn workers, job worker pool) must export
+PROMETHEUS_MULTIPROC_DIR to an empty directory before starting so /metrics
+aggregates every process.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+)
+from prometheus_client import multiprocess
+
+if TYPE_CHECKING:
+    # Imported where connector sessions are created, so importing metrics doesn't load it
+    import aiohttp
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 120, 600)
+
+CONNECTOR_REQUEST_SECONDS = Histogram(
+    'vamp_connector_request_seconds',
+    'Outbound platform HTTP request latency',
+    ['connector', 'method', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+CONNECTOR_PAGES = Counter(
+    'vamp_connector_pages_total',
+    'Result pages fetched from platforms',
+    ['connector']
+)
+CONNECTOR_ITEMS = Counter(
+    'vamp_connector_items_total',
+    'Raw evidence items fetched from platforms',
+    ['connector']
+)
+SCRAPE_ITEMS_PER_SECOND = Gauge(
+    'vamp_scrape_items_per_second',
+    'Evidence throughput of the most recently finished scrape',
+    ['connector'],
+    multiprocess_mode='max'
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    'vamp_pipeline_stage_seconds',
+    'Time spent per scrape pipeline stage (fetch, filter, convert, persist, score)',
+    ['connector', 'stage'],
+    buckets=STAGE_BUCKETS
+)
+SCRAPES = Counter(
+    'vamp_scrapes_total',
+    'Finished scrapes by outcome',
+    ['connector', 'outcome']
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    'vamp_websocket_connections',
+    'Open WebSocket connections',
+    multiprocess_mode='livesum'
+)
+WEBSOCKET_QUEUE_DEPTH = Gauge(
+    'vamp_websocket_pending_messages',
+    'Messages held for WebSocket clients still receiving a replay',
+    multiprocess_mode='livesum'
+)
+JOB_QUEUE_DEPTH = Gauge(
+    'vamp_job_queue_depth',
+    'Queued scan jobs',
+    multiprocess_mode='max'
+)
+CREDENTIAL_CRYPTO_SECONDS = Histogram(
+    'vamp_credential_crypto_seconds',
+    'Credential store decrypt/encrypt time including file I/O',
+    ['operation'],
+    buckets=STAGE_BUCKETS
+)
+QUOTA_REJECTIONS = Counter(
+    'vamp_quota_rejections_total',
+    'Requests rejected by a per-user quota (api_rate, sync_scrapes, pending_scans)',
+    ['quota']
+)
+SCHEDULED_RUNS = Counter(
+    'vamp_scheduled_runs_total',
+    'Due schedule runs, dispatched to the job queue or skipped over a user quota',
+    ['outcome']
+)
+REPORT_SECTIONS = Counter(
+    'vamp_report_sections_total',
+    'Compliance report sections served, by format and whether they were re-rendered',
+    ['format', 'result']
+)
+SCRAPES_IN_FLIGHT = Gauge(
+    'vamp_scrapes_in_flight',
+    'Synchronous scrapes holding an admission slot',
+    ['platform'],
+    multiprocess_mode='livesum'
+)
+SCRAPE_QUEUE_DEPTH = Gauge(
+    'vamp_scrape_queue_depth',
+    'Synchronous scrapes waiting for an admission slot',
+    multiprocess_mode='livesum'
+)
+SCRAPE_ADMISSIONS = Counter(
+    'vamp_scrape_admissions_total',
+    'Synchronous scrape admission decisions: admitted, queued (then admitted), rejected or timeout',
+    ['platform', 'outcome']
+)
+CONTENT_FETCHES = Counter(
+    'vamp_content_fetches_total',
+    'Evidence content handles resolved: fetched, cached, skipped (not text or too large) or error',
+    ['result']
+)
+
+
+@contextmanager
+def stage_timer(connector: str, stage: str) -> Iterator[None]:
+    """Observe the duration of one pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(connector=connector, stage=stage).observe(
+            time.perf_counter() - start
+        )
+
+
+def connector_trace_config(connector: str) -> "aiohttp.TraceConfig":
+    """aiohttp hooks recording request latency and status for a connector"""
+    import aiohttp
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        CONNECTOR_REQUEST_SECONDS.labels(
+            connector=connector, method=params.method, status=str(params.response.status)
+        ).observe(time.perf_counter() - context.start)
+
+    async def on_request_exception(session, context, params):
+        CONNECTOR_REQUEST_SECONDS.labels(
+            connector=connector, method=params.method, status='error'
+        ).observe(time.perf_counter() - context.start)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+def render_metrics() -> bytes:
+    """Prometheus text exposition, aggregated across processes when configured"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+'''
+
+print("=== METRICS.PY ===")
+print(metrics_py[:2000])
+print(f"\n... [Full file is {len(metrics_py.splitlines())} lines] ...\n")
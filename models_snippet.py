@@ -26,13 +26,23 @@ class EvidenceStatus(str, Enum):
     ARCHIVED = "archived"
 
 
+class ContentHandle(BaseModel):
+    """Where an evidence item's full content can be fetched, until something needs it"""
+    platform: PlatformType
+    evidence_id: str
+    url: str
+    content_type: Optional[str] = None
+    size: Optional[int] = None  # bytes, when the platform reports it
+
+
 class Evidence(BaseModel):
     """Evidence item from connected platforms"""
     id: str
     platform: PlatformType
     title: str
     description: Optional[str] = None
-    content: Optional[str] = None
+    content: Optional[str] = None  # resolved from content_handle on request
+    content_handle: Optional[ContentHandle] = None
     created_date: datetime
     modified_date: Optional[datetime] = None
     url: Optional[str] = None
@@ -75,6 +85,15 @@ class ScrapeRequest(BaseModel):
     end_year: int = Field(default=2025)
     include_filters: Optional[List[str]] = None
     exclude_filters: Optional[List[str]] = None
+    priority: int = Field(default=0, ge=0, le=9)  # higher runs first (async scans)
+    since: Optional[datetime] = None  # incremental scans: only evidence after this (UTC)
+    include_content: bool = False  # fetch full content for items that pass the filters
+
+
+class SessionCheckRequest(BaseModel):
+    """Session cookies (or the caller's saved credentials) to verify before scraping"""
+    platform: PlatformType
+    cookies: List[SessionCookie] = Field(default_factory=list)
 
 
 class ScrapeResponse(BaseModel):
@@ -91,6 +110,7 @@ class WebSocketMessage(BaseModel):
     type: str  # "status", "evidence", "progress", "error"
     data: Dict[str, Any]
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    seq: Optional[int] = None  # per-topic order; reconnect with ?since=<seq>
 
 
 class ComplianceScan(BaseModel):
@@ -108,6 +128,94 @@ class ComplianceScan(BaseModel):
     errors: List[str] = Field(default_factory=list)
 
 
+class ScanResumeRequest(BaseModel):
+    """Resume a scan from its last checkpoint, optionally with refreshed cookies"""
+    cookies: Optional[List[SessionCookie]] = None
+
+
+class JobStatus(str, Enum):
+    """Durable job lifecycle status"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ExportFormat(str, Enum):
+    """Evidence export file formats"""
+    CSV = "csv"
+    JSONL = "jsonl"
+    PARQUET = "parquet"
+
+
+class ExportCompression(str, Enum):
+    """Export compression (for Parquet: the codec inside the file)"""
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+
+class ScanScheduleRequest(BaseModel):
+    """Recurring scan: a cron expression (UTC) and the platforms to scan"""
+    name: str = Field(..., min_length=1, max_length=100)
+    cron: str  # "0 2 * * *", or @hourly / @daily / @weekly / @monthly
+    platforms: List[PlatformType] = Field(..., min_length=1)
+    cookies: List[SessionCookie] = Field(default_factory=list)
+    include_filters: Optional[List[str]] = None
+    exclude_filters: Optional[List[str]] = None
+    lookback_days: int = Field(default=30, ge=1, le=366)  # window of the first run
+    jitter_seconds: Optional[int] = Field(default=None, ge=0, le=86400)  # None: SCHEDULE_JITTER_SECONDS
+    priority: int = Field(default=0, ge=0, le=9)
+    include_content: bool = False
+    enabled: bool = True
+
+
+class ScanSchedule(BaseModel):
+    """Stored schedule, without its cookies"""
+    schedule_id: str
+    user_id: str
+    name: str
+    cron: str
+    platforms: List[PlatformType]
+    include_filters: Optional[List[str]] = None
+    exclude_filters: Optional[List[str]] = None
+    priority: int = 0
+    include_content: bool = False
+    lookback_days: int
+    jitter_seconds: int
+    enabled: bool
+    next_run_at: datetime  # cron time plus this run's jitter
+    last_run_at: Optional[datetime] = None  # last dispatch
+    last_scan_ids: List[str] = Field(default_factory=list)
+    # Per platform: end of the last window whose scan completed; the next run scans from here
+    completed_through: Dict[str, datetime] = Field(default_factory=dict)
+    last_error: Optional[str] = None
+    created_at: datetime
+
+
+class ReportFormat(str, Enum):
+    """Compliance report formats"""
+    HTML = "html"
+    PDF = "pdf"
+
+
+class ScanJob(BaseModel):
+    """Job record held by the durable job queue"""
+    job_id: str
+    kind: str
+    scan_id: str
+    user_id: str = "default"  # config.DEFAULT_USER
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    priority: int = 0
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 5
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class CredentialPayload(BaseModel):
     """Payload for saving service credentials"""
     service: PlatformType
@@ -123,132 +231,249 @@ print("\n\n")
 session_based_py = '''"""
 Session-based connectors using browser cookies and saved credentials
 """
-import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
-from abc import ABC, abstractmethod
-import aiohttp
 import asyncio
-from dateutil.relativedelta import relativedelta
+import hashlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Optional, Any, AsyncIterator, Tuple
+from urllib.parse import quote, unquote
+from xml.etree import ElementTree
 import logging
 
+from config import settings
+from connectors.base import EvidencePage, SessionConnector, html_text
+# Importable from here for existing callers; both now live elsewhere
+from connectors.base import ConnectorError, SessionExpiredError  # noqa: F401
+from connectors.registry import ConnectorFactory  # noqa: F401
+
 logger = logging.getLogger(__name__)
 
 
-class SessionConnector(ABC):
-    """Base class for session-based connectors"""
-    
-    def __init__(self, cookies: Dict[str, str] = None, timeout: int = 30):
-        self.cookies = cookies or {}
-        self.timeout = timeout
-        self.session = None
+class OutlookConnector(SessionConnector):
+    """
+    Outlook connector using session cookies.
+    Crawls every mail folder (Sent Items, archives, subfolders) by default, or
+    only the inbox with all_folders=False. Attachment metadata comes with each
+    message; attachment content is fetched on demand from its content_url.
+    """
     
-    async def __aenter__(self):
-        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
-        return self
+    BASE_URL = "https://outlook.office365.com/api/v2.0"
+    HEADERS = {
+        'Accept': 'application/json',
+        'Content-Type': 'application/json'
+    }
+    MESSAGE_FIELDS = 'id,subject,receivedDateTime,sentDateTime,from,bodyPreview,categories,hasAttachments,webLink'
+    ATTACHMENT_FIELDS = 'id,name,contentType,size,isInline'  # no contentBytes
+    FOLDER_FIELDS = 'id,displayName,childFolderCount,totalItemCount'
     
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+    def __init__(self, cookies: Dict[str, str] = None, timeout: int = 30, all_folders: bool = True,
+                 folder_concurrency: int = 4, excluded_folders: List[str] = None):
+        super().__init__(cookies=cookies, timeout=timeout)
+        self.all_folders = all_folders
+        self.folder_concurrency = max(1, folder_concurrency)
+        self.excluded_folders = excluded_folders or []  # well-known names or folder ids
     
-    def _build_cookie_dict(self, cookies_list: List[Dict]) -> Dict:
-        """Build cookie dictionary from list of cookie objects"""
-        cookie_dict = {}
-        for cookie in cookies_list:
-            cookie_dict[cookie.get('name')] = cookie.get('value')
-        return cookie_dict
+    @classmethod
+    def from_session(cls, cookies: List[Dict] = None, credentials: Dict = None) -> "OutlookConnector":
+        return cls(
+            cookies={c['name']: c['value'] for c in (cookies or [])},
+            all_folders=settings.OUTLOOK_CRAWL_ALL_FOLDERS,
+            folder_concurrency=settings.OUTLOOK_FOLDER_CONCURRENCY,
+            excluded_folders=[name.strip() for name in settings.OUTLOOK_EXCLUDED_FOLDERS.split(',') if name.strip()]
+        )
     
-    def _filter_by_date_range(self, items: List[Dict], start_date: datetime, 
-                              end_date: datetime, date_field: str = 'created_date') -> List[Dict]:
-        """Filter items by date range"""
-        filtered = []
-        for item in items:
-            try:
-                item_date = item.get(date_field)
-                if isinstance(item_date, str):
-                    item_date = datetime.fromisoformat(item_date.replace('Z', '+00:00'))
-                
-                if start_date <= item_date <= end_date:
-                    filtered.append(item)
-            except Exception as e:
-                logger.warning(f"Error parsing date for item: {e}")
-        return filtered
-    
-    @abstractmethod
     async def connect(self):
-        """Establish connection"""
-        pass
+        """Connect using cookies"""
+        logger.info("Connecting to Outlook via session cookies")
+    
+    def _preflight_request(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        return 'GET', f"{self.BASE_URL}/me", {'headers': {'Accept': 'application/json'}, 'cookies': self.cookies}
     
-    @abstractmethod
     async def fetch_evidence(self, start_date: datetime, end_date: datetime) -> List[Dict]:
-        """Fetch evidence items"""
-        pass
+        """Fetch emails from Outlook"""
+        return await self._collect_pages(start_date, end_date)
     
-    @abstractmethod
-    async def disconnect(self):
-        """Close connection"""
-        pass
-
-
-class OutlookConnector(SessionConnector):
-    """Outlook connector using session cookies"""
+    async def _get_json(self, url: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        async with self.session.get(url, headers=self.HEADERS, cookies=self.cookies, params=params) as resp:
+            if resp.status != 200:
+                raise self._status_error("Outlook API error", resp.status)
+            return await resp.json()
     
-    BASE_URL = "https://outlook.office365.com/api/v2.0"
+    async def _resolve_folder_ids(self, names: List[str]) -> List[str]:
+        """Folder ids for well-known names such as deleteditems; unknown names are skipped"""
+        async def resolve(name: str) -> Optional[str]:
+            async with self.session.get(f"{self.BASE_URL}/me/mailFolders/{quote(name)}", headers=self.HEADERS,
+                                        cookies=self.cookies, params={'$select': 'id'}) as resp:
+                if resp.status == 404:
+                    return None
+                if resp.status != 200:
+                    raise self._status_error("Outlook API error", resp.status)
+                return (await resp.json()).get('id')
+        
+        return [folder_id for folder_id in await asyncio.gather(*(resolve(name) for name in names)) if folder_id]
     
-    async def connect(self):
-        """Connect using cookies"""
-        logger.info("Connecting to Outlook via session cookies")
+    async def _child_folders(self, url: str, semaphore: asyncio.Semaphore) -> List[Dict[str, Any]]:
+        folders = []
+        params = {'$select': self.FOLDER_FIELDS, '$top': 100}
+        async with semaphore:
+            while url:
+                data = await self._get_json(url, params)
+                folders.extend(data.get('value', []))
+                url, params = data.get('@odata.nextLink'), None
+        return folders
     
-    async def fetch_evidence(self, start_date: datetime, end_date: datetime) -> List[Dict]:
-        """Fetch emails from Outlook"""
+    async def _list_folders(self) -> List[Dict[str, Any]]:
+        """
+        Every non-empty mail folder as {'id', 'path', 'next_link'}, walked breadth
+        first; the child folder listings of one level are fetched concurrently.
+        """
+        excluded = set(self.excluded_folders) | set(await self._resolve_folder_ids(self.excluded_folders))
+        semaphore = asyncio.Semaphore(self.folder_concurrency)
+        folders = []
+        level = [(f"{self.BASE_URL}/me/mailFolders", '')]
+        while level:
+            listings = await asyncio.gather(*(self._child_folders(url, semaphore) for url, _ in level))
+            parents, level = [parent for _, parent in level], []
+            for parent, children in zip(parents, listings):
+                for folder in children:
+                    if folder.get('id') in excluded:
+                        continue
+                    path = f"{parent}/{folder.get('displayName', '')}" if parent else folder.get('displayName', '')
+                    if folder.get('totalItemCount', 1):
+                        folders.append({'id': folder['id'], 'path': path, 'next_link': None})
+                    if folder.get('childFolderCount'):
+                        level.append((f"{self.BASE_URL}/me/mailFolders/{quote(folder['id'])}/childFolders", path))
+        logger.info(f"Outlook: crawling {len(folders)} mail folder(s)")
+        return folders
+    
+    async def fetch_evidence_pages(self, start_date: datetime, end_date: datetime,
+                                   cursor: Optional[Dict[str, Any]] = None) -> AsyncIterator[EvidencePage]:
+        """
+        Fetch emails page by page, following @odata.nextLink in each folder.
+        Up to folder_concurrency folders are paged at once and pages are yielded
+        as they arrive. The cursor holds every unfinished folder with the next
+        link after its last yielded page, so a resume skips nothing and repeats
+        only pages that were fetched but not yet yielded.
+        """
         if not self.session:
             raise RuntimeError("Session not initialized")
         
+        if cursor and 'folders' in cursor:
+            folders = cursor['folders']
+        elif cursor and cursor.get('next_link'):
+            # Checkpoint saved by an inbox-only scan
+            folders = [{'id': 'inbox', 'path': 'Inbox', 'next_link': cursor['next_link']}]
+        elif self.all_folders:
+            folders = await self._list_folders()
+        else:
+            folders = [{'id': 'inbox', 'path': 'Inbox', 'next_link': None}]
+        
+        # Filter emails by date range
+        params = {
+            '$filter': f"receivedDateTime ge {start_date.isoformat()} and receivedDateTime le {end_date.isoformat()}",
+            '$top': 100,
+            '$select': self.MESSAGE_FIELDS,
+            '$expand': f"attachments($select={self.ATTACHMENT_FIELDS})"
+        }
+        remaining = {folder['id']: dict(folder) for folder in folders}
+        todo = list(remaining.values())
+        # Bounded: folder workers wait while the scrape is still handling earlier pages
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.folder_concurrency)
+        
+        async def crawl_folders():
+            try:
+                while todo:
+                    folder = todo.pop(0)
+                    url = folder['next_link']
+                    while True:
+                        if url:
+                            data = await self._get_json(url)
+                        else:
+                            data = await self._get_json(
+                                f"{self.BASE_URL}/me/mailFolders/{quote(folder['id'])}/messages", params
+                            )
+                        items = [self._message_item(msg, folder['path']) for msg in data.get('value', [])]
+                        url = data.get('@odata.nextLink')
+                        await pages.put((folder['id'], items, url))
+                        if not url:
+                            break
+                await pages.put(None)
+            except Exception as e:
+                await pages.put(e)
+        
+        if not todo:
+            yield [], None
+            return
+        workers = [asyncio.create_task(crawl_folders()) for _ in range(min(self.folder_concurrency, len(todo)))]
+        running = len(workers)
         try:
-            # Filter emails by date range
-            filter_query = f"receivedDateTime ge {start_date.isoformat()} and receivedDateTime le {end_date.isoformat()}"
-            
-            headers = {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json'
-            }
-            
-            # Make authenticated request with cookies
-            url = f"{self.BASE_URL}/me/mailFolders/inbox/messages"
-            params = {
-                '$filter': filter_query,
-                '$top': 100,
-                '$select': 'id,subject,receivedDateTime,sentDateTime,from,bodyPreview'
-            }
-            
-            async with self.session.get(url, headers=headers, cookies=self.cookies, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    messages = data.get('value', [])
-                    
-                    evidence_items = []
-                    for msg in messages:
-                        evidence_items.append({
-                            'id': msg.get('id'),
-                            'platform': 'outlook',
-                            'title': msg.get('subject', 'Untitled'),
-                            'description': msg.get('bodyPreview'),
-                            'created_date': msg.get('receivedDateTime'),
-                            'url': f"https://outlook.office365.com/mail/inbox/{msg.get('id')}",
-                            'metadata': {
-                                'sender': msg.get('from', {}).get('emailAddress', {}).get('address', 'unknown'),
-                                'categories': msg.get('categories', [])
-                            }
-                        })
-                    
-                    return evidence_items
+            while running:
+                page = await pages.get()
+                if page is None:
+                    running -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                folder_id, evidence_items, next_link = page
+                if next_link:
+                    remaining[folder_id]['next_link'] = next_link
                 else:
-                    logger.error(f"Outlook API error: {resp.status}")
-                    return []
-        
-        except Exception as e:
-            logger.error(f"Error fetching Outlook evidence: {e}")
-            return []
+                    del remaining[folder_id]
+                yield evidence_items, ({'folders': [dict(f) for f in remaining.values()]} if remaining else None)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    def _message_item(self, msg: Dict[str, Any], folder_path: str) -> Dict[str, Any]:
+        message_id = msg.get('id')
+        metadata = {
+            'sender': msg.get('from', {}).get('emailAddress', {}).get('address', 'unknown'),
+            'categories': msg.get('categories', []),
+            'folder': folder_path
+        }
+        if msg.get('attachments'):
+            metadata['attachments'] = [{
+                'id': attachment.get('id'),
+                'name': attachment.get('name'),
+                'content_type': attachment.get('contentType'),
+                'size': attachment.get('size'),
+                'inline': attachment.get('isInline', False),
+                'content_url': self.attachment_content_url(message_id, attachment.get('id'))
+            } for attachment in msg['attachments']]
+        return {
+            'id': message_id,
+            'platform': 'outlook',
+            'title': msg.get('subject', 'Untitled'),
+            'description': msg.get('bodyPreview'),
+            # bodyPreview is the first 255 characters; the full body is fetched on request
+            'content_handle': {'url': f"{self.BASE_URL}/me/messages/{quote(message_id or '')}?$select=body"},
+            'created_date': msg.get('receivedDateTime'),
+            'url': msg.get('webLink') or f"https://outlook.office365.com/mail/inbox/{message_id}",
+            'metadata': metadata
+        }
+    
+    async def fetch_content(self, handle: Dict[str, Any], max_bytes: int) -> Optional[str]:
+        """Full message body, as text"""
+        if not self.session:
+            raise RuntimeError("Session not initialized")
+        body = (await self._get_json(handle['url'])).get('body') or {}
+        text = body.get('content') or ''
+        if (body.get('contentType') or '').lower() == 'html':
+            text = html_text(text)
+        return text[:max_bytes]
+    
+    def attachment_content_url(self, message_id: str, attachment_id: str) -> str:
+        return f"{self.BASE_URL}/me/messages/{quote(message_id)}/attachments/{quote(attachment_id)}/$value"
+    
+    async def fetch_attachment_content(self, content_url: str) -> bytes:
+        """Raw bytes of one attachment, from the content_url in its message's metadata"""
+        if not self.session:
+            raise RuntimeError("Session not initialized")
+        async with self.session.get(content_url, cookies=self.cookies) as resp:
+            if resp.status != 200:
+                raise self._status_error("Outlook attachment error", resp.status)
+            return await resp.read()
     
     async def disconnect(self):
         """Close connection"""
@@ -264,57 +489,59 @@ class OneDriveConnector(SessionConnector):
         """Connect using cookies"""
         logger.info("Connecting to OneDrive via session cookies")
     
+    def _preflight_request(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        return 'GET', f"{self.BASE_URL}/me", {'headers': {'Accept': 'application/json'}, 'cookies': self.cookies}
+    
     async def fetch_evidence(self, start_date: datetime, end_date: datetime) -> List[Dict]:
         """Fetch files from OneDrive"""
+        return await self._collect_pages(start_date, end_date)
+    
+    async def fetch_evidence_pages(self, start_date: datetime, end_date: datetime,
+                                   cursor: Optional[Dict[str, Any]] = None) -> AsyncIterator[EvidencePage]:
+        """Fetch recent files page by page, following @odata.nextLink"""
         if not self.session:
             raise RuntimeError("Session not initialized")
         
-        try:
-            headers = {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json'
-            }
+        headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+        
+        # Get recent files
+        url = (cursor or {}).get('next_link') or f"{self.BASE_URL}/me/drive/recent"
+        
+        while url:
+            async with self.session.get(url, headers=headers, cookies=self.cookies) as resp:
+                if resp.status != 200:
+                    raise self._status_error("OneDrive API error", resp.status)
+                data = await resp.json()
             
-            # Get recent files
-            url = f"{self.BASE_URL}/me/drive/recent"
+            evidence_items = [
+                {
+                    'id': file.get('id'),
+                    'platform': 'onedrive',
+                    'title': file.get('name', 'Untitled'),
+                    'description': f"File in {file.get('parentReference', {}).get('path', '/')}",
+                    'content_handle': {
+                        'url': f"{self.BASE_URL}/me/drive/items/{quote(file.get('id') or '')}/content",
+                        'content_type': file.get('file', {}).get('mimeType'),
+                        'size': file.get('size')
+                    },
+                    'created_date': file.get('createdDateTime'),
+                    'modified_date': file.get('lastModifiedDateTime'),
+                    'url': file.get('webUrl'),
+                    'metadata': {
+                        'size': file.get('size'),
+                        'file_type': file.get('file', {}).get('mimeType', 'unknown')
+                    }
+                }
+                for file in data.get('value', [])
+            ]
+            # /recent has no server-side date filter
+            evidence_items = self._filter_by_date_range(evidence_items, start_date, end_date)
             
-            async with self.session.get(url, headers=headers, cookies=self.cookies) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    files = data.get('value', [])
-                    
-                    evidence_items = []
-                    for file in files:
-                        created = file.get('createdDateTime', '')
-                        modified = file.get('lastModifiedDateTime', '')
-                        
-                        try:
-                            created_dt = datetime.fromisoformat(created.replace('Z', '+00:00'))
-                            if start_date <= created_dt <= end_date:
-                                evidence_items.append({
-                                    'id': file.get('id'),
-                                    'platform': 'onedrive',
-                                    'title': file.get('name', 'Untitled'),
-                                    'description': f"File in {file.get('parentReference', {}).get('path', '/')}",
-                                    'created_date': created,
-                                    'modified_date': modified,
-                                    'url': file.get('webUrl'),
-                                    'metadata': {
-                                        'size': file.get('size'),
-                                        'file_type': file.get('file', {}).get('mimeType', 'unknown')
-                                    }
-                                })
-                        except:
-                            pass
-                    
-                    return evidence_items
-                else:
-                    logger.error(f"OneDrive API error: {resp.status}")
-                    return []
-        
-        except Exception as e:
-            logger.error(f"Error fetching OneDrive evidence: {e}")
-            return []
+            url = data.get('@odata.nextLink')
+            yield evidence_items, ({'next_link': url} if url else None)
     
     async def disconnect(self):
         """Close connection"""
@@ -330,55 +557,80 @@ class GoogleDriveConnector(SessionConnector):
         """Connect using cookies"""
         logger.info("Connecting to Google Drive via session cookies")
     
+    def _preflight_request(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        return 'GET', f"{self.BASE_URL}/about", {
+            'headers': {'Accept': 'application/json'},
+            'cookies': self.cookies,
+            'params': {'fields': 'user'}
+        }
+    
     async def fetch_evidence(self, start_date: datetime, end_date: datetime) -> List[Dict]:
         """Fetch files from Google Drive"""
+        return await self._collect_pages(start_date, end_date)
+    
+    async def fetch_evidence_pages(self, start_date: datetime, end_date: datetime,
+                                   cursor: Optional[Dict[str, Any]] = None) -> AsyncIterator[EvidencePage]:
+        """Fetch files page by page, following nextPageToken"""
         if not self.session:
             raise RuntimeError("Session not initialized")
         
-        try:
-            headers = {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json'
-            }
-            
-            # Query files by creation date
-            query = f"createdTime >= \\'{start_date.isoformat()}Z\\' and createdTime <= \\'{end_date.isoformat()}Z\\'"
-            url = f"{self.BASE_URL}/files"
+        headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+        
+        # Query files by creation date
+        query = f"createdTime >= \\'{start_date.isoformat()}Z\\' and createdTime <= \\'{end_date.isoformat()}Z\\'"
+        url = f"{self.BASE_URL}/files"
+        page_token = (cursor or {}).get('page_token')
+        
+        while True:
             params = {
                 'q': query,
                 'pageSize': 100,
-                'fields': 'files(id,name,createdTime,modifiedTime,webViewLink,mimeType,size)'
+                'fields': 'nextPageToken,files(id,name,createdTime,modifiedTime,webViewLink,mimeType,size)'
             }
+            if page_token:
+                params['pageToken'] = page_token
             
             async with self.session.get(url, headers=headers, cookies=self.cookies, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    files = data.get('files', [])
-                    
-                    evidence_items = []
-                    for file in files:
-                        evidence_items.append({
-                            'id': file.get('id'),
-                            'platform': 'google_drive',
-                            'title': file.get('name', 'Untitled'),
-                            'description': f"Type: {file.get('mimeType', 'unknown')}",
-                            'created_date': file.get('createdTime'),
-                            'modified_date': file.get('modifiedTime'),
-                            'url': file.get('webViewLink'),
-                            'metadata': {
-                                'size': file.get('size'),
-                                'mime_type': file.get('mimeType')
-                            }
-                        })
-                    
-                    return evidence_items
-                else:
-                    logger.error(f"Google Drive API error: {resp.status}")
-                    return []
-        
-        except Exception as e:
-            logger.error(f"Error fetching Google Drive evidence: {e}")
-            return []
+                if resp.status != 200:
+                    raise self._status_error("Google Drive API error", resp.status)
+                data = await resp.json()
+            
+            evidence_items = []
+            for file in data.get('files', []):
+                evidence_items.append({
+                    'id': file.get('id'),
+                    'platform': 'google_drive',
+                    'title': file.get('name', 'Untitled'),
+                    'description': f"Type: {file.get('mimeType', 'unknown')}",
+                    'content_handle': self._content_handle(file),
+                    'created_date': file.get('createdTime'),
+                    'modified_date': file.get('modifiedTime'),
+                    'url': file.get('webViewLink'),
+                    'metadata': {
+                        'size': file.get('size'),
+                        'mime_type': file.get('mimeType')
+                    }
+                })
+            
+            page_token = data.get('nextPageToken')
+            yield evidence_items, ({'page_token': page_token} if page_token else None)
+            if not page_token:
+                break
+    
+    def _content_handle(self, file: Dict[str, Any]) -> Dict[str, Any]:
+        file_url = f"{self.BASE_URL}/files/{quote(file.get('id') or '')}"
+        if file.get('mimeType') == 'application/vnd.google-apps.document':
+            # Docs have no stored bytes; export them as plain text
+            return {'url': f"{file_url}/export?mimeType=text/plain", 'content_type': 'text/plain'}
+        size = file.get('size')
+        return {
+            'url': f"{file_url}?alt=media",
+            'content_type': file.get('mimeType'),
+            'size': int(size) if size and size.isdigit() else None
+        }
     
     async def disconnect(self):
         """Close connection"""
@@ -388,67 +640,132 @@ class GoogleDriveConnector(SessionConnector):
 class NextcloudConnector(SessionConnector):
     """NWU Nextcloud connector using saved credentials"""
     
+    DAV_NS = {'d': 'DAV:', 'oc': 'http://owncloud.org/ns'}
+    PROPFIND_BODY = (
+        '<?xml version="1.0"?>'
+        '<d:propfind xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns"><d:prop>'
+        '<d:getlastmodified/><d:getcontentlength/><d:getcontenttype/><d:resourcetype/>'
+        '<oc:fileid/><oc:owner-display-name/>'
+        '</d:prop></d:propfind>'
+    )
+    
     def __init__(self, base_url: str, username: str, password: str, timeout: int = 30):
         super().__init__(timeout=timeout)
         self.base_url = base_url
         self.username = username
         self.password = password
     
+    @classmethod
+    def from_session(cls, cookies: List[Dict] = None, credentials: Dict = None) -> "NextcloudConnector":
+        creds = credentials or {}
+        return cls(
+            base_url=creds.get('base_url', 'https://nextcloud.nwu.ac.za'),
+            username=creds.get('username', ''),
+            password=creds.get('password', '')
+        )
+    
     async def connect(self):
         """Connect to Nextcloud"""
         logger.info(f"Connecting to Nextcloud at {self.base_url}")
     
+    def _preflight_request(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        # Depth 0 on the user's root: properties of one collection, no listing
+        return 'PROPFIND', f"{self.base_url}/remote.php/dav/files/{quote(self.username)}/", {
+            'headers': {**self._auth_headers(), 'Depth': '0', 'Content-Type': 'application/xml'},
+            'data': self.PROPFIND_BODY
+        }
+    
+    def session_fingerprint(self) -> str:
+        material = f"{self.base_url}:{self.username}:{self.password}"
+        return hashlib.sha256(f"{self.__class__.__name__}:{material}".encode()).hexdigest()
+    
     async def fetch_evidence(self, start_date: datetime, end_date: datetime) -> List[Dict]:
         """Fetch files from Nextcloud"""
+        return await self._collect_pages(start_date, end_date)
+    
+    def _content_headers(self) -> Dict[str, str]:
+        return self._auth_headers()
+    
+    def _auth_headers(self) -> Dict[str, str]:
+        import base64
+        auth_str = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+        return {'Authorization': f'Basic {auth_str}'}
+    
+    async def fetch_evidence_pages(self, start_date: datetime, end_date: datetime,
+                                   cursor: Optional[Dict[str, Any]] = None) -> AsyncIterator[EvidencePage]:
+        """Walk the user's WebDAV tree, one directory listing per page"""
         if not self.session:
             raise RuntimeError("Session not initialized")
         
-        try:
-            # Basic auth header
-            import base64
-            auth_str = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
-            headers = {
-                'Authorization': f'Basic {auth_str}',
-                'Accept': 'application/json'
-            }
+        headers = {
+            **self._auth_headers(),
+            'Depth': '1',
+            'Content-Type': 'application/xml'
+        }
+        
+        root = f"/remote.php/dav/files/{quote(self.username)}/"
+        pending = list(cursor['pending']) if cursor and cursor.get('pending') else [root]
+        
+        while pending:
+            path = pending.pop(0)
+            async with self.session.request('PROPFIND', f"{self.base_url}{path}",
+                                            headers=headers, data=self.PROPFIND_BODY) as resp:
+                if resp.status != 207:
+                    raise self._status_error(f"Nextcloud WebDAV error for {path}", resp.status)
+                body = await resp.text()
             
-            # Fetch recent files
-            url = f"{self.base_url}/ocs/v2.php/apps/files/api/v1/files"
-            params = {'format': 'json'}
+            evidence_items, subdirectories = self._parse_listing(body, path, start_date, end_date)
+            pending.extend(subdirectories)
+            yield evidence_items, ({'pending': pending} if pending else None)
+    
+    def _parse_listing(self, body: str, path: str, start_date: datetime,
+                       end_date: datetime) -> Tuple[List[Dict], List[str]]:
+        """Split a PROPFIND multistatus into in-range files and subdirectories"""
+        evidence_items = []
+        subdirectories = []
+        
+        for response in ElementTree.fromstring(body).findall('d:response', self.DAV_NS):
+            href = response.findtext('d:href', default='', namespaces=self.DAV_NS)
+            if href.rstrip('/') == path.rstrip('/'):
+                continue
             
-            async with self.session.get(url, headers=headers, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    files = data.get('ocs', {}).get('data', [])
-                    
-                    evidence_items = []
-                    for file in files:
-                        created = file.get('timestamp', '')
-                        try:
-                            created_dt = datetime.fromtimestamp(int(created) / 1000)
-                            if start_date <= created_dt <= end_date:
-                                evidence_items.append({
-                                    'id': file.get('id'),
-                                    'platform': 'nextcloud',
-                                    'title': file.get('name', 'Untitled'),
-                                    'created_date': created_dt.isoformat(),
-                                    'url': f"{self.base_url}/f/{file.get('id')}",
-                                    'metadata': {
-                                        'size': file.get('size'),
-                                        'owner': file.get('ownerDisplayName')
-                                    }
-                                })
-                        except:
-                            pass
-                    
-                    return evidence_items
-                else:
-                    logger.error(f"Nextcloud API error: {resp.status}")
-                    return []
+            prop = response.find('d:propstat/d:prop', self.DAV_NS)
+            if prop is None:
+                continue
+            
+            if prop.find('d:resourcetype/d:collection', self.DAV_NS) is not None:
+                subdirectories.append(href)
+                continue
+            
+            try:
+                modified = parsedate_to_datetime(prop.findtext('d:getlastmodified', namespaces=self.DAV_NS))
+                modified = modified.astimezone(timezone.utc).replace(tzinfo=None)
+            except (TypeError, ValueError):
+                continue
+            
+            file_id = prop.findtext('oc:fileid', namespaces=self.DAV_NS) or href
+            size = prop.findtext('d:getcontentlength', namespaces=self.DAV_NS)
+            mime_type = prop.findtext('d:getcontenttype', namespaces=self.DAV_NS)
+            evidence_items.append({
+                'id': file_id,
+                'platform': 'nextcloud',
+                'title': unquote(href.rstrip('/').rsplit('/', 1)[-1]) or 'Untitled',
+                'content_handle': {
+                    'url': f"{self.base_url}{href}",
+                    'content_type': mime_type,
+                    'size': int(size) if size and size.isdigit() else None
+                },
+                'created_date': modified.isoformat(),
+                'url': f"{self.base_url}/f/{file_id}",
+                'metadata': {
+                    'size': size,
+                    'owner': prop.findtext('oc:owner-display-name', namespaces=self.DAV_NS),
+                    'mime_type': mime_type,
+                    'path': unquote(href)
+                }
+            })
         
-        except Exception as e:
-            logger.error(f"Error fetching Nextcloud evidence: {e}")
-            return []
+        return self._filter_by_date_range(evidence_items, start_date, end_date), subdirectories
     
     async def disconnect(self):
         """Close connection"""
@@ -464,6 +781,10 @@ class EFundiConnector(SessionConnector):
         self.browser = None
         self.context = None
     
+    @classmethod
+    def from_session(cls, cookies: List[Dict] = None, credentials: Dict = None) -> "EFundiConnector":
+        return cls(base_url=(credentials or {}).get('base_url', 'https://efundi.nwu.ac.za'))
+    
     async def connect(self):
         """Connect using Playwright with existing browser session"""
         try:
@@ -509,44 +830,6 @@ class EFundiConnector(SessionConnector):
         if self.playwright:
             await self.playwright.stop()
         logger.info("Disconnecting from eFundi")
-
-
-class ConnectorFactory:
-    """Factory for creating appropriate connectors"""
-    
-    @staticmethod
-    async def create_connector(platform: str, cookies: List[Dict] = None, 
-                               credentials: Dict = None, config_manager=None):
-        """Create connector based on platform"""
-        
-        if platform == 'outlook':
-            connector = OutlookConnector(cookies={c['name']: c['value'] for c in (cookies or [])})
-        
-        elif platform == 'onedrive':
-            connector = OneDriveConnector(cookies={c['name']: c['value'] for c in (cookies or [])})
-        
-        elif platform == 'google_drive':
-            connector = GoogleDriveConnector(cookies={c['name']: c['value'] for c in (cookies or [])})
-        
-        elif platform == 'nextcloud':
-            creds = credentials or {}
-            connector = NextcloudConnector(
-                base_url=creds.get('base_url', 'https://nextcloud.nwu.ac.za'),
-                username=creds.get('username', ''),
-                password=creds.get('password', '')
-            )
-        
-        elif platform == 'efundi':
-            creds = credentials or {}
-            connector = EFundiConnector(
-                base_url=creds.get('base_url', 'https://efundi.nwu.ac.za')
-            )
-        
-        else:
-            raise ValueError(f"Unknown platform: {platform}")
-        
-        await connector.connect()
-        return connector
 '''
 
 print("=== CONNECTORS/SESSION_BASED.PY ===")
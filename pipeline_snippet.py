@@ -0,0 +1,149 @@
+
+# 26. pipeline.py - Staged async pipeline with bounded queues
+pipeline_py = '''"""
+VAMP Agent Stage Pipeline
+Runs a sequence of stages over a stream of work items (a scrape's pages) with
+a bounded queue between consecutive stages. Each stage works on a different
+item at the same time, so a scrape takes about as long as its slowest stage
+rather than the sum of all of them. A full queue makes the stages before it
+wait, so a fast source never runs far ahead of a slow sink.
+
+A stage runs as a coroutine on the event loop, in the default thread pool,
+or in a process pool (its function and items must then be picklable). Each
+stage has its own number of workers. Items leave every stage in the order
+they entered, so a stage that saves checkpoints sees pages in sequence however
+many workers the earlier stages run.
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, List
+
+STAGE_ASYNC = "async"
+STAGE_THREAD = "thread"
+STAGE_PROCESS = "process"
+
+# End of the stream, passed down from stage to stage
+_DONE = object()
+
+
+class _Failure:
+    """An error raised upstream, passed down to the consumer"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class Stage:
+    """
+    One step of a pipeline. fn takes an item and returns the item to pass on,
+    or None to drop it. Async stages take a coroutine function.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], mode: str = STAGE_ASYNC, workers: int = 1):
+        if mode not in (STAGE_ASYNC, STAGE_THREAD, STAGE_PROCESS):
+            raise ValueError(f"Unknown stage mode: {mode}")
+        self.name = name
+        self.fn = fn
+        self.mode = mode
+        self.workers = max(1, workers)
+
+    async def call(self, item: Any, executor: Executor = None) -> Any:
+        if self.mode == STAGE_ASYNC:
+            return await self.fn(item)
+        if self.mode == STAGE_THREAD:
+            # to_thread carries the caller's context (trace spans) into the thread
+            return await asyncio.to_thread(self.fn, item)
+        if executor is None:
+            raise RuntimeError(f"Stage {self.name} runs in a process pool but the pipeline has none")
+        return await asyncio.get_running_loop().run_in_executor(executor, self.fn, item)
+
+
+class Pipeline:
+    """Stages connected by queues of at most queue_size items"""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4, executor: Executor = None):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.executor = executor  # for STAGE_PROCESS stages
+
+    async def run(self, source: AsyncIterable[Any]) -> AsyncIterator[Any]:
+        """
+        Feed the source through every stage and yield what leaves the last one.
+        The first error from the source or any stage stops the pipeline and is
+        raised here; leaving early cancels all stages.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        tasks += [
+            asyncio.create_task(self._run_stage(stage, queues[i], queues[i + 1]))
+            for i, stage in enumerate(self.stages)
+        ]
+        try:
+            while True:
+                item = await queues[-1].get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _feed(source: AsyncIterable[Any], outbox: asyncio.Queue):
+        iterator = source.__aiter__()
+        try:
+            async for item in iterator:
+                await outbox.put(item)
+            await outbox.put(_DONE)
+        except Exception as e:
+            await outbox.put(_Failure(e))
+        finally:
+            if hasattr(iterator, 'aclose'):
+                await iterator.aclose()
+
+    async def _run_stage(self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        # Calls are started in arrival order and awaited in the same order
+        slots = asyncio.Semaphore(stage.workers)
+        in_flight: asyncio.Queue = asyncio.Queue()
+
+        async def dispatch():
+            while True:
+                item = await inbox.get()
+                if item is _DONE or isinstance(item, _Failure):
+                    await in_flight.put(item)
+                    return
+                await slots.acquire()
+                await in_flight.put(asyncio.ensure_future(stage.call(item, self.executor)))
+
+        dispatcher = asyncio.create_task(dispatch())
+        try:
+            while True:
+                entry = await in_flight.get()
+                if entry is _DONE or isinstance(entry, _Failure):
+                    await outbox.put(entry)
+                    return
+                try:
+                    result = await entry
+                except Exception as e:
+                    await outbox.put(_Failure(e))
+                    return
+                finally:
+                    slots.release()
+                if result is not None:
+                    await outbox.put(result)
+        finally:
+            dispatcher.cancel()
+            while not in_flight.empty():
+                entry = in_flight.get_nowait()
+                if isinstance(entry, asyncio.Future):
+                    entry.cancel()
+'''
+
+print("=== PIPELINE.PY ===")
+print(pipeline_py[:2000])
+print(f"\n... [Full file is {len(pipeline_py.splitlines())} lines] ...\n")
@@ -0,0 +1,374 @@
+
+# 8. pubsub.py - Cross-worker pub/sub bus for WebSocket topics
+pubsub_py = '''"""
+VAMP Agent Pub/Sub Bus
+Topic broadcasts that reach WebSocket clients in every worker process
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# on_message(topic, payload) invoked for every message on a subscribed topic
+MessageHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+FRAME_DELIMITER = b"\\n"
+# Evidence frames can carry full item content
+STREAM_LIMIT = 2 ** 22
+# Frames the broker buffers for one subscriber; one that falls further behind is disconnected
+SUBSCRIBER_QUEUE_FRAMES = 1000
+
+
+class PubSubBackend(ABC):
+    """Base class for topic pub/sub backends"""
+
+    def __init__(self):
+        self.on_message: Optional[MessageHandler] = None
+        self.topics: Set[str] = set()
+
+    async def start(self, on_message: MessageHandler = None):
+        """Begin delivering messages for subscribed topics to on_message"""
+        self.on_message = on_message
+
+    @abstractmethod
+    async def publish(self, topic: str, payload: Dict[str, Any]):
+        """Publish payload to every subscriber of topic, in any process"""
+        pass
+
+    @abstractmethod
+    async def subscribe(self, topic: str):
+        """Receive messages for topic in this process"""
+        pass
+
+    @abstractmethod
+    async def unsubscribe(self, topic: str):
+        """Stop receiving messages for topic in this process"""
+        pass
+
+    async def check(self):
+        """Raise if messages published now would not reach other subscribers"""
+        pass
+
+    async def close(self):
+        """Release backend resources"""
+        pass
+
+
+class InProcessPubSub(PubSubBackend):
+    """Single-process bus (development / single uvicorn worker)"""
+
+    async def publish(self, topic: str, payload: Dict[str, Any]):
+        if topic in self.topics and self.on_message:
+            await self.on_message(topic, payload)
+
+    async def subscribe(self, topic: str):
+        self.topics.add(topic)
+
+    async def unsubscribe(self, topic: str):
+        self.topics.discard(topic)
+
+
+def _parse_frame(line: bytes) -> Optional[Dict[str, Any]]:
+    """A decoded frame, or None (logged) for one that isn't a JSON object"""
+    try:
+        frame = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        frame = None
+    if not isinstance(frame, dict):
+        logger.error(f"Skipped a malformed pub/sub frame ({len(line)} bytes)")
+        return None
+    return frame
+
+
+class _Subscriber:
+    """
+    One connected client on the broker side. Its frames are written by its own
+    task, so a slow reader only delays itself, not the topics other clients get.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int = SUBSCRIBER_QUEUE_FRAMES):
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task = asyncio.create_task(self._write_loop())
+
+    def send(self, line: bytes) -> bool:
+        """Queue a frame; False when the subscriber is too far behind to take it"""
+        try:
+            self.queue.put_nowait(line)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                line = await self.queue.get()
+                self.writer.write(line)
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+class PubSubBroker:
+    """
+    Unix-socket broker routing newline-delimited JSON frames:
+    {"op": "sub"|"unsub", "topic": ...} and {"op": "pub", "topic": ..., "data": {...}}
+    """
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = Path(socket_path)
+        self.subscribers: Dict[str, Set[_Subscriber]] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._lock_file = None
+
+    def acquire_host_lock(self) -> bool:
+        """Elect a single broker host per socket path; the OS releases the lock on exit"""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(f"{self.socket_path}.lock", 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def start(self):
+        # Holding the lock means any existing socket file is stale
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self.server = await asyncio.start_unix_server(
+            self._handle_client, path=str(self.socket_path), limit=STREAM_LIMIT
+        )
+        logger.info(f"Pub/sub broker listening on {self.socket_path} (pid {os.getpid()})")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriber = _Subscriber(writer)
+        topics: Set[str] = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    # Frame over STREAM_LIMIT; readline has discarded it
+                    logger.error(f"Pub/sub broker skipped an oversize frame: {e}")
+                    continue
+                if not line:
+                    break
+                frame = _parse_frame(line)
+                if frame is None:
+                    continue
+
+                op, topic = frame.get('op'), frame.get('topic')
+                if op == 'sub':
+                    self.subscribers.setdefault(topic, set()).add(subscriber)
+                    topics.add(topic)
+                elif op == 'unsub':
+                    self._remove(topic, subscriber)
+                    topics.discard(topic)
+                elif op == 'pub':
+                    self._route(topic, line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for topic in topics:
+                self._remove(topic, subscriber)
+            subscriber.close()
+
+    def _route(self, topic: str, line: bytes):
+        for subscriber in list(self.subscribers.get(topic, ())):
+            if not subscriber.send(line):
+                # It reconnects and resubscribes; its WebSocket clients replay what they missed
+                logger.warning(f"Pub/sub subscriber fell {subscriber.queue.maxsize} frames "
+                               f"behind on {topic}, disconnecting it")
+                for subscribed in self.subscribers.values():
+                    subscribed.discard(subscriber)
+                subscriber.close()
+
+    def _remove(self, topic: str, subscriber: _Subscriber):
+        subscribers = self.subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[topic]
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._lock_file:
+            self._lock_file.close()
+
+
+class UnixSocketPubSub(PubSubBackend):
+    """
+    Bus shared by all processes on the host through a Unix-socket broker.
+    Each process only subscribes to topics its own WebSocket clients hold.
+    """
+
+    def __init__(self, socket_path: Path, host_broker: bool = True):
+        super().__init__()
+        self.socket_path = Path(socket_path)
+        self.host_broker = host_broker
+        self.broker: Optional[PubSubBroker] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._connect_lock = asyncio.Lock()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self, on_message: MessageHandler = None):
+        await super().start(on_message)
+        await self._ensure_connected()
+
+    async def _maybe_host_broker(self):
+        if not self.host_broker or self.broker:
+            return
+        broker = PubSubBroker(self.socket_path)
+        if broker.acquire_host_lock():
+            await broker.start()
+            self.broker = broker
+
+    async def _ensure_connected(self):
+        async with self._connect_lock:
+            if self.writer and not self.writer.is_closing():
+                return
+            for attempt in range(20):
+                await self._maybe_host_broker()
+                try:
+                    self.reader, self.writer = await asyncio.open_unix_connection(
+                        str(self.socket_path), limit=STREAM_LIMIT
+                    )
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    await asyncio.sleep(min(0.05 * (attempt + 1), 1.0))
+            else:
+                raise ConnectionError(f"Pub/sub broker unavailable at {self.socket_path}")
+
+            # Re-establish subscriptions after a broker restart
+            for topic in self.topics:
+                await self._send({'op': 'sub', 'topic': topic})
+            self._reader_task = asyncio.create_task(self._read_loop(self.reader))
+
+    async def check(self):
+        # Reconnects (and takes over hosting the broker) if the connection was lost
+        await self._ensure_connected()
+
+    async def _send(self, frame: Dict[str, Any]):
+        self.writer.write(json.dumps(frame, default=str).encode() + FRAME_DELIMITER)
+        await self.writer.drain()
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    # Frame over STREAM_LIMIT; readline has discarded it
+                    logger.error(f"Skipped an oversize pub/sub frame: {e}")
+                    continue
+                if not line:
+                    break
+                frame = _parse_frame(line)
+                if frame is None:
+                    continue
+                if self.on_message and frame.get('topic') in self.topics:
+                    try:
+                        await self.on_message(frame['topic'], frame.get('data', {}))
+                    except Exception as e:
+                        logger.error(f"Error delivering pub/sub message: {e}")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Pub/sub read loop failed: {e!r}")
+        if not self._closed:
+            logger.warning("Lost connection to pub/sub broker, reconnecting")
+            self.writer = None
+            asyncio.create_task(self._ensure_connected())
+
+    async def publish(self, topic: str, payload: Dict[str, Any]):
+        await self._ensure_connected()
+        try:
+            await self._send({'op': 'pub', 'topic': topic, 'data': payload})
+        except ConnectionError as e:
+            logger.error(f"Dropped pub/sub message for {topic}: {e}")
+
+    async def subscribe(self, topic: str):
+        if topic in self.topics:
+            return
+        self.topics.add(topic)
+        await self._ensure_connected()
+        await self._send({'op': 'sub', 'topic': topic})
+
+    async def unsubscribe(self, topic: str):
+        if topic not in self.topics:
+            return
+        self.topics.discard(topic)
+        if self.writer and not self.writer.is_closing():
+            await self._send({'op': 'unsub', 'topic': topic})
+
+    async def close(self):
+        self._closed = True
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self.writer:
+            self.writer.close()
+        if self.broker:
+            await self.broker.close()
+
+
+PUBSUB_BACKENDS: Dict[str, Callable[[], PubSubBackend]] = {
+    'inprocess': lambda: InProcessPubSub(),
+    'unix': lambda: UnixSocketPubSub(
+        socket_path=settings.PUBSUB_SOCKET_PATH,
+        host_broker=settings.PUBSUB_HOST_BROKER
+    ),
+}
+
+
+def create_pubsub(backend: str = None) -> PubSubBackend:
+    """Create the configured pub/sub backend"""
+    backend = backend or settings.PUBSUB_BACKEND
+    if backend not in PUBSUB_BACKENDS:
+        raise ValueError(f"Unknown pub/sub backend: {backend}")
+    return PUBSUB_BACKENDS[backend]()
+
+
+def is_cross_process(backend: str = None) -> bool:
+    """Whether publishers in other processes reach this process's subscribers"""
+    return (backend or settings.PUBSUB_BACKEND) != 'inprocess'
+
+
+if __name__ == "__main__":
+    # Standalone broker for multi-worker deployments
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    async def serve():
+        broker = PubSubBroker(settings.PUBSUB_SOCKET_PATH)
+        if not broker.acquire_host_lock():
+            logger.info("A pub/sub broker is already running")
+            return
+        await broker.start()
+        await broker.server.serve_forever()
+
+    asyncio.run(serve())
+'''
+
+print("=== PUBSUB.PY ===")
+print(pubsub_py[:2000])
+print(f"\n... [Full file is {len(pubsub_py.splitlines())} lines] ...\n")
@@ -0,0 +1,159 @@
+
+# 28. readiness.py - Dependency readiness checks
+readiness_py = '''"""
+VAMP Agent Readiness
+Dependency checks behind /health/readiness, so the load balancer stops sending
+traffic to a worker that is broken or saturated:
+
+- credentials: the store opens and its records decrypt with the configured keys
+- evidence_store: the store takes a write lock and accepts a write
+- job_queue: queued async jobs stay below READINESS_MAX_QUEUE_DEPTH (non-critical:
+  the queue is shared, so a deep one would take every replica out at once)
+- pubsub: the broadcast bus (the Unix-socket broker) is connected
+- scrape_admission: the synchronous scrape queue still has room
+- playwright_installed: the browser driver used for eFundi is importable
+  (non-critical; no browser is launched)
+
+Checks run concurrently, each under READINESS_CHECK_TIMEOUT. The combined
+result is cached for READINESS_CACHE_TTL seconds and probes arriving while a
+run is in progress wait for that run, so frequent probes from several load
+balancers cost one round of checks per TTL. A failed critical check makes the
+worker "not_ready" (503); a failed non-critical one only makes it "degraded".
+"""
+import asyncio
+import importlib.util
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from admission import AdmissionController
+from config import CredentialManager
+from evidence_store import EvidenceStore
+from jobs import JobQueue
+from metrics import JOB_QUEUE_DEPTH
+from pubsub import PubSubBackend
+
+READY = "ready"
+DEGRADED = "degraded"
+NOT_READY = "not_ready"
+
+# A check returns a short detail string on success and raises on failure
+ReadinessCheck = Callable[[], Awaitable[Optional[str]]]
+
+
+class ReadinessProbe:
+    """Named dependency checks run together, with the result cached for ttl seconds"""
+
+    def __init__(self, ttl: float, timeout: float):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._checks: List[Tuple[str, ReadinessCheck, bool]] = []
+        self._cached: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._running: Optional[asyncio.Task] = None
+
+    def add(self, name: str, check: ReadinessCheck, critical: bool = True):
+        self._checks.append((name, check, critical))
+
+    async def status(self) -> Dict[str, Any]:
+        """The cached result while it is fresh, otherwise the result of a new run"""
+        if self._cached and time.monotonic() < self._cached[0]:
+            return {**self._cached[1], "cached": True}
+        if self._running is None or self._running.done():
+            self._running = asyncio.create_task(self._run())
+        # Shielded: a probe that disconnects doesn't cancel the run the others wait for
+        result = await asyncio.shield(self._running)
+        self._cached = (time.monotonic() + self.ttl, result)
+        return {**result, "cached": False}
+
+    async def _run(self) -> Dict[str, Any]:
+        results = await asyncio.gather(*(
+            self._run_check(check, critical) for _, check, critical in self._checks
+        ))
+        checks = {name: result for (name, _, _), result in zip(self._checks, results)}
+        failed = [result for result in checks.values() if not result["ok"]]
+        if any(result["critical"] for result in failed):
+            status = NOT_READY
+        elif failed:
+            status = DEGRADED
+        else:
+            status = READY
+        return {"status": status, "checked_at": datetime.utcnow().isoformat(), "checks": checks}
+
+    async def _run_check(self, check: ReadinessCheck, critical: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(check(), self.timeout)
+            ok = True
+        except asyncio.TimeoutError:
+            detail, ok = f"timed out after {self.timeout:g}s", False
+        except Exception as e:
+            detail, ok = str(e) or type(e).__name__, False
+        return {
+            "ok": ok,
+            "critical": critical,
+            "detail": detail,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+
+class NotReady(Exception):
+    """A dependency works but the worker should not take more traffic"""
+    pass
+
+
+def credential_store_check(credentials: CredentialManager) -> ReadinessCheck:
+    async def check() -> str:
+        return await asyncio.to_thread(credentials.check_decryptable)
+    return check
+
+
+def evidence_store_check(store: EvidenceStore) -> ReadinessCheck:
+    async def check() -> str:
+        await asyncio.to_thread(store.check_writable)
+        return "writable"
+    return check
+
+
+def job_queue_check(queue: JobQueue, max_depth: int) -> ReadinessCheck:
+    async def check() -> str:
+        depth = await asyncio.to_thread(queue.depth)
+        JOB_QUEUE_DEPTH.set(depth)
+        # Depth is queue-wide, not this worker's load: a backlog only degrades readiness
+        if max_depth and depth >= max_depth:
+            raise NotReady(f"backlog: {depth} queued jobs (limit {max_depth})")
+        return f"{depth} queued jobs"
+    return check
+
+
+def pubsub_check(bus: PubSubBackend) -> ReadinessCheck:
+    async def check() -> str:
+        await bus.check()
+        return f"{type(bus).__name__}, {len(bus.topics)} topics"
+    return check
+
+
+def admission_check(admission: AdmissionController) -> ReadinessCheck:
+    async def check() -> str:
+        snapshot = admission.snapshot()
+        # Only a full wait queue means new scrapes would be shed; a busy one still admits
+        at_capacity = 0 < snapshot["max_in_flight"] <= snapshot["in_flight"]
+        if at_capacity and snapshot["queued"] >= snapshot["max_queued"]:
+            raise NotReady(
+                f"saturated: {snapshot['in_flight']} scrapes running, {snapshot['queued']} waiting"
+            )
+        return f"{snapshot['in_flight']} scrapes running, {snapshot['queued']} waiting"
+    return check
+
+
+def playwright_installed_check() -> ReadinessCheck:
+    async def check() -> str:
+        # eFundi starts a browser per scan; there is no pool to inspect, only the driver
+        if importlib.util.find_spec("playwright") is None:
+            raise RuntimeError("playwright is not installed; eFundi scans will fail")
+        return "installed"
+    return check
+'''
+
+print("=== READINESS.PY ===")
+print(readiness_py[:2000])
+print(f"\n... [Full file is {len(readiness_py.splitlines())} lines] ...\n")
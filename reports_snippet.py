@@ -0,0 +1,439 @@
+
+# 23. reports.py - Compliance reports (HTML / PDF) with cached sections
+reports_py = '''"""
+VAMP Agent Compliance Reports
+Per-policy and per-KPA compliance reports for a scan, as HTML or PDF, rendered
+from the scan's precomputed scoring aggregates rather than from its evidence.
+
+A report is a cover, a summary, one section per policy and one per KPA. Each
+section is rendered on its own and cached per (scan, section, format) with a
+fingerprint of its content, so re-exporting after a small evidence change only
+re-renders the sections whose numbers moved. Output is streamed: HTML section
+by section, PDF page by page with the cross-reference table written last.
+
+The PDF writer is self-contained (base-14 Helvetica, WinAnsi text), so no PDF
+library is needed.
+"""
+import hashlib
+import html
+import json
+import textwrap
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from config import settings
+from metrics import REPORT_SECTIONS
+from models import ReportFormat
+from scoring import CLAUSE_PACKS, KPA_ROUTER, MUST_PASS_POLICIES, KPARouter, TierAssigner
+
+REPORT_MEDIA_TYPES = {
+    ReportFormat.HTML: "text/html",  # Starlette appends the utf-8 charset
+    ReportFormat.PDF: "application/pdf",
+}
+
+# A block is ("heading", text), ("paragraph", text) or ("table", headers, rows)
+Block = Tuple[Any, ...]
+
+
+def report_filename(scan_id: str, fmt: ReportFormat) -> str:
+    return f"vamp-report-{scan_id}.{fmt.value}"
+
+
+class ReportSection:
+    """One report section as format-neutral blocks, fingerprinted by its content"""
+
+    __slots__ = ('section_id', 'title', 'blocks', 'fingerprint')
+
+    def __init__(self, section_id: str, title: str, blocks: List[Block]):
+        self.section_id = section_id
+        self.title = title
+        self.blocks = blocks
+        self.fingerprint = hashlib.sha256(json.dumps([title, blocks]).encode()).hexdigest()
+
+
+def _policy_status(policy_id: str, result: Dict[str, Any]) -> str:
+    if not result["evidence_count"]:
+        return "No evidence"
+    if policy_id in MUST_PASS_POLICIES and not result["mandatory_passed"]:
+        return "Fail"
+    return "Pass"
+
+
+def _clause_label(pattern: str) -> str:
+    """Clause regex as readable keywords: 'conflict.of.interest|disclosure' -> 'conflict of interest / disclosure'"""
+    return " / ".join(alternative.replace(".", " ") for alternative in pattern.split("|"))
+
+
+def _summary_section(scores: Dict[str, Any]) -> ReportSection:
+    policies = scores["policies"]
+    tiers = TierAssigner()
+    rows = [
+        [policy_id, result["policy"], result["composite_score"], tiers.score(result["composite_score"]),
+         result["evidence_count"], _policy_status(policy_id, result)]
+        for policy_id, result in policies.items()
+    ]
+    blocks: List[Block] = [
+        ("paragraph", f"{scores['items']} evidence items scored against {len(policies)} policies. "
+                      f"Institutional rating: {scores['rating']}/5."),
+        ("table", ["Policy", "Name", "Score", "Tier", "Evidence", "Status"], rows),
+    ]
+    failing = [row[0] for row in rows if row[5] == "Fail"]
+    if failing:
+        blocks.append(("paragraph", f"Must-pass policies without mandatory evidence: {', '.join(failing)}."))
+    return ReportSection("summary", "Summary", blocks)
+
+
+def _policy_section(policy_id: str, result: Dict[str, Any]) -> ReportSection:
+    matched = set(result.get("matched_clauses", ()))
+    clause_match = result["clause_match"]
+    kpas = KPA_ROUTER.get(policy_id, [])
+    rows = [
+        [_clause_label(pattern), clause_type, weight, "Yes" if index in matched else "No"]
+        for index, (pattern, weight, clause_type) in enumerate(CLAUSE_PACKS[policy_id]["clauses"])
+    ]
+    return ReportSection(policy_id, f"{policy_id} {result['policy']}", [
+        ("paragraph", f"Composite score {result['composite_score']} (tier {TierAssigner().score(result['composite_score'])}), "
+                      f"status: {_policy_status(policy_id, result)}. "
+                      f"{'Must-pass' if policy_id in MUST_PASS_POLICIES else 'Standard'} policy."),
+        ("paragraph", f"{result['evidence_count']} evidence items matched, "
+                      f"{result['mandatory_passed']} of them on mandatory clauses. "
+                      f"Clauses covered: {clause_match['total']} of {len(rows)} ({clause_match['percentage']}%). "
+                      f"KPAs: {', '.join(kpas) or 'none'}."),
+        ("heading", "Clauses"),
+        ("table", ["Clause", "Type", "Weight", "Matched"], rows),
+    ])
+
+
+def _kpa_section(kpa: str, policies: Dict[str, Dict[str, Any]]) -> ReportSection:
+    router = KPARouter()
+    rows = []
+    for policy_id, kpas in KPA_ROUTER.items():
+        if kpa in kpas and policy_id in policies:
+            result = policies[policy_id]
+            coverage = router.score(policy_id, result["clause_match"]["total"])["coverage"]
+            rows.append([policy_id, result["policy"], result["composite_score"],
+                         result["evidence_count"], f"{coverage:.0f}%"])
+    average = sum(row[2] for row in rows) / len(rows) if rows else 0
+    return ReportSection(kpa, kpa.replace("KPA-", "KPA: "), [
+        ("paragraph", f"Average composite score of the {len(rows)} routed policies: {average:.0f} "
+                      f"(tier {TierAssigner().score(average)})."),
+        ("table", ["Policy", "Name", "Score", "Evidence", "Clause coverage"], rows),
+    ])
+
+
+def build_sections(scores: Dict[str, Any]) -> List[ReportSection]:
+    """Summary, per-policy and per-KPA sections from a ScoringExecutor.scan() result"""
+    policies = scores["policies"]
+    kpas = sorted({kpa for policy_id in policies for kpa in KPA_ROUTER.get(policy_id, [])})
+    return (
+        [_summary_section(scores)]
+        + [_policy_section(policy_id, result) for policy_id, result in policies.items()]
+        + [_kpa_section(kpa, policies) for kpa in kpas]
+    )
+
+
+def _cover_section(scan_id: str, scores: Dict[str, Any], sections: List[ReportSection]) -> ReportSection:
+    """Title and contents; never cached since it carries the generation time"""
+    return ReportSection("cover", "VAMP Compliance Report", [
+        ("paragraph", f"Scan {scan_id}"),
+        ("paragraph", f"Generated {datetime.utcnow().strftime('%Y-%m-%d %H:%M')} UTC. "
+                      f"{scores['items']} evidence items, institutional rating {scores['rating']}/5."),
+        ("heading", "Contents"),
+        ("table", ["Section"], [[section.title] for section in sections]),
+    ])
+
+
+class SectionCache:
+    """Rendered sections per (scan, section, format), valid while the section fingerprint matches"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, scan_id: str, section: ReportSection, fmt: ReportFormat,
+               renderer: Callable[[ReportSection], Any]) -> Any:
+        key = (scan_id, section.section_id, fmt.value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == section.fingerprint:
+                self._entries.move_to_end(key)
+                REPORT_SECTIONS.labels(format=fmt.value, result="cached").inc()
+                return entry[1]
+        rendered = renderer(section)
+        REPORT_SECTIONS.labels(format=fmt.value, result="rendered").inc()
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = (section.fingerprint, rendered)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return rendered
+
+
+section_cache = SectionCache(settings.REPORT_SECTION_CACHE_SIZE)
+
+
+# ----------------------------------------------------------------------------
+# HTML
+# ----------------------------------------------------------------------------
+
+HTML_STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; margin: 2em auto; max-width: 60em; color: #222; }
+h1, h2 { border-bottom: 1px solid #ccc; padding-bottom: .2em; }
+section { page-break-before: always; }
+table { border-collapse: collapse; width: 100%; margin: .5em 0 1em; }
+th, td { border: 1px solid #ddd; padding: .3em .5em; text-align: left; }
+th { background: #f3f3f3; }
+"""
+
+
+def _html_blocks(blocks: List[Block]) -> List[str]:
+    parts = []
+    for block in blocks:
+        if block[0] == "heading":
+            parts.append(f"<h3>{html.escape(block[1])}</h3>")
+        elif block[0] == "paragraph":
+            parts.append(f"<p>{html.escape(block[1])}</p>")
+        else:
+            _, headers, rows = block
+            parts.append("<table><tr>" + "".join(f"<th>{html.escape(str(h))}</th>" for h in headers) + "</tr>")
+            parts.extend(
+                "<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + "</tr>"
+                for row in rows
+            )
+            parts.append("</table>")
+    return parts
+
+
+def _html_section(section: ReportSection) -> str:
+    return "\\n".join([
+        f'<section id="{html.escape(section.section_id)}">',
+        f"<h2>{html.escape(section.title)}</h2>",
+        *_html_blocks(section.blocks),
+        "</section>\\n",
+    ])
+
+
+def _html_report(scan_id: str, cover: ReportSection, sections: List[ReportSection]) -> Iterator[bytes]:
+    yield "\\n".join([
+        "<!DOCTYPE html>",
+        '<html lang="en"><head><meta charset="utf-8">',
+        f"<title>{html.escape(cover.title)} - {html.escape(scan_id)}</title>",
+        f"<style>{HTML_STYLE}</style></head><body>",
+        f"<h1>{html.escape(cover.title)}</h1>",
+        *_html_blocks(cover.blocks),
+        "",
+    ]).encode()
+    for section in sections:
+        yield section_cache.render(scan_id, section, ReportFormat.HTML, _html_section).encode()
+    yield b"</body></html>\\n"
+
+
+# ----------------------------------------------------------------------------
+# PDF
+# ----------------------------------------------------------------------------
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+FOOTER_Y = 30
+CHAR_WIDTH = 0.5  # average Helvetica glyph width, in ems
+
+
+def _pdf_string(text: str) -> str:
+    return "(" + str(text).replace("\\\\", "\\\\\\\\").replace("(", "\\\\(").replace(")", "\\\\)") + ")"
+
+
+def _fit(text: str, width: float, size: float) -> str:
+    """Truncate to roughly width points"""
+    limit = max(4, int(width / (size * CHAR_WIDTH)))
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class _PageLayout:
+    """Lays blocks out top to bottom; every page becomes one compressed content stream"""
+
+    def __init__(self):
+        self.pages: List[bytes] = []
+        self._ops: List[str] = []
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def _fits(self, height: float) -> bool:
+        return self._y - height >= MARGIN
+
+    def _new_page(self):
+        self.pages.append(zlib.compress("\\n".join(self._ops).encode("cp1252", "replace")))
+        self._ops = []
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def _text(self, x: float, text: str, size: float, bold: bool = False):
+        font = "F2" if bold else "F1"
+        self._ops.append(f"BT /{font} {size} Tf {x:.1f} {self._y:.1f} Td {_pdf_string(text)} Tj ET")
+
+    def line(self, text: str, size: float = 10, bold: bool = False):
+        if not self._fits(size * 1.4):
+            self._new_page()
+        self._y -= size * 1.4
+        self._text(MARGIN, text, size, bold)
+
+    def paragraph(self, text: str, size: float = 10):
+        for line in textwrap.wrap(text, int(CONTENT_WIDTH / (size * CHAR_WIDTH))) or [""]:
+            self.line(line, size)
+        self._y -= size * 0.6
+
+    def rule(self):
+        self._y -= 4
+        self._ops.append(f"0.5 w {MARGIN} {self._y:.1f} m {PAGE_WIDTH - MARGIN} {self._y:.1f} l S")
+        self._y -= 6
+
+    def table(self, headers: List[str], rows: List[List[Any]], size: float = 9):
+        # Columns sized by their longest cell, within the content width
+        lengths = [min(40, max(len(str(cell)) for cell in column) + 2) for column in zip(headers, *rows)]
+        widths = [CONTENT_WIDTH * length / sum(lengths) for length in lengths]
+        height = size * 1.5
+
+        def header():
+            self._y -= height
+            self._row(headers, widths, size, bold=True)
+
+        if not self._fits(height * 2):
+            self._new_page()
+        header()
+        for row in rows:
+            if not self._fits(height):
+                # Repeat the header on the next page
+                self._new_page()
+                header()
+            self._y -= height
+            self._row(row, widths, size)
+        self._y -= size
+
+    def _row(self, cells: List[Any], widths: List[float], size: float, bold: bool = False):
+        x = MARGIN
+        for cell, width in zip(cells, widths):
+            self._text(x, _fit(cell, width - 4, size), size, bold)
+            x += width
+
+    def finish(self) -> List[bytes]:
+        if self._ops:
+            self._new_page()
+        return self.pages
+
+
+def _pdf_section(section: ReportSection) -> List[bytes]:
+    """A section's pages as compressed content streams; sections start on a new page"""
+    layout = _PageLayout()
+    layout.line(section.title, size=16, bold=True)
+    layout.rule()
+    for block in section.blocks:
+        if block[0] == "heading":
+            layout.line(block[1], size=12, bold=True)
+        elif block[0] == "paragraph":
+            layout.paragraph(block[1])
+        else:
+            layout.table(block[1], block[2])
+    return layout.finish()
+
+
+class _PdfWriter:
+    """Emits numbered PDF objects in stream order, remembering offsets for the xref table"""
+
+    def __init__(self):
+        self.offsets: Dict[int, int] = {}
+        self.position = 0
+        self.next_id = 1
+
+    def reserve(self) -> int:
+        obj_id, self.next_id = self.next_id, self.next_id + 1
+        return obj_id
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\\n%\\xe2\\xe3\\xcf\\xd3\\n")
+
+    def obj(self, obj_id: int, body: str) -> bytes:
+        return self.raw_obj(obj_id, body.encode())
+
+    def raw_obj(self, obj_id: int, body: bytes) -> bytes:
+        self.offsets[obj_id] = self.position
+        return self._emit(f"{obj_id} 0 obj\\n".encode() + body + b"\\nendobj\\n")
+
+    def stream(self, obj_id: int, data: bytes) -> bytes:
+        return self.raw_obj(
+            obj_id,
+            f"<< /Length {len(data)} /Filter /FlateDecode >>\\nstream\\n".encode() + data + b"\\nendstream"
+        )
+
+    def trailer(self, root_id: int) -> bytes:
+        xref_offset = self.position
+        entries = "".join(f"{self.offsets[obj_id]:010d} 00000 n \\n" for obj_id in range(1, self.next_id))
+        return self._emit((
+            f"xref\\n0 {self.next_id}\\n0000000000 65535 f \\n{entries}"
+            f"trailer\\n<< /Size {self.next_id} /Root {root_id} 0 R >>\\n"
+            f"startxref\\n{xref_offset}\\n%%EOF\\n"
+        ).encode())
+
+
+def _pdf_footer(scan_id: str, page_number: int) -> bytes:
+    return zlib.compress((
+        f"BT /F1 8 Tf {MARGIN} {FOOTER_Y} Td {_pdf_string('VAMP compliance report - scan ' + scan_id)} Tj ET\\n"
+        f"BT /F1 8 Tf {PAGE_WIDTH - MARGIN - 40} {FOOTER_Y} Td {_pdf_string(f'Page {page_number}')} Tj ET"
+    ).encode("cp1252", "replace"))
+
+
+def _pdf_report(scan_id: str, cover: ReportSection, sections: List[ReportSection]) -> Iterator[bytes]:
+    writer = _PdfWriter()
+    catalog, pages, regular, bold = (writer.reserve() for _ in range(4))
+    yield b"".join([
+        writer.header(),
+        writer.obj(catalog, f"<< /Type /Catalog /Pages {pages} 0 R >>"),
+        writer.obj(regular, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"),
+        writer.obj(bold, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"),
+    ])
+    resources = f"<< /Font << /F1 {regular} 0 R /F2 {bold} 0 R >> >>"
+
+    # Cached sections are laid out without page numbers; each page gets its own footer stream
+    section_pages: Iterable[List[bytes]] = chain(
+        [_pdf_section(cover)],
+        (section_cache.render(scan_id, section, ReportFormat.PDF, _pdf_section) for section in sections)
+    )
+    kids = []
+    for streams in section_pages:
+        for content in streams:
+            content_id, footer_id, page_id = writer.reserve(), writer.reserve(), writer.reserve()
+            kids.append(page_id)
+            yield b"".join([
+                writer.stream(content_id, content),
+                writer.stream(footer_id, _pdf_footer(scan_id, len(kids))),
+                writer.obj(page_id, f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                                    f"/Resources {resources} /Contents [{content_id} 0 R {footer_id} 0 R] >>"),
+            ])
+
+    yield writer.obj(pages, f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>")
+    yield writer.trailer(catalog)
+
+
+def render_report(scan_id: str, scores: Dict[str, Any], fmt: ReportFormat) -> Iterator[bytes]:
+    """
+    Compliance report for a ScoringExecutor.scan() result, as a lazy stream of
+    byte chunks. Synchronous: iterate it from a worker thread (StreamingResponse does).
+    """
+    sections = build_sections(scores)
+    cover = _cover_section(scan_id, scores, sections)
+    if fmt == ReportFormat.PDF:
+        return _pdf_report(scan_id, cover, sections)
+    return _html_report(scan_id, cover, sections)
+'''
+
+print("=== REPORTS.PY ===")
+print(reports_py[:2000])
+print(f"\n... [Full file is {len(reports_py.splitlines())} lines] ...\n")
@@ -0,0 +1,419 @@
+
+# 24. scheduler.py - Recurring scan schedules with jittered dispatch
+scheduler_py = '''"""
+VAMP Agent Scan Scheduler
+Recurring scans: a schedule belongs to one user and holds a cron expression
+(evaluated in UTC), a set of platforms and the cookies/filters to scan with.
+The scheduler loop in the API process turns each due run into ordinary
+"scrape" jobs, one per platform, on the durable job queue.
+
+- Jitter: every run fires at a deterministic offset within jitter_seconds
+  after its cron time, derived from the schedule id and the cron time, so
+  500 nightly schedules spread out instead of all hitting Graph at 00:00.
+- Incremental: each platform keeps a watermark, the end of the last window
+  whose scan completed. A run asks only for evidence since it (less
+  SCHEDULE_OVERLAP_SECONDS); a platform with no completed scan yet looks back
+  lookback_days. A failed or skipped run leaves the watermark alone, so the
+  next run covers its window again.
+- Several API processes may run the loop: each due run is claimed with a
+  compare-and-set on next_run_at, so it is dispatched exactly once.
+
+Schedules are stored in SQLite with the request template (which carries
+session cookies) encrypted like job payloads.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from cryptography.fernet import MultiFernet
+
+from config import settings, build_cipher
+from jobs import JobQueue
+from metrics import SCHEDULED_RUNS
+from models import ScanSchedule, ScanScheduleRequest, ScrapeRequest
+
+logger = logging.getLogger(__name__)
+
+# (name, lowest, highest) of the five cron fields
+CRON_FIELDS = [("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7)]
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@nightly": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+
+def _parse_cron_field(text: str, name: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in text.split(","):
+        spec, _, step = part.partition("/")
+        try:
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step > 1 else start
+        except ValueError:
+            raise ValueError(f"Invalid cron {name} field: {text!r}")
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"Cron {name} field out of range {low}-{high}: {text!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """Five-field cron expression (minute hour day month weekday), evaluated in UTC"""
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = CRON_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields (minute hour day month weekday): {expression!r}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(text, *field) for text, field in zip(fields, CRON_FIELDS)
+        )
+        # 0 and 7 are both Sunday
+        self.weekdays = {day % 7 for day in weekdays}
+        # As in cron, a restricted day *and* weekday match when either does
+        self._either_day = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        return day or weekday if self._either_day else day and weekday
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after` (naive UTC)"""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+def _epoch(moment: datetime) -> float:
+    """Naive UTC datetime as a Unix timestamp"""
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+def jitter_offset(schedule_id: str, fire_at: datetime, jitter_seconds: int) -> float:
+    """Seconds after fire_at to dispatch: spread evenly, the same in every process"""
+    if jitter_seconds <= 0:
+        return 0.0
+    digest = hashlib.sha256(f"{schedule_id}:{fire_at.isoformat()}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 * jitter_seconds
+
+
+def scheduled_requests(platforms: List[str], template: Dict[str, Any], since: datetime,
+                       now: datetime) -> List[ScrapeRequest]:
+    """One incremental request per platform covering since..now"""
+    return [
+        ScrapeRequest(
+            platform=platform,
+            start_month=since.month, start_year=since.year,
+            end_month=now.month, end_year=now.year,
+            since=since,
+            **template
+        )
+        for platform in platforms
+    ]
+
+
+class ScheduleStore:
+    """SQLite store of recurring scan schedules"""
+
+    def __init__(self, path: Path = None, cipher: MultiFernet = None):
+        self.path = Path(path or settings.SCHEDULE_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Templates carry session cookies, so they are encrypted at rest
+        self.cipher = cipher or build_cipher()
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS scan_schedules (
+                    schedule_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    cron TEXT NOT NULL,
+                    platforms TEXT NOT NULL,
+                    template TEXT NOT NULL,
+                    lookback_days INTEGER NOT NULL,
+                    jitter_seconds INTEGER NOT NULL,
+                    enabled INTEGER NOT NULL DEFAULT 1,
+                    fire_at REAL NOT NULL,
+                    next_run_at REAL NOT NULL,
+                    last_run_at REAL,
+                    last_scan_ids TEXT,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_schedules_due ON scan_schedules (enabled, next_run_at);
+                CREATE INDEX IF NOT EXISTS idx_schedules_user ON scan_schedules (user_id);
+                CREATE TABLE IF NOT EXISTS schedule_watermarks (
+                    schedule_id TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    completed_through REAL NOT NULL,
+                    PRIMARY KEY (schedule_id, platform)
+                );
+            """)
+
+    @staticmethod
+    def _watermarks(conn: sqlite3.Connection, schedule_id: str) -> Dict[str, float]:
+        rows = conn.execute(
+            "SELECT platform, completed_through FROM schedule_watermarks WHERE schedule_id = ?",
+            (schedule_id,)
+        ).fetchall()
+        return {row['platform']: row['completed_through'] for row in rows}
+
+    def _row_to_schedule(self, row: sqlite3.Row, watermarks: Dict[str, float]) -> ScanSchedule:
+        template = self._decode_template(row['template'])
+        return ScanSchedule(
+            schedule_id=row['schedule_id'],
+            user_id=row['user_id'],
+            name=row['name'],
+            cron=row['cron'],
+            platforms=json.loads(row['platforms']),
+            include_filters=template.get('include_filters'),
+            exclude_filters=template.get('exclude_filters'),
+            priority=template.get('priority', 0),
+            include_content=template.get('include_content', False),
+            lookback_days=row['lookback_days'],
+            jitter_seconds=row['jitter_seconds'],
+            enabled=bool(row['enabled']),
+            next_run_at=datetime.utcfromtimestamp(row['next_run_at']),
+            last_run_at=datetime.utcfromtimestamp(row['last_run_at']) if row['last_run_at'] else None,
+            last_scan_ids=json.loads(row['last_scan_ids']) if row['last_scan_ids'] else [],
+            completed_through={
+                platform: datetime.utcfromtimestamp(moment) for platform, moment in watermarks.items()
+            },
+            last_error=row['last_error'],
+            created_at=datetime.utcfromtimestamp(row['created_at'])
+        )
+
+    def _encode_template(self, template: Dict[str, Any]) -> str:
+        return self.cipher.encrypt(json.dumps(template).encode()).decode()
+
+    def _decode_template(self, stored: str) -> Dict[str, Any]:
+        return json.loads(self.cipher.decrypt(stored.encode()).decode())
+
+    @staticmethod
+    def _next_run(schedule_id: str, cron: CronExpression, after: datetime,
+                  jitter_seconds: int) -> Tuple[datetime, float]:
+        fire_at = cron.next_after(after)
+        return fire_at, _epoch(fire_at) + jitter_offset(schedule_id, fire_at, jitter_seconds)
+
+    def create(self, user_id: str, request: ScanScheduleRequest) -> ScanSchedule:
+        """Raises ValueError for an invalid cron expression"""
+        cron = CronExpression(request.cron)
+        schedule_id = str(uuid.uuid4())
+        jitter = settings.SCHEDULE_JITTER_SECONDS if request.jitter_seconds is None else request.jitter_seconds
+        now = time.time()
+        fire_at, next_run_at = self._next_run(schedule_id, cron, datetime.utcfromtimestamp(now), jitter)
+        template = request.model_dump(mode='json', include={
+            'cookies', 'include_filters', 'exclude_filters', 'priority', 'include_content'
+        })
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO scan_schedules (schedule_id, user_id, name, cron, platforms, template, "
+                "lookback_days, jitter_seconds, enabled, fire_at, next_run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (schedule_id, user_id, request.name, cron.expression,
+                 json.dumps([p.value for p in request.platforms]), self._encode_template(template),
+                 request.lookback_days, jitter, int(request.enabled), _epoch(fire_at), next_run_at,
+                 now, now)
+            )
+        logger.info(f"Created schedule {schedule_id} ({cron.expression}) for user {user_id}")
+        return self.get(schedule_id)
+
+    def get(self, schedule_id: str) -> Optional[ScanSchedule]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM scan_schedules WHERE schedule_id = ?", (schedule_id,)
+            ).fetchone()
+            return self._row_to_schedule(row, self._watermarks(conn, schedule_id)) if row else None
+
+    def list_for_user(self, user_id: str) -> List[ScanSchedule]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM scan_schedules WHERE user_id = ? ORDER BY created_at", (user_id,)
+            ).fetchall()
+            return [self._row_to_schedule(row, self._watermarks(conn, row['schedule_id'])) for row in rows]
+
+    def count_for_user(self, user_id: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS n FROM scan_schedules WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row['n']
+
+    def delete(self, schedule_id: str) -> bool:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM schedule_watermarks WHERE schedule_id = ?", (schedule_id,))
+            return conn.execute(
+                "DELETE FROM scan_schedules WHERE schedule_id = ?", (schedule_id,)
+            ).rowcount > 0
+
+    def claim_due(self, now: float, limit: int = 100) -> Iterator[Dict[str, Any]]:
+        """
+        Yield due runs, each already moved on to its next run time. The move is
+        a compare-and-set on next_run_at, so a run claimed by another process
+        is skipped. Runs missed while nothing was dispatching collapse into one.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM scan_schedules WHERE enabled = 1 AND next_run_at <= ? "
+                "ORDER BY next_run_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        for row in rows:
+            cron = CronExpression(row['cron'])
+            after = datetime.utcfromtimestamp(row['fire_at'])
+            fire_at, next_run_at = self._next_run(row['schedule_id'], cron, after, row['jitter_seconds'])
+            if next_run_at <= now:
+                fire_at, next_run_at = self._next_run(
+                    row['schedule_id'], cron, datetime.utcfromtimestamp(now), row['jitter_seconds']
+                )
+            with self._connect() as conn:
+                claimed = conn.execute(
+                    "UPDATE scan_schedules SET fire_at = ?, next_run_at = ?, updated_at = ? "
+                    "WHERE schedule_id = ? AND next_run_at = ?",
+                    (_epoch(fire_at), next_run_at, now, row['schedule_id'], row['next_run_at'])
+                ).rowcount
+                watermarks = self._watermarks(conn, row['schedule_id']) if claimed else {}
+            if claimed:
+                yield {
+                    'schedule_id': row['schedule_id'],
+                    'user_id': row['user_id'],
+                    'platforms': json.loads(row['platforms']),
+                    'template': self._decode_template(row['template']),
+                    'lookback_days': row['lookback_days'],
+                    'watermarks': watermarks
+                }
+
+    def record_run(self, schedule_id: str, run_at: float, scan_ids: List[str], error: str = None):
+        """Store a run's outcome; the watermarks only move when its scans complete"""
+        with self._connect() as conn:
+            if scan_ids:
+                conn.execute(
+                    "UPDATE scan_schedules SET last_run_at = ?, last_scan_ids = ?, last_error = ?, "
+                    "updated_at = ? WHERE schedule_id = ?",
+                    (run_at, json.dumps(scan_ids), error, time.time(), schedule_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE scan_schedules SET last_error = ?, updated_at = ? WHERE schedule_id = ?",
+                    (error, time.time(), schedule_id)
+                )
+
+    def record_completed(self, schedule_id: str, platform: str, window_end: float):
+        """A scheduled scan completed: its platform's next run starts from window_end"""
+        with self._connect() as conn:
+            # Resumed scans can finish after a later run's, so the watermark never moves back
+            conn.execute(
+                "INSERT INTO schedule_watermarks (schedule_id, platform, completed_through) "
+                "VALUES (?, ?, ?) ON CONFLICT (schedule_id, platform) DO UPDATE SET "
+                "completed_through = MAX(completed_through, excluded.completed_through)",
+                (schedule_id, platform, window_end)
+            )
+
+
+class ScanScheduler:
+    """Dispatches due schedules onto the job queue"""
+
+    def __init__(self, store: ScheduleStore, queue: JobQueue):
+        self.store = store
+        self.queue = queue
+
+    def dispatch_due(self, now: float = None) -> int:
+        """Enqueue every due run; returns the number of scan jobs queued"""
+        now = now or time.time()
+        queued = 0
+        for run in self.store.claim_due(now):
+            queued += self._dispatch(run, now)
+        return queued
+
+    def _dispatch(self, run: Dict[str, Any], now: float) -> int:
+        schedule_id, user_id, platforms = run['schedule_id'], run['user_id'], run['platforms']
+        limit = settings.USER_MAX_PENDING_SCANS
+        pending = self.queue.pending_for_user(user_id)
+        if limit > 0 and pending + len(platforms) > limit:
+            # The watermark stays put, so the next run covers this window too
+            SCHEDULED_RUNS.labels(outcome='skipped').inc()
+            self.store.record_run(schedule_id, now, [], f"Skipped: {pending} scans already queued or running")
+            return 0
+
+        scan_ids, windows = [], []
+        for platform in platforms:
+            completed_through = run['watermarks'].get(platform)
+            if completed_through:
+                since = datetime.utcfromtimestamp(completed_through - settings.SCHEDULE_OVERLAP_SECONDS)
+            else:
+                since = datetime.utcfromtimestamp(now) - timedelta(days=run['lookback_days'])
+            request, = scheduled_requests([platform], run['template'], since, datetime.utcfromtimestamp(now))
+            scan_id = str(uuid.uuid4())
+            # The worker reports window_end back once the scan completes (scraping.scrape_job)
+            self.queue.enqueue(
+                "scrape", scan_id,
+                {"request": request.model_dump(mode='json'), "schedule_id": schedule_id, "window_end": now},
+                request.priority, user_id
+            )
+            scan_ids.append(scan_id)
+            windows.append(f"{platform} since {since.isoformat()}")
+        SCHEDULED_RUNS.labels(outcome='dispatched').inc()
+        self.store.record_run(schedule_id, now, scan_ids)
+        logger.info(f"Schedule {schedule_id} queued {len(scan_ids)} scans for user {user_id} "
+                    f"({', '.join(windows)})")
+        return len(scan_ids)
+
+    async def run(self):
+        """Scheduler loop for the API process's lifespan"""
+        logger.info("Scan scheduler started")
+        while True:
+            try:
+                await asyncio.to_thread(self.dispatch_due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error dispatching scheduled scans: {e}")
+            await asyncio.sleep(settings.SCHEDULER_POLL_SECONDS)
+'''
+
+print("=== SCHEDULER.PY ===")
+print(scheduler_py[:2000])
+print(f"\n... [Full file is {len(scheduler_py.splitlines())} lines] ...\n")
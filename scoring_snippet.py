@@ -0,0 +1,517 @@
+
+# 15. scoring.py - Policy compliance scoring engines
+scoring_py = '''"""
+VAMP Agent Scoring Engines
+Python port of the v3.0 engines in index.html (PolicyMatcher, ValuesScorer,
+TierAssigner, ClauseScorer, KPARouter) and the composite compliance scan, so
+evidence can be scored server-side with the same clause packs and weights.
+
+Scoring is CPU-bound regex work; ScoringExecutor runs it on a process pool so
+the event loop serving WebSockets and /api/scrape stays responsive.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Deque, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from config import settings
+from tracing import span, start_span
+
+logger = logging.getLogger(__name__)
+
+# Clause packs: (pattern, weight, type) per policy, as in index.html
+CLAUSE_PACKS: Dict[str, Dict[str, Any]] = {
+    "POL-ETH-1": {
+        "name": "Ethics & Integrity",
+        "mandatory": 1,
+        "clauses": [
+            ("integrity|honest|authentic|transparent", 3, "mandatory"),
+            ("ethical|moral|principle|conduct", 3, "mandatory"),
+            ("conflict.of.interest|disclosure|impartiality", 3, "mandatory"),
+            ("accountability|responsible|liable|duty", 2, "recommended"),
+            ("stakeholder|trust|reputation|standing", 2, "recommended"),
+        ]
+    },
+    "POL-OHS-1": {
+        "name": "Occupational Health & Safety",
+        "mandatory": 1,
+        "clauses": [
+            ("safety|hazard|risk.assessment|incident", 3, "mandatory"),
+            ("health|wellness|wellbeing|medical", 3, "mandatory"),
+            ("emergency|evacuation|protocol|procedure", 3, "mandatory"),
+            ("training|awareness|competency|qualification", 2, "recommended"),
+            ("incident.report|investigation|corrective", 2, "recommended"),
+        ]
+    },
+    "POL-GOV-1": {
+        "name": "Governance & Compliance",
+        "mandatory": 0,
+        "clauses": [
+            ("governance|board|executive|committee", 3, "mandatory"),
+            ("policy|procedure|guideline|standard", 3, "mandatory"),
+            ("audit|compliance|monitor|review", 2, "recommended"),
+            ("transparency|disclosure|reporting|accountability", 2, "recommended"),
+            ("stakeholder|engagement|consultation|feedback", 1, "recommended"),
+        ]
+    },
+    "POL-DIV-1": {
+        "name": "Diversity & Inclusion",
+        "mandatory": 0,
+        "clauses": [
+            ("diversity|inclusion|equity|representation", 3, "mandatory"),
+            ("discrimination|bias|prejudice|stereotype", 3, "mandatory"),
+            ("access|accommodation|reasonable|adjustment", 2, "recommended"),
+            ("training|awareness|education|culture", 2, "recommended"),
+            ("data|metric|monitoring|tracking", 1, "recommended"),
+        ]
+    },
+    "POL-FIN-1": {
+        "name": "Financial Management",
+        "mandatory": 0,
+        "clauses": [
+            ("budget|expenditure|cost|resource", 3, "mandatory"),
+            ("audit|control|segregation|duty", 3, "mandatory"),
+            ("fraud|theft|misappropriation|irregularity", 2, "recommended"),
+            ("report|reconciliation|reconcile|statement", 2, "recommended"),
+            ("approval|authorization|delegation|limit", 1, "recommended"),
+        ]
+    },
+    "POL-HR-1": {
+        "name": "Human Resources",
+        "mandatory": 0,
+        "clauses": [
+            ("employee|staff|personnel|human.resource", 3, "mandatory"),
+            ("recruitment|selection|appointment|contract", 3, "mandatory"),
+            ("performance|appraisal|development|training", 2, "recommended"),
+            ("disciplinary|grievance|dispute|resolution", 2, "recommended"),
+            ("compensation|benefit|leave|remuneration", 1, "recommended"),
+        ]
+    },
+    "POL-IT-1": {
+        "name": "Information Technology",
+        "mandatory": 0,
+        "clauses": [
+            ("cybersecurity|security|threat|vulnerability", 3, "mandatory"),
+            ("data|privacy|confidential|classified", 3, "mandatory"),
+            ("backup|disaster.recovery|continuity|availability", 2, "recommended"),
+            ("access.control|authentication|authorization|permission", 2, "recommended"),
+            ("incident|breach|report|notification", 1, "recommended"),
+        ]
+    },
+    "POL-ENV-1": {
+        "name": "Environmental Sustainability",
+        "mandatory": 0,
+        "clauses": [
+            ("environment|sustainability|green|eco", 3, "mandatory"),
+            ("carbon|emission|footprint|climate", 3, "mandatory"),
+            ("waste|recycling|conservation|resource", 2, "recommended"),
+            ("renewable|energy|efficiency|consumption", 2, "recommended"),
+            ("monitoring|target|goal|reduction", 1, "recommended"),
+        ]
+    },
+    "POL-QA-1": {
+        "name": "Quality Assurance",
+        "mandatory": 0,
+        "clauses": [
+            ("quality|standard|excellence|best.practice", 3, "mandatory"),
+            ("process|procedure|documentation|record", 3, "mandatory"),
+            ("audit|inspection|verification|validation", 2, "recommended"),
+            ("improvement|continuous|feedback|lesson", 2, "recommended"),
+            ("metric|indicator|kpi|performance", 1, "recommended"),
+        ]
+    },
+    "POL-RES-1": {
+        "name": "Research & Innovation",
+        "mandatory": 0,
+        "clauses": [
+            ("research|study|investigation|inquiry", 3, "mandatory"),
+            ("innovation|development|creation|discovery", 3, "mandatory"),
+            ("ethics|integrity|plagiarism|attribution", 2, "recommended"),
+            ("intellectual.property|patent|publication|peer.review", 2, "recommended"),
+            ("funding|grant|collaboration|partnership", 1, "recommended"),
+        ]
+    },
+}
+
+COMPOSITE_WEIGHTS = {"tier": 0.4, "policy": 0.3, "values": 0.2, "kpa_coverage": 0.1}
+MUST_PASS_POLICIES = ["POL-ETH-1", "POL-OHS-1"]
+
+TIER_KEYWORDS: Dict[str, List[str]] = {
+    "transformational": [
+        "innovation", "excellence", "transformative", "strategic", "visionary",
+        "sustainable", "collaborative", "integrated", "systemic", "breakthrough"
+    ],
+    "developmental": [
+        "improving", "growing", "emerging", "evolving", "advancing",
+        "building", "strengthening", "developing", "maturing", "progressing"
+    ],
+    "compliance": [
+        "mandatory", "required", "regulated", "statutory", "compliance",
+        "control", "governance", "audit", "standard", "procedural"
+    ]
+}
+TIER_KEYWORD_WEIGHTS = {"transformational": 0.3, "developmental": 0.2, "compliance": 0.2}
+
+KPA_ROUTER: Dict[str, List[str]] = {
+    "POL-ETH-1": ["KPA-Governance", "KPA-Management"],
+    "POL-OHS-1": ["KPA-Management"],
+    "POL-GOV-1": ["KPA-Governance"],
+    "POL-DIV-1": ["KPA-Engagement", "KPA-Management"],
+    "POL-FIN-1": ["KPA-Management"],
+    "POL-HR-1": ["KPA-Management"],
+    "POL-IT-1": ["KPA-Management"],
+    "POL-ENV-1": ["KPA-Engagement"],
+    "POL-QA-1": ["KPA-Teaching", "KPA-Research"],
+    "POL-RES-1": ["KPA-Research"]
+}
+
+VALUES_INDEX: Dict[str, Dict[str, Any]] = {
+    "integrity": {"weight": 1.0, "tier": "transformational"},
+    "accountability": {"weight": 0.9, "tier": "transformational"},
+    "excellence": {"weight": 0.9, "tier": "transformational"},
+    "transparency": {"weight": 0.8, "tier": "developmental"},
+    "collaboration": {"weight": 0.8, "tier": "developmental"},
+    "innovation": {"weight": 0.7, "tier": "transformational"},
+    "sustainability": {"weight": 0.7, "tier": "developmental"},
+    "inclusivity": {"weight": 0.8, "tier": "developmental"},
+    "compliance": {"weight": 0.6, "tier": "compliance"},
+    "efficiency": {"weight": 0.5, "tier": "compliance"}
+}
+
+
+class Clause:
+    """One compiled clause pattern"""
+
+    def __init__(self, pattern: str, weight: int, clause_type: str):
+        self.source = pattern
+        self.pattern: Pattern = re.compile(pattern, re.IGNORECASE)
+        self.weight = weight
+        self.type = clause_type
+
+    def matches(self, text: str) -> bool:
+        return self.pattern.search(text) is not None
+
+
+def compile_clause_packs(packs: Dict[str, Dict[str, Any]] = None) -> Dict[str, List[Clause]]:
+    return {
+        policy_id: [Clause(*clause) for clause in pack["clauses"]]
+        for policy_id, pack in (packs or CLAUSE_PACKS).items()
+    }
+
+
+class KPARouter:
+    """Maps a policy's matched clauses onto KPA coverage"""
+
+    def score(self, policy_id: str, matched_clauses: int) -> Dict[str, Any]:
+        kpas = KPA_ROUTER.get(policy_id, [])
+        return {"kpas": kpas, "coverage": (matched_clauses / 5) * 100 if kpas else 0}
+
+
+class PolicyMatcher:
+    """Weighted clause matches for one policy"""
+
+    def __init__(self, clauses: Dict[str, List[Clause]] = None):
+        self.clauses = clauses or compile_clause_packs()
+
+    def score(self, text: str, policy_id: str) -> Dict[str, Any]:
+        matched = [c for c in self.clauses.get(policy_id, ()) if c.matches(text)]
+        return {
+            "matched": len(matched),
+            "mandatory": sum(1 for c in matched if c.type == "mandatory"),
+            "weight": sum(c.weight for c in matched),
+            "clauses": [c.source for c in matched]
+        }
+
+
+class ValuesScorer:
+    """Institutional values and tier keywords found in a text"""
+
+    def __init__(self):
+        self.values = [
+            (value, re.compile(value, re.IGNORECASE), info["weight"], info["tier"])
+            for value, info in VALUES_INDEX.items()
+        ]
+        self.keywords = [
+            (re.compile(keyword, re.IGNORECASE), tier, TIER_KEYWORD_WEIGHTS[tier])
+            for tier, keywords in TIER_KEYWORDS.items() for keyword in keywords
+        ]
+
+    def score(self, text: str) -> Dict[str, Any]:
+        tier_scores = {tier: 0.0 for tier in TIER_KEYWORDS}
+        found_values = []
+        for value, pattern, weight, tier in self.values:
+            if pattern.search(text):
+                tier_scores[tier] += weight
+                found_values.append(value)
+        for pattern, tier, weight in self.keywords:
+            if pattern.search(text):
+                tier_scores[tier] += weight
+        return {"tier_scores": tier_scores, "found_values": found_values}
+
+
+class TierAssigner:
+    """Composite score (0-100) to the 1-5 institutional rating"""
+
+    def score(self, composite_score: float) -> int:
+        if composite_score >= 90:
+            return 5
+        if composite_score >= 75:
+            return 4
+        if composite_score >= 60:
+            return 3
+        if composite_score >= 40:
+            return 2
+        return 1
+
+
+class ClauseScorer:
+    """Share of a policy's clauses present in a text"""
+
+    def __init__(self, clauses: Dict[str, List[Clause]] = None):
+        self.clauses = clauses or compile_clause_packs()
+
+    def score_policy(self, text: str, policy_id: str) -> Dict[str, Any]:
+        clauses = self.clauses.get(policy_id)
+        if not clauses:
+            return {"total": 0, "mandatory": 0, "recommended": 0, "percentage": 0}
+
+        mandatory = recommended = 0
+        for clause in clauses:
+            if clause.matches(text):
+                if clause.type == "mandatory":
+                    mandatory += 1
+                else:
+                    recommended += 1
+        total = mandatory + recommended
+        return {
+            "total": total,
+            "mandatory": mandatory,
+            "recommended": recommended,
+            "percentage": round(total / len(clauses) * 100)
+        }
+
+
+class ComplianceScanner:
+    """Composite per-policy compliance scan over a corpus (VAMPScanner.runComplianceScan)"""
+
+    def __init__(self):
+        self.clauses = compile_clause_packs()
+        self.policy_matcher = PolicyMatcher(self.clauses)
+        self.values_scorer = ValuesScorer()
+        self.clause_scorer = ClauseScorer(self.clauses)
+        self.tier_assigner = TierAssigner()
+
+    def score_text(self, text: str) -> Dict[str, Any]:
+        """Per-item matches for every policy; indexes refer to CLAUSE_PACKS clause order"""
+        policies = {}
+        for policy_id, clauses in self.clauses.items():
+            matched = [i for i, clause in enumerate(clauses) if clause.matches(text)]
+            if matched:
+                policies[policy_id] = {
+                    "matched": matched,
+                    "mandatory": sum(1 for i in matched if clauses[i].type == "mandatory"),
+                    "weight": sum(clauses[i].weight for i in matched)
+                }
+        return {"policies": policies, "values": self.values_scorer.score(text)}
+
+    def scan(self, texts: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        accumulator = ComplianceAccumulator(self)
+        for text in texts:
+            accumulator.add(self.score_text(text))
+        return accumulator.results()
+
+    @staticmethod
+    def composite_score(policy_score: float, total_evidence: int, mandatory_passed: int,
+                        corpus_size: int) -> float:
+        if total_evidence == 0:
+            return 0.0
+        weights = COMPOSITE_WEIGHTS
+        policy_norm = min(100, policy_score / (total_evidence * 30) * 100)
+        tier_score = 80 if mandatory_passed > 0 else 40
+        values_score = 70
+        return (
+            tier_score * weights["tier"]
+            + policy_norm * weights["policy"]
+            + values_score * weights["values"]
+            + total_evidence / corpus_size * 100 * weights["kpa_coverage"]
+        )
+
+    def rating(self, results: Dict[str, Dict[str, Any]]) -> int:
+        """Institutional 1-5 rating from the average composite score"""
+        if not results:
+            return 3
+        average = sum(r["composite_score"] for r in results.values()) / len(results)
+        return self.tier_assigner.score(average)
+
+
+class ComplianceAccumulator:
+    """
+    Folds per-item score_text() results into the per-policy scan summary, so a
+    corpus can be scored in batches (or in other processes) and summarised once.
+    clause_match is the union of clauses matched by any item.
+    """
+
+    def __init__(self, scanner: ComplianceScanner = None):
+        self.scanner = scanner or ComplianceScanner()
+        self.items = 0
+        self._totals = {
+            policy_id: {"policy_score": 0, "total_evidence": 0, "mandatory_passed": 0, "clauses": set()}
+            for policy_id in CLAUSE_PACKS
+        }
+
+    def add(self, item_score: Dict[str, Any]):
+        self.items += 1
+        for policy_id, match in item_score["policies"].items():
+            totals = self._totals[policy_id]
+            totals["total_evidence"] += 1
+            totals["policy_score"] += match["weight"] * 10
+            if match["mandatory"] > 0:
+                totals["mandatory_passed"] += 1
+            totals["clauses"].update(match["matched"])
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for policy_id, pack in CLAUSE_PACKS.items():
+            totals = self._totals[policy_id]
+            clauses = self.scanner.clauses[policy_id]
+            mandatory = sum(1 for i in totals["clauses"] if clauses[i].type == "mandatory")
+            matched = len(totals["clauses"])
+            results[policy_id] = {
+                "policy": pack["name"],
+                "evidence_count": totals["total_evidence"],
+                "mandatory_passed": totals["mandatory_passed"],
+                "is_mandatory": pack["mandatory"] == 1,
+                "composite_score": round(self.scanner.composite_score(
+                    totals["policy_score"], totals["total_evidence"],
+                    totals["mandatory_passed"], self.items
+                )),
+                "clause_match": {
+                    "total": matched,
+                    "mandatory": mandatory,
+                    "recommended": matched - mandatory,
+                    "percentage": round(matched / len(clauses) * 100)
+                },
+                # Indexes into the policy's CLAUSE_PACKS clauses
+                "matched_clauses": sorted(totals["clauses"])
+            }
+        return results
+
+
+# Per-process scanner: compiled once in each executor worker (and lazily in the API)
+_worker_scanner: Optional[ComplianceScanner] = None
+
+
+def _init_worker():
+    global _worker_scanner
+    _worker_scanner = ComplianceScanner()
+
+
+def score_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    """Executor task: score_text() for a chunk of texts"""
+    if _worker_scanner is None:
+        _init_worker()
+    return [_worker_scanner.score_text(text) for text in texts]
+
+
+class ScoringExecutor:
+    """
+    Process pool for CPU-bound scoring. Evidence is split into chunks, the
+    chunks are scored on every core, and results come back in input order
+    with a bounded number of chunks in flight.
+    """
+
+    def __init__(self, workers: int = None, chunk_size: int = None):
+        self.workers = workers or settings.SCORING_WORKERS or os.cpu_count() or 1
+        self.chunk_size = chunk_size or settings.SCORING_CHUNK_SIZE
+        self.max_in_flight = self.workers * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers also work where the API forks uvicorn workers
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            logger.info(f"Scoring executor started with {self.workers} workers")
+        return self._pool
+
+    async def map_chunks(self, batches: AsyncIterable[List[str]]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield score_text() results chunk by chunk, in input order. Chunks are cut
+        across batch boundaries and submitted as soon as they fill, so the pool
+        keeps max_in_flight chunks however the texts are batched.
+        """
+        loop = asyncio.get_running_loop()
+        pending: Deque[Tuple[asyncio.Future, Any]] = deque()
+        try:
+            async for chunk in _chunks(batches, self.chunk_size):
+                # From submission, so time spent waiting for a free worker shows too
+                chunk_span = start_span("scoring.chunk", {"items": len(chunk)})
+                pending.append((loop.run_in_executor(self.pool, score_chunk, chunk), chunk_span))
+                if len(pending) >= self.max_in_flight:
+                    yield await _chunk_result(*pending.popleft())
+            while pending:
+                yield await _chunk_result(*pending.popleft())
+        finally:
+            for future, chunk_span in pending:
+                future.cancel()
+                chunk_span.end()
+
+    async def scan(self, batches: AsyncIterator[List[str]]) -> Dict[str, Any]:
+        """Composite scan over batches of texts without blocking the event loop"""
+        accumulator = ComplianceAccumulator()
+        with span("scoring.scan", workers=self.workers, chunk_size=self.chunk_size) as scan_span:
+            async for scores in self.map_chunks(batches):
+                for score in scores:
+                    accumulator.add(score)
+            results = accumulator.results()
+            scan_span.set_attribute("items", accumulator.items)
+        return {
+            "items": accumulator.items,
+            "policies": results,
+            "rating": accumulator.scanner.rating(results)
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+async def _chunk_result(future: asyncio.Future, chunk_span) -> List[Dict[str, Any]]:
+    try:
+        return await future
+    except BaseException as e:
+        chunk_span.record_exception(e)
+        raise
+    finally:
+        chunk_span.end()
+
+
+async def _chunks(batches: AsyncIterable[List[str]], size: int) -> AsyncIterator[List[str]]:
+    chunk = []
+    async for texts in batches:
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def evidence_text(item: Dict[str, Any]) -> str:
+    """Text the engines score for an evidence item, including its content once resolved"""
+    return " ".join(filter(None, [item.get("title"), item.get("description"), item.get("content")]))
+'''
+
+print("=== SCORING.PY ===")
+print(scoring_py[:2000])
+print(f"\n... [Full file is {len(scoring_py.splitlines())} lines] ...\n")
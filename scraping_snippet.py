@@ -0,0 +1,368 @@
+
+# 7. scraping.py - Scrape execution shared by API handlers and job workers
+scraping_py = '''"""
+VAMP Agent Scrape Execution
+Shared by the /api/scrape handler and the durable job workers
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from config import settings, credential_manager, DEFAULT_USER
+from models import PlatformType, ScanJob, ScrapeRequest, SessionCheckRequest
+from jobs import job_handler, JobContext, PermanentJobError
+from connectors.base import SessionExpiredError, SESSION_INVALID, SESSION_UNKNOWN, SESSION_VALID
+from connectors.registry import ConnectorFactory
+from content import resolve_content
+from evidence_batch import EvidenceBatch
+from evidence_store import EvidenceStore
+from metrics import (
+    CONNECTOR_ITEMS, CONNECTOR_PAGES, SCRAPE_ITEMS_PER_SECOND, SCRAPES,
+    stage_timer
+)
+from pipeline import Pipeline, Stage, STAGE_THREAD
+from scheduler import ScheduleStore
+from tracing import scan_trace, span
+
+logger = logging.getLogger(__name__)
+
+# publish(event_type, data) used to stream progress to WebSocket subscribers
+Publisher = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+
+class SessionCheckCache:
+    """
+    Recent pre-flight results per (platform, session fingerprint) in this process.
+    Valid sessions are re-checked after `ttl` seconds since they can expire at any
+    time; a rejected session stays rejected, so it is remembered longer.
+    """
+    
+    def __init__(self, ttl: float, invalid_ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.invalid_ttl = invalid_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+    
+    def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            return None
+        return result
+    
+    def put(self, key: Tuple[str, str], result: Dict[str, Any]):
+        ttl = {SESSION_VALID: self.ttl, SESSION_INVALID: self.invalid_ttl}.get(result['status'], 0)
+        if ttl <= 0:
+            return
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + ttl, result)
+    
+    def invalidate(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+
+
+session_checks = SessionCheckCache(settings.SESSION_CHECK_TTL, settings.SESSION_CHECK_INVALID_TTL)
+
+
+def resolve_date_range(request: ScrapeRequest) -> Tuple[datetime, datetime]:
+    """Turn month/year selectors into an inclusive datetime range"""
+    if request.start_year == request.end_year:
+        if request.start_month > request.end_month:
+            raise ValueError("start_month must be <= end_month in same year")
+
+    start_date = datetime(request.start_year, request.start_month, 1)
+    end_date = datetime(request.end_year, request.end_month, 1)
+    # Set to end of month
+    if end_date.month == 12:
+        end_date = end_date.replace(year=end_date.year + 1, month=1) - timedelta(days=1)
+    else:
+        end_date = end_date.replace(month=end_date.month + 1) - timedelta(days=1)
+    end_date = end_date.replace(hour=23, minute=59, second=59)
+    if request.since:
+        # Incremental (scheduled) scans start where the previous run left off
+        since = request.since
+        if since.tzinfo:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        start_date = max(start_date, since)
+    return start_date, end_date
+
+
+async def check_connector_session(connector, platform: str) -> Dict[str, Any]:
+    """Pre-flight session check through the cache; the connector's session must be open"""
+    key = (platform, connector.session_fingerprint())
+    cached = session_checks.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+    status, detail = await connector.check_session()
+    result = {
+        "platform": platform,
+        "status": status,
+        "detail": detail,
+        "checked_at": datetime.utcnow().isoformat()
+    }
+    session_checks.put(key, result)
+    return {**result, "cached": False}
+
+
+async def _create_connector(request: Union[ScrapeRequest, SessionCheckRequest], user_id: str,
+                            connect: bool = True):
+    # Get saved credentials if needed
+    creds = None
+    if request.platform in [PlatformType.NEXTCLOUD, PlatformType.EFUNDI]:
+        creds = await credential_manager.get_credentials_async(request.platform.value, user_id)
+
+    return await ConnectorFactory.create_connector(
+        platform=request.platform.value,
+        cookies=[c.model_dump() for c in request.cookies] if request.cookies else None,
+        credentials=creds,
+        connect=connect
+    )
+
+
+async def check_request_session(request: Union[ScrapeRequest, SessionCheckRequest],
+                                user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+    """Pre-flight check of the cookies or saved credentials a scrape request would use"""
+    if not settings.SESSION_CHECK_ENABLED:
+        return {"platform": request.platform.value, "status": SESSION_UNKNOWN,
+                "detail": "Session pre-flight checks are disabled", "cached": False}
+    connector = await _create_connector(request, user_id, connect=False)
+    async with connector:
+        return await check_connector_session(connector, request.platform.value)
+
+
+class ScrapeResult:
+    """
+    Outcome of run_scrape. Sync scrapes hold their evidence as one columnar
+    batch; scans persisted to the evidence store only carry the count.
+    """
+
+    __slots__ = ('platform', 'total_items', 'items', 'errors')
+
+    def __init__(self, platform: PlatformType, total_items: int,
+                 items: Optional[EvidenceBatch] = None, errors: List[str] = None):
+        self.platform = platform
+        self.total_items = total_items
+        self.items = items
+        self.errors = errors or []
+
+    def to_payload(self) -> Dict[str, Any]:
+        """JSON body in the ScrapeResponse shape, without building Evidence models"""
+        return {
+            "platform": self.platform.value,
+            "total_items": self.total_items,
+            "items": list(self.items.records()) if self.items is not None else [],
+            "errors": self.errors,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+
+class ScrapePage:
+    """One connector page on its way through the scrape pipeline"""
+
+    __slots__ = ('number', 'items', 'cursor', 'batch')
+
+    def __init__(self, number: int, items: List[Dict], cursor: Optional[Dict[str, Any]]):
+        self.number = number
+        self.items = items  # raw connector items, dropped once converted
+        self.cursor = cursor
+        self.batch: Optional[EvidenceBatch] = None
+
+
+async def run_scrape(request: ScrapeRequest, publish: Publisher = None,
+                     scan_id: str = None, store: EvidenceStore = None,
+                     user_id: str = DEFAULT_USER) -> ScrapeResult:
+    """
+    Fetch, convert and filter evidence for one platform, using user_id's saved
+    credentials where the platform needs them. Pages are handled as columnar
+    EvidenceBatches throughout, and move through a pipeline of stages (fetch,
+    convert, filter, content, persist, publish) that work on different pages
+    at the same time.
+    With a scan_id and store, every page is persisted with its paging checkpoint
+    and a re-run continues after the last checkpoint instead of starting over.
+    """
+    start_date, end_date = resolve_date_range(request)
+    platform = request.platform.value
+    
+    cursor = None
+    if scan_id and store:
+        checkpoint = await asyncio.to_thread(store.get_checkpoint, scan_id, platform)
+        if checkpoint and checkpoint['done']:
+            logger.info(f"Scan {scan_id} already finished {platform}, skipping fetch")
+            return await _stored_result(request, scan_id, store, [])
+        if checkpoint:
+            cursor = checkpoint['cursor']
+            logger.info(f"Resuming scan {scan_id} on {platform} after page {checkpoint['pages']}")
+    
+    logger.info(f"Scraping {platform} from {start_date} to {end_date}")
+
+    with span("connector.connect", platform=platform):
+        connector = await _create_connector(request, user_id)
+
+    connector_name = connector.__class__.__name__
+    collected = EvidenceBatch()
+    errors = []
+    pages = 0
+    total_items = 0
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        async with connector:
+            if settings.SESSION_CHECK_ENABLED:
+                # Dead sessions fail here in one cheap request, before any paging
+                with stage_timer(connector_name, 'preflight'), \\
+                        span("connector.preflight") as preflight_span:
+                    check = await check_connector_session(connector, platform)
+                    preflight_span.set_attribute("session.status", check['status'])
+                    preflight_span.set_attribute("session.cached", check['cached'])
+                if check['status'] == SESSION_INVALID:
+                    raise SessionExpiredError(check['detail'])
+            
+            async def fetch_pages() -> AsyncIterator[ScrapePage]:
+                nonlocal pages
+                page_iter = connector.fetch_evidence_pages(start_date, end_date, cursor).__aiter__()
+                while True:
+                    # Driven by hand so each page's HTTP requests nest under its fetch span
+                    with stage_timer(connector_name, 'fetch'), \\
+                            span("connector.fetch_page", page=pages + 1, resumed=cursor is not None):
+                        try:
+                            items, next_cursor = await page_iter.__anext__()
+                        except StopAsyncIteration:
+                            break
+                    pages += 1
+                    CONNECTOR_PAGES.labels(connector=connector_name).inc()
+                    CONNECTOR_ITEMS.labels(connector=connector_name).inc(len(items))
+                    yield ScrapePage(pages, items, next_cursor)
+            
+            def convert(page: ScrapePage) -> ScrapePage:
+                page.batch = EvidenceBatch()
+                with stage_timer(connector_name, 'convert'), span("convert", items=len(page.items)):
+                    for error in page.batch.extend_items(page.items, request.platform):
+                        logger.warning(error)
+                        errors.append(error)
+                page.items = None
+                return page
+            
+            def keyword_filter(page: ScrapePage) -> ScrapePage:
+                with stage_timer(connector_name, 'filter'), span("filter", items=len(page.batch)):
+                    page.batch = page.batch.filter_keywords(request.include_filters, request.exclude_filters)
+                return page
+            
+            async def fetch_content(page: ScrapePage) -> ScrapePage:
+                # After the filters: only evidence that is kept gets downloaded
+                with stage_timer(connector_name, 'content'), span("content", items=len(page.batch)):
+                    for error in await resolve_content(connector, page.batch):
+                        logger.warning(error)
+                        errors.append(error)
+                return page
+            
+            def persist(page: ScrapePage) -> ScrapePage:
+                with stage_timer(connector_name, 'persist'), span("persist", page=page.number):
+                    store.save_page(scan_id, platform, list(page.batch.records()), page.cursor)
+                return page
+            
+            async def publish_page(page: ScrapePage) -> ScrapePage:
+                for record in page.batch.records():
+                    await publish("evidence", {"evidence": record})
+                await publish("progress", {
+                    "scan_id": scan_id,
+                    "platform": platform,
+                    "pages": page.number,
+                    "page_items": len(page.batch)
+                })
+                return page
+            
+            # Pages flow through in order, so checkpoints are still saved in sequence
+            stages = [
+                Stage('convert', convert, STAGE_THREAD, settings.PIPELINE_CONVERT_WORKERS),
+                Stage('filter', keyword_filter, STAGE_THREAD)
+            ]
+            if request.include_content:
+                stages.append(Stage('content', fetch_content, workers=settings.PIPELINE_CONTENT_WORKERS))
+            if scan_id and store:
+                stages.append(Stage('persist', persist, STAGE_THREAD))
+            if publish:
+                stages.append(Stage('publish', publish_page))
+            
+            async for page in Pipeline(stages, settings.PIPELINE_QUEUE_SIZE).run(fetch_pages()):
+                total_items += len(page.batch)
+                if not (scan_id and store):
+                    collected.extend(page.batch)
+        outcome = 'success'
+    except SessionExpiredError:
+        # Rejected mid-scan: don't let a cached "valid" send the resume in blind
+        session_checks.invalidate((platform, connector.session_fingerprint()))
+        outcome = 'session_expired'
+        raise
+    finally:
+        await connector.disconnect()
+        elapsed = time.perf_counter() - started
+        SCRAPES.labels(connector=connector_name, outcome=outcome).inc()
+        if elapsed > 0:
+            SCRAPE_ITEMS_PER_SECOND.labels(connector=connector_name).set(total_items / elapsed)
+
+    if scan_id and store:
+        return await _stored_result(request, scan_id, store, errors)
+
+    return ScrapeResult(request.platform, len(collected), collected, errors)
+
+
+async def _stored_result(request: ScrapeRequest, scan_id: str, store: EvidenceStore,
+                         errors: List[str]) -> ScrapeResult:
+    """Count everything persisted for the scan, across resumes; the items stay in the store"""
+    total = await asyncio.to_thread(store.count_evidence, scan_id, request.platform.value)
+    return ScrapeResult(request.platform, total, errors=errors)
+
+
+@job_handler("scrape")
+async def scrape_job(job: ScanJob, ctx: JobContext) -> Dict[str, Any]:
+    """Job worker entry point for /api/scrape/async"""
+    scan_id = job.scan_id
+    request = ScrapeRequest(**job.payload['request'])
+
+    resumed = bool(job.payload.get('resume')) or job.attempts > 1
+    await ctx.publish("status", {
+        "status": "resumed" if resumed else "started",
+        "scan_id": scan_id,
+        "attempt": job.attempts
+    })
+    # Every attempt is a root span in the scan's trace, so retries show side by side
+    with scan_trace(scan_id, "scan.attempt", job_id=job.job_id, attempt=job.attempts,
+                    resumed=resumed, platform=request.platform.value, user=job.user_id):
+        try:
+            # Retries and resumes share the scan_id, so they continue from the checkpoint
+            result = await run_scrape(request, publish=ctx.publish, scan_id=scan_id,
+                                        store=EvidenceStore(), user_id=job.user_id)
+        except SessionExpiredError as e:
+            # Retries would fail the same way; resume the scan with fresh cookies instead
+            await ctx.publish("error", {"error": str(e), "scan_id": scan_id, "status": "session_expired"})
+            raise PermanentJobError(str(e)) from e
+        except Exception as e:
+            await ctx.publish("error", {"error": str(e), "scan_id": scan_id})
+            raise
+
+    if job.payload.get('window_end'):
+        # Only a completed scheduled scan moves its schedule's incremental watermark
+        await asyncio.to_thread(
+            ScheduleStore().record_completed,
+            job.payload['schedule_id'], request.platform.value, job.payload['window_end']
+        )
+    await ctx.publish("status", {
+        "status": "completed",
+        "scan_id": scan_id,
+        "total_items": result.total_items
+    })
+    return {"total_items": result.total_items, "errors": result.errors}
+'''
+
+print("=== SCRAPING.PY ===")
+print(scraping_py[:2000])
+print(f"\n... [Full file is {len(scraping_py.splitlines())} lines] ...\n")
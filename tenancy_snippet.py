@@ -0,0 +1,256 @@
+
+# 18. tenancy.py - Caller identity and per-user quotas
+tenancy_py = '''"""
+VAMP Agent Tenancy
+Identifies the caller of every API request and enforces per-user quotas so one
+user's long scans cannot starve everyone else:
+
+- API calls: token bucket per user (USER_API_RATE / USER_API_BURST)
+- Synchronous /api/scrape: at most USER_MAX_SYNC_SCRAPES at once per user
+- Async scans: at most USER_MAX_PENDING_SCANS queued or running per user
+  (enforced at enqueue); job workers run at most USER_MAX_RUNNING_SCANS per
+  user and always claim for the user with the fewest running scans first
+- Recurring scans: at most USER_MAX_SCHEDULES schedules per user
+
+The caller is identified by, in order:
+
+- a signed user token (Authorization: Bearer <token>, or ?token= on WebSockets),
+  issued with `python tenancy.py issue <user_id>` and checked against
+  USER_TOKEN_SECRET
+- the USER_HEADER header (or ?user= on WebSockets), but only on requests from
+  a TRUSTED_PROXIES address: an authenticating proxy that sets it itself and
+  strips it from client requests. From anywhere else it is rejected, since any
+  client could claim another user's id.
+
+Requests with neither belong to DEFAULT_USER unless REQUIRE_USER_HEADER is set.
+API rate and sync scrape limits are held per API process.
+"""
+import base64
+import hashlib
+import hmac
+import math
+import re
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, WebSocket
+
+from config import settings, DEFAULT_USER
+from metrics import QUOTA_REJECTIONS
+
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._@-]{0,127}$")
+
+# Idle buckets are dropped once this many users have been seen
+MAX_TRACKED_USERS = 4096
+
+
+def unauthenticated(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def resolve_user_id(value: Optional[str]) -> str:
+    """Validate a user id asserted by a trusted proxy"""
+    if not value:
+        if settings.REQUIRE_USER_HEADER:
+            raise unauthenticated(f"Authenticate with a user token or {settings.USER_HEADER} header")
+        return DEFAULT_USER
+    if not USER_ID_PATTERN.match(value):
+        raise HTTPException(status_code=400, detail=f"Invalid {settings.USER_HEADER} header")
+    return value
+
+
+def _sign(payload: str, secret: str) -> str:
+    digest = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue_user_token(user_id: str, ttl_seconds: int = None, secret: str = None) -> str:
+    """Token asserting user_id until it expires: "<user_id>.<expires>.<signature>" """
+    secret = secret or settings.USER_TOKEN_SECRET
+    if not secret:
+        raise ValueError("USER_TOKEN_SECRET is not set")
+    if not USER_ID_PATTERN.match(user_id):
+        raise ValueError(f"Invalid user id {user_id!r}")
+    expires = int(time.time() + (ttl_seconds or settings.USER_TOKEN_TTL))
+    payload = f"{user_id}.{expires}"
+    return f"{payload}.{_sign(payload, secret)}"
+
+
+def verify_user_token(token: str) -> str:
+    """The user id a token was issued for; 401 if it is forged, malformed or expired"""
+    if not settings.USER_TOKEN_SECRET:
+        raise unauthenticated("User tokens are not enabled on this server")
+    try:
+        payload, signature = token.rsplit(".", 1)
+        user_id, expires = payload.rsplit(".", 1)
+        expires = int(expires)
+    except ValueError:
+        raise unauthenticated("Malformed user token")
+    if not hmac.compare_digest(signature, _sign(payload, settings.USER_TOKEN_SECRET)):
+        raise unauthenticated("Invalid user token")
+    if expires < time.time():
+        raise unauthenticated("User token expired")
+    return user_id
+
+
+def _trusted_proxy(host: Optional[str]) -> bool:
+    return host in {h.strip() for h in settings.TRUSTED_PROXIES.split(',') if h.strip()}
+
+
+def identify_user(authorization: Optional[str], token: Optional[str],
+                  asserted: Optional[str], client_host: Optional[str]) -> str:
+    """
+    The caller's user id from a bearer token, a ?token= parameter, or a user id
+    asserted (header or ?user=) by a trusted proxy, in that order
+    """
+    if authorization:
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not credentials.strip():
+            raise unauthenticated("Expected Authorization: Bearer <user token>")
+        return verify_user_token(credentials.strip())
+    if token:
+        return verify_user_token(token)
+    if asserted and not _trusted_proxy(client_host):
+        raise unauthenticated(
+            f"{settings.USER_HEADER} is only accepted from trusted proxies; "
+            f"authenticate with a user token"
+        )
+    return resolve_user_id(asserted)
+
+
+def quota_exceeded(quota: str, detail: str, retry_after: float) -> HTTPException:
+    QUOTA_REJECTIONS.labels(quota=quota).inc()
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class UserRateLimiter:
+    """Token bucket per user: `rate` requests per second, bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # user -> (tokens, updated)
+
+    def acquire(self, user_id: str) -> float:
+        """Take one token; returns 0 on success, else seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            return (1 - tokens) / self.rate
+        if user_id not in self._buckets and len(self._buckets) >= MAX_TRACKED_USERS:
+            self._prune(now)
+        self._buckets[user_id] = (tokens - 1, now)
+        return 0.0
+
+    def _prune(self, now: float):
+        full_after = self.burst / self.rate
+        self._buckets = {
+            user: state for user, state in self._buckets.items()
+            if now - state[1] < full_after
+        }
+
+
+class UserSlots:
+    """Per-user cap on concurrent operations in this process; excess calls are rejected"""
+
+    def __init__(self, limit: int, quota: str):
+        self.limit = limit
+        self.quota = quota
+        self._active: Dict[str, int] = {}
+
+    def active(self, user_id: str) -> int:
+        return self._active.get(user_id, 0)
+
+    @asynccontextmanager
+    async def slot(self, user_id: str) -> AsyncIterator[None]:
+        if self.limit > 0 and self.active(user_id) >= self.limit:
+            raise quota_exceeded(
+                self.quota,
+                f"At most {self.limit} concurrent {self.quota.replace('_', ' ')} per user",
+                settings.USER_QUOTA_RETRY_AFTER
+            )
+        self._active[user_id] = self.active(user_id) + 1
+        try:
+            yield
+        finally:
+            self._active[user_id] -= 1
+            if not self._active[user_id]:
+                del self._active[user_id]
+
+
+api_rate_limiter = UserRateLimiter(settings.USER_API_RATE, settings.USER_API_BURST)
+sync_scrape_slots = UserSlots(settings.USER_MAX_SYNC_SCRAPES, "sync_scrapes")
+
+
+async def current_user(request: Request) -> str:
+    """FastAPI dependency: the calling user, charged one API call against their quota"""
+    user_id = identify_user(
+        request.headers.get("authorization"),
+        None,
+        request.headers.get(settings.USER_HEADER),
+        request.client.host if request.client else None
+    )
+    wait = api_rate_limiter.acquire(user_id)
+    if wait:
+        raise quota_exceeded("api_rate", f"API rate limit exceeded for user {user_id}", wait)
+    return user_id
+
+
+def websocket_user(websocket: WebSocket) -> str:
+    """
+    The user of a WebSocket connection. Browsers cannot set headers on
+    WebSocket requests, so ?token= (and ?user= from a trusted proxy) work too.
+    """
+    return identify_user(
+        websocket.headers.get("authorization"),
+        websocket.query_params.get("token"),
+        websocket.headers.get(settings.USER_HEADER) or websocket.query_params.get("user"),
+        websocket.client.host if websocket.client else None
+    )
+
+
+def check_pending_scans(pending: int):
+    """Reject a new async scan when the user already has too many queued or running"""
+    limit = settings.USER_MAX_PENDING_SCANS
+    if limit > 0 and pending >= limit:
+        raise quota_exceeded(
+            "pending_scans",
+            f"At most {limit} queued or running scans per user",
+            settings.USER_QUOTA_RETRY_AFTER
+        )
+
+
+def check_schedule_count(schedules: int):
+    """Reject a new recurring scan schedule beyond the per-user limit"""
+    limit = settings.USER_MAX_SCHEDULES
+    if limit > 0 and schedules >= limit:
+        raise quota_exceeded(
+            "schedules",
+            f"At most {limit} scan schedules per user",
+            settings.USER_QUOTA_RETRY_AFTER
+        )
+
+
+if __name__ == "__main__":
+    # python tenancy.py issue <user_id> [ttl_seconds]
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != "issue":
+        sys.exit("usage: python tenancy.py issue <user_id> [ttl_seconds]")
+    try:
+        print(issue_user_token(sys.argv[2], int(sys.argv[3]) if len(sys.argv) == 4 else None))
+    except ValueError as e:
+        sys.exit(str(e))
+'''
+
+print("=== TENANCY.PY ===")
+print(tenancy_py[:2000])
+print(f"\n... [Full file is {len(tenancy_py.splitlines())} lines] ...\n")
@@ -0,0 +1,111 @@
+# 29. tests/test_startup.py - Modules that must load without aiohttp
+test_startup_py = '''"""
+VAMP Agent Startup Imports
+aiohttp is imported where a connector session opens or content is fetched, so
+starting the API (and loading the connector base class or the registry) leaves
+it unloaded. Each module is imported in a fresh interpreter, since this test
+process may already have aiohttp loaded.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize("module", [
+    "main", "scraping", "content", "connectors.base", "connectors.registry", "metrics", "tracing"
+])
+def test_import_leaves_aiohttp_unloaded(module: str):
+    code = f"import sys, {module}; sys.exit(1 if 'aiohttp' in sys.modules else 0)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, f"importing {module} loaded aiohttp\\n{result.stderr}"
+'''
+
+print("=== TESTS/TEST_STARTUP.PY ===")
+print(test_startup_py[:2000])
+
+# 30. tests/test_jobs.py - Job queue leases and attempts
+test_jobs_py = '''"""
+VAMP Agent Job Queue
+Lease expiry and attempt limits of the SQLite job queue. Leases are expired by
+rewriting lease_expires, which is what a worker that died mid-job leaves behind.
+"""
+import asyncio
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from jobs import JOB_HANDLERS, SQLiteJobQueue, _run_job
+from models import JobStatus
+
+
+@pytest.fixture
+def queue(tmp_path) -> SQLiteJobQueue:
+    return SQLiteJobQueue(tmp_path / "jobs.db", lease_seconds=300, max_attempts=3)
+
+
+def expire_lease(queue: SQLiteJobQueue, job_id: str):
+    with closing(sqlite3.connect(str(queue.path), isolation_level=None)) as conn:
+        conn.execute("UPDATE jobs SET lease_expires = 0 WHERE job_id = ?", (job_id,))
+
+
+def reclaimed(queue: SQLiteJobQueue, worker_id: str, kind: str = "scrape"):
+    """A job claimed by stale-worker, whose lease expired and was redelivered to worker_id"""
+    job = queue.enqueue(kind, "scan-1", {})
+    queue.claim("stale-worker")
+    expire_lease(queue, job.job_id)
+    assert queue.claim(worker_id).job_id == job.job_id
+    return job
+
+
+def test_expired_lease_is_redelivered_until_attempts_run_out(queue: SQLiteJobQueue):
+    job = queue.enqueue("scrape", "scan-1", {})
+    for attempt in range(1, queue.max_attempts + 1):
+        claimed = queue.claim(f"worker-{attempt}")
+        assert claimed.job_id == job.job_id
+        assert claimed.attempts == attempt
+        expire_lease(queue, job.job_id)
+
+    assert queue.claim("worker-last") is None
+    failed = queue.get(job.job_id)
+    assert failed.status == JobStatus.FAILED
+    assert failed.error.startswith(f"Lease expired after {queue.max_attempts} attempts")
+
+
+def test_stale_worker_cannot_record_an_outcome(queue: SQLiteJobQueue):
+    job = reclaimed(queue, "new-worker")
+    assert not queue.complete(job.job_id, "stale-worker", {"total_items": 1})
+    assert not queue.fail(job.job_id, "stale-worker", "boom")
+    assert queue.get(job.job_id).status == JobStatus.RUNNING
+
+    assert queue.complete(job.job_id, "new-worker", {"total_items": 2})
+    assert queue.get(job.job_id).result == {"total_items": 2}
+
+
+def test_lost_lease_cancels_the_handler(tmp_path, monkeypatch):
+    # Heartbeats every lease_seconds // 3 = 1s
+    queue = SQLiteJobQueue(tmp_path / "jobs.db", lease_seconds=3, max_attempts=3)
+    cancelled = []
+
+    async def handler(job, ctx):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(job.job_id)
+            raise
+        return {}
+
+    monkeypatch.setitem(JOB_HANDLERS, "slow", handler)
+    job = reclaimed(queue, "new-worker", kind="slow")
+
+    asyncio.run(asyncio.wait_for(_run_job("stale-worker", queue, job, None), 10))
+    assert cancelled == [job.job_id]
+    assert queue.get(job.job_id).status == JobStatus.RUNNING
+'''
+
+print("=== TESTS/TEST_JOBS.PY ===")
+print(test_jobs_py[:2000])
@@ -0,0 +1,386 @@
+
+# 12. tracing.py - Per-scan span tracing
+tracing_py = '''"""
+VAMP Agent Scan Tracing
+Scan-scoped spans (connect, page fetches, HTTP requests, filtering, conversion,
+attempts, scoring) using the OpenTelemetry span data model: 32-hex trace ids, 16-hex
+span ids, parent links, unix-nano timestamps, attributes, events and status.
+
+The trace id is derived from the scan_id, so retries and resumes of one scan
+land in the same trace. Spans outside a scan trace are not recorded.
+"""
+import hashlib
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional
+
+from config import settings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Spans are handed to the exporter in batches of this size, and when the root ends
+EXPORT_BATCH_SIZE = 50
+
+
+class Span:
+    """One timed operation within a scan trace"""
+
+    def __init__(self, trace: "_ScanTrace", name: str, parent_span_id: Optional[str],
+                 attributes: Dict[str, Any] = None, start_time_unix_nano: int = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status = {"code": "UNSET"}
+        self.start_time_unix_nano = start_time_unix_nano or time.time_ns()
+        self.end_time_unix_nano: Optional[int] = None
+
+    @property
+    def recording(self) -> bool:
+        return self.end_time_unix_nano is None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Dict[str, Any] = None):
+        self.events.append({
+            "name": name,
+            "time_unix_nano": time.time_ns(),
+            "attributes": attributes or {}
+        })
+
+    def set_status(self, code: str, description: str = None):
+        self.status = {"code": code, "description": description} if description else {"code": code}
+
+    def record_exception(self, exc: BaseException):
+        self.add_event("exception", {
+            "exception.type": type(exc).__name__,
+            "exception.message": str(exc)
+        })
+        self.set_status("ERROR", str(exc))
+
+    def end(self, end_time_unix_nano: int = None):
+        if not self.recording:
+            return
+        self.end_time_unix_nano = end_time_unix_nano or time.time_ns()
+        if self.status["code"] == "UNSET":
+            self.status = {"code": "OK"}
+        self.trace.finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": "INTERNAL",
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": self.status,
+            "resource": {"vamp.scan_id": self.trace.scan_id}
+        }
+
+
+class _NoopSpan:
+    """Returned when no scan trace is active"""
+
+    recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def add_event(self, name: str, attributes: Dict[str, Any] = None):
+        pass
+
+    def set_status(self, code: str, description: str = None):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+    def end(self, end_time_unix_nano: int = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _ScanTrace:
+    """Finished-span buffer for one scan in this process"""
+
+    def __init__(self, scan_id: str, exporter: "SpanExporter"):
+        self.scan_id = scan_id
+        self.trace_id = trace_id_for_scan(scan_id)
+        self.exporter = exporter
+        self._finished: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def finish(self, span: Span):
+        with self._lock:
+            self._finished.append(span.to_dict())
+            if len(self._finished) < EXPORT_BATCH_SIZE:
+                return
+            batch, self._finished = self._finished, []
+        self._export(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._finished = self._finished, []
+        if batch:
+            self._export(batch)
+
+    def _export(self, batch: List[Dict[str, Any]]):
+        try:
+            self.exporter.export(self.scan_id, batch)
+        except Exception as e:
+            # Tracing must never fail a scan
+            logger.error(f"Failed to export {len(batch)} spans for scan {self.scan_id}: {e}")
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("vamp_current_span", default=None)
+
+
+def trace_id_for_scan(scan_id: str) -> str:
+    return hashlib.sha256(scan_id.encode()).hexdigest()[:32]
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def start_span(name: str, attributes: Dict[str, Any] = None,
+               start_time_unix_nano: int = None):
+    """Start a child of the current span without making it current; call end() on it"""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes, start_time_unix_nano)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Any]:
+    """Time a block as a child of the current span; errors are recorded and re-raised"""
+    child = start_span(name, attributes)
+    if child is NOOP_SPAN:
+        yield child
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+@contextmanager
+def scan_trace(scan_id: str, name: str, exporter: "SpanExporter" = None,
+               **attributes) -> Iterator[Span]:
+    """Open a root span for one unit of work on a scan (a job attempt, a resume)"""
+    trace = _ScanTrace(scan_id, exporter or get_exporter())
+    root = Span(trace, name, None, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.end()
+        trace.flush()
+
+
+def tracing_trace_config() -> "aiohttp.TraceConfig":
+    """aiohttp hooks recording one span per HTTP request under the current span"""
+    import aiohttp
+    from yarl import URL
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        url = URL(params.url)
+        # Query strings can carry tokens; keep host and path only
+        context.span = start_span(f"HTTP {params.method}", {
+            "http.method": params.method,
+            "server.address": url.host,
+            "url.path": url.path
+        })
+
+    async def on_request_end(session, context, params):
+        context.span.set_attribute("http.status_code", params.response.status)
+        if params.response.status >= 400:
+            context.span.set_status("ERROR", f"HTTP {params.response.status}")
+        context.span.end()
+
+    async def on_request_exception(session, context, params):
+        context.span.record_exception(params.exception)
+        context.span.end()
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+class SpanExporter(ABC):
+    """Destination for finished spans, queryable per scan"""
+
+    @abstractmethod
+    def export(self, scan_id: str, spans: List[Dict[str, Any]]):
+        pass
+
+    @abstractmethod
+    def get_spans(self, scan_id: str) -> List[Dict[str, Any]]:
+        """Every exported span for a scan, in start order"""
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the most recent scans in this process only"""
+
+    def __init__(self, max_scans: int = 200):
+        self.max_scans = max_scans
+        self._scans: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, scan_id: str, spans: List[Dict[str, Any]]):
+        with self._lock:
+            self._scans.setdefault(scan_id, []).extend(spans)
+            self._scans.move_to_end(scan_id)
+            while len(self._scans) > self.max_scans:
+                self._scans.popitem(last=False)
+
+    def get_spans(self, scan_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = list(self._scans.get(scan_id, ()))
+        return sorted(spans, key=lambda s: s["start_time_unix_nano"])
+
+
+class SQLiteSpanExporter(SpanExporter):
+    """Spans shared between job worker processes and the API"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS trace_spans (
+                    scan_id TEXT NOT NULL,
+                    span_id TEXT NOT NULL,
+                    start_ns INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (scan_id, span_id)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def export(self, scan_id: str, spans: List[Dict[str, Any]]):
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO trace_spans (scan_id, span_id, start_ns, data) VALUES (?, ?, ?, ?)",
+                [(scan_id, s["span_id"], s["start_time_unix_nano"], json.dumps(s, default=str))
+                 for s in spans]
+            )
+            conn.execute("COMMIT")
+
+    def get_spans(self, scan_id: str) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM trace_spans WHERE scan_id = ? ORDER BY start_ns", (scan_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+SPAN_EXPORTERS: Dict[str, Callable[[], SpanExporter]] = {
+    'memory': lambda: InMemorySpanExporter(max_scans=settings.TRACE_MAX_SCANS),
+    'sqlite': lambda: SQLiteSpanExporter(path=settings.TRACE_STORE_PATH),
+}
+
+_exporter: Optional[SpanExporter] = None
+
+
+def create_span_exporter(backend: str = None) -> SpanExporter:
+    """Create the configured span exporter"""
+    backend = backend or settings.TRACE_EXPORTER
+    if backend not in SPAN_EXPORTERS:
+        raise ValueError(f"Unknown trace exporter: {backend}")
+    return SPAN_EXPORTERS[backend]()
+
+
+def get_exporter() -> SpanExporter:
+    """Process-wide exporter, created on first use"""
+    global _exporter
+    if _exporter is None:
+        _exporter = create_span_exporter()
+    return _exporter
+
+
+def build_span_tree(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Nest spans under their parents; spans whose parent is missing become roots"""
+    nodes = {s["span_id"]: dict(s, children=[]) for s in spans}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_span_id"]) if node["parent_span_id"] else None
+        (parent["children"] if parent else roots).append(node)
+    for node in nodes.values():
+        node["children"].sort(key=lambda s: s["start_time_unix_nano"])
+        node["duration_ms"] = _duration_ms(node)
+    roots.sort(key=lambda s: s["start_time_unix_nano"])
+    return roots
+
+
+def critical_path(roots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Chain of spans that bounded the scan's end: from the last-finishing root,
+    repeatedly descend into the child that finished last.
+    """
+    path = []
+    candidates = roots
+    while candidates:
+        node = max(candidates, key=lambda s: s["end_time_unix_nano"] or 0)
+        path.append({
+            "span_id": node["span_id"],
+            "name": node["name"],
+            "duration_ms": node["duration_ms"]
+        })
+        candidates = node["children"]
+    return path
+
+
+def _duration_ms(span_data: Dict[str, Any]) -> Optional[float]:
+    if not span_data["end_time_unix_nano"]:
+        return None
+    return (span_data["end_time_unix_nano"] - span_data["start_time_unix_nano"]) / 1e6
+'''
+
+print("=== TRACING.PY ===")
+print(tracing_py[:2000])
+print(f"\n... [Full file is {len(tracing_py.splitlines())} lines] ...\n")